@@ -1,234 +1,195 @@
 import os
-import hashlib
-import subprocess
 import sys
+import threading
+import time
+
+# Dossier des profils des tâches de l'interface (`DS_Sign_Tool.py --profile DOSSIER` ou DS_SIGN_PROFILE)
+PROFILE_DIR = os.environ.get("DS_SIGN_PROFILE")
+
+# Mode ligne de commande : traité avant tout import de Qt pour fonctionner sans affichage.
+# Sans sous-commande, les arguments vont à l'interface : --profile DOSSIER est retiré, le reste va à Qt.
+if __name__ == "__main__" and len(sys.argv) > 1:
+    import argparse
+    from ds_sign_cli import build_parser, main
+    if any(arg in build_parser().commands or arg in ("-h", "--help") for arg in sys.argv[1:]):
+        sys.exit(main())
+    gui_parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    gui_parser.add_argument("--profile")
+    gui_options, qt_arguments = gui_parser.parse_known_args(sys.argv[1:])
+    PROFILE_DIR = gui_options.profile or PROFILE_DIR
+    sys.argv = sys.argv[:1] + qt_arguments
+
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtWidgets import QFileDialog, QMessageBox, QLabel
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThreadPool, pyqtSignal
 from PyQt5.QtWidgets import QProgressBar
 
-# Répertoire pour stocker les clés
-KEY_DIR = "keys/"
-if not os.path.exists(KEY_DIR):
-    os.makedirs(KEY_DIR)
-
-# Liste globale pour stocker les processus actifs
-active_processes = []
-
-# Fonction pour récupérer les ressources dynamiquement
-def resource_path(relative_path):
-    """Obtenir le chemin relatif pour les ressources (icônes, etc.)."""
-    try:
-        base_path = sys._MEIPASS  # Si l'application est exécutée depuis un exécutable PyInstaller
-    except Exception:
-        base_path = os.path.abspath(".")  # Si l'application est exécutée depuis le script source
-    return os.path.join(base_path, relative_path)
-
-# Chemin vers OpenSSL
-OPENSSL_PATH = resource_path("openssl/openssl.exe")
-
-# Fonction pour calculer le hachage SHA-256
-def calculate_hash(file_path):
-    hash_sha256 = hashlib.sha256()
-    with open(file_path, 'rb') as file:
-        while chunk := file.read(4096):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
-
-# Fonction standalone pour signer un fichier
-def sign_file_standalone(file_path, private_key):
-    try:
-        signed_file = file_path + ".signed"
-        # Use Popen to track the process
-        process = subprocess.Popen(
-            [OPENSSL_PATH, "dgst", "-sha256", "-sign", private_key, "-out", signed_file, file_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding="utf-8",
-            errors="ignore"
-        )
-        active_processes.append(process)  # Ajouter le processus à la liste
-        stdout, stderr = process.communicate()  # Attendre la fin du processus
-        if process.returncode != 0:
-            raise Exception(f"Error signing file: {stderr}")
-        return signed_file
-    except Exception as e:
-        raise Exception(f"Error signing file: {e}")
-
-# Fonction standalone pour vérifier un fichier
-def verify_file_standalone(file_path, public_key, signed_file):
-    try:
-        # Use Popen to track the process
-        process = subprocess.Popen(
-            [OPENSSL_PATH, "dgst", "-sha256", "-verify", public_key, "-signature", signed_file, file_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding="utf-8",
-            errors="ignore"
-        )
-        active_processes.append(process)  # Ajouter le processus à la liste
-        stdout, stderr = process.communicate()  # Attendre la fin du processus
-        if process.returncode != 0:
-            raise Exception(f"Error verifying file: {stderr}")
-        return "Verified OK" in stdout
-    except Exception as e:
-        raise Exception(f"Error verifying file: {e}")
-
-def terminate_all_processes():
-    """Termine tous les processus OpenSSL encore actifs."""
-    for process in active_processes:
-        if process.poll() is None:  # Vérifier si le processus est toujours actif
-            process.terminate()  # Terminer le processus
-    active_processes.clear()  # Vider la liste des processus actifs
-
-# Fonction pour générer l'arborescence d'un répertoire
-def generate_tree(directory, output_file, prefix=""):
-    entries = sorted(os.listdir(directory))
-    entries_count = len(entries)
-
-    for index, entry in enumerate(entries):
-        full_path = os.path.join(directory, entry)
-        is_last = index == entries_count - 1
-
-        if os.path.isdir(full_path):
-            with open(output_file, "a", encoding="utf-8") as f:
-                f.write(f"{prefix}├───📁 {entry}\n")
-            new_prefix = f"{prefix}│   " if not is_last else f"{prefix}    "
-            generate_tree(full_path, output_file, new_prefix)
-        else:
-            with open(output_file, "a", encoding="utf-8") as f:
-                f.write(f"{prefix}└───📄 {entry}\n")
-
-# Fonction pour signer un répertoire
-def sign_directory(directory_path, private_key):
-    try:
-        dir_file_path = os.path.join(directory_path, "dir_file")
-        hash_file_path = os.path.join(directory_path, "hash_file")
-        signed_hash_file_path = hash_file_path + ".signed"
-
-        # Générer le fichier d'arborescence
-        with open(dir_file_path, "w", encoding="utf-8") as dir_file:
-            dir_file.write(f"{directory_path}:\n")
-        generate_tree(directory_path, dir_file_path)
-
-        # Calculer le hash du fichier d'arborescence
-        with open(hash_file_path, "w", encoding="utf-8") as hash_file:
-            hash_value = calculate_hash(dir_file_path)
-            hash_file.write(hash_value)
-
-        # Signer le hash
-        sign_file_standalone(hash_file_path, private_key)
-        return dir_file_path, signed_hash_file_path
-    except Exception as e:
-        raise Exception(f"Error signing directory: {e}")
-
-# Fonction pour vérifier un répertoire
-def verify_directory(directory_path, public_key):
-    try:
-        dir_file_path = os.path.join(directory_path, "dir_file")
-        hash_file_path = os.path.join(directory_path, "hash_file")
-        signed_hash_file_path = hash_file_path + ".signed"
-
-        # Vérifier si les fichiers nécessaires existent
-        if not all(os.path.exists(p) for p in (dir_file_path, hash_file_path, signed_hash_file_path)):
-            return False, "Missing signature files in directory."
-
-        # Vérifier le hash de l'arborescence
-        recalculated_hash = calculate_hash(dir_file_path)
-        with open(hash_file_path, "r", encoding="utf-8") as hash_file:
-            original_hash = hash_file.read().strip()
-
-        if recalculated_hash != original_hash:
-            return False, "Directory structure hash mismatch."
-
-        # Vérifier la signature du hash
-        valid = verify_file_standalone(hash_file_path, public_key, signed_hash_file_path)
-        if not valid:
-            return False, "Signature invalid."
-
-        return True, "Directory verification successful."
-    except Exception as e:
-        return False, str(e)
-
-# Worker thread for signing/verifying with progress updates
-class Worker(QThread):
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(str)
-
-    def __init__(self, operation, file_path, key_path):
+# Les fonctions du moteur restent accessibles via DS_Sign_Tool pour les scripts existants
+from ds_sign_core import (
+    KEY_DIR,
+    MAX_CONCURRENT_OPERATIONS,
+    OPENSSL_PATH,
+    CancellationToken,
+    OperationCancelled,
+    active_processes,
+    calculate_hash,
+    differences_report,
+    generate_key_pair,
+    generate_tree,
+    resource_path,
+    sign_directory,
+    sign_file_standalone,
+    terminate_all_processes,
+    verify_directory,
+    verify_file_standalone,
+)
+from ds_sign_profile import Profiler
+
+# Séparateur des chemins saisis ensemble (le « ; » ne peut pas apparaître dans un chemin Windows)
+PATH_SEPARATOR = ";"
+
+# Intervalle minimal entre deux mises à jour du débit d'une tâche (secondes)
+PROGRESS_INTERVAL = 0.5
+
+# L'échantillonneur du profileur voit tous les threads (dont ceux du moteur, non attribuables à une
+# tâche) : les tâches profilées s'exécutent donc une à une pour que chaque profil reste le sien
+_profile_lock = threading.Lock()
+
+
+def format_rate(bytes_per_second):
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
+
+
+# Les QRunnable ne sont pas des QObject : les signaux passent par un objet dédié
+class JobSignals(QtCore.QObject):
+    started = pyqtSignal(int)
+    progress = pyqtSignal(int, int, float)  # identifiant, pourcentage, débit (octets/s)
+    finished = pyqtSignal(int, str, str)    # identifiant, statut, message
+
+
+# Tâche de signature/vérification exécutée par le QThreadPool de la file d'attente
+class Job(QtCore.QRunnable):
+    def __init__(self, job_id, operation, file_path, key_path, fail_fast=False):
         super().__init__()
+        self.setAutoDelete(False)  # La file garde la tâche pour pouvoir l'annuler
+        self.signals = JobSignals()
+        self.job_id = job_id
         self.operation = operation
         self.file_path = file_path
         self.key_path = key_path
+        self.fail_fast = fail_fast
+        self.differences = {}  # Rempli par une vérification de dossier qui échoue
+        self.cancel_token = CancellationToken()
+        # État affiché, modifié uniquement par le thread de l'interface
+        self.status = "Queued"
+        self.percent = 0
+
+    def cancel(self):
+        # Le moteur s'arrête au prochain bloc lu (et tue un éventuel processus OpenSSL)
+        self.cancel_token.cancel()
 
     def run(self):
+        if self.cancel_token.cancelled:
+            self.signals.finished.emit(self.job_id, "Cancelled", "Operation cancelled.")
+            return
+        self.signals.started.emit(self.job_id)
+        self._start = time.perf_counter()
+        self._last_percent = -1
+        self._last_emit = 0.0
+        profiler = Profiler() if PROFILE_DIR else None
+        if profiler is not None and not self._acquire_profile_lock():
+            self.signals.finished.emit(self.job_id, "Cancelled", "Operation cancelled.")
+            return
+        try:
+            if profiler is not None:
+                profiler.start()
+            try:
+                self._run_operation()
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+                    _profile_lock.release()
+            status, message = "Done", f"{self.operation.capitalize()} operation completed successfully!"
+        except OperationCancelled:
+            status, message = "Cancelled", "Operation cancelled."
+        except Exception as e:
+            status, message = "Failed", f"Operation failed: {str(e)}"
+        if profiler is not None:
+            message += "\n" + self._write_profile(profiler)
+        self.signals.finished.emit(self.job_id, status, message)
+
+    def _acquire_profile_lock(self):
+        # Attend son tour sans ignorer une annulation demandée entre-temps
+        while not _profile_lock.acquire(timeout=0.1):
+            if self.cancel_token.cancelled:
+                return False
+        return True
+
+    def _write_profile(self, profiler):
+        path = os.path.join(PROFILE_DIR, f"job{self.job_id}-{self.operation}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
         try:
-            if self.operation == "sign":
-                self._sign_operation()
-            elif self.operation == "verify":
-                self._verify_operation()
-            self.finished.emit(f"{self.operation.capitalize()} operation completed successfully!")
+            profiler.write(path, f"{self.operation} {self.file_path}")
         except Exception as e:
-            self.finished.emit(f"Operation failed: {str(e)}")
+            return f"Profile not written: {e}"
+        return f"Profile: {path} (summary in {os.path.basename(path)}.txt)"
+
+    def _run_operation(self):
+        if self.operation == "sign":
+            self._sign_operation()
+        elif self.operation == "verify":
+            self._verify_operation()
 
     def _sign_operation(self):
         if os.path.isfile(self.file_path):
             self._progressive_sign_file()
         elif os.path.isdir(self.file_path):
             self._progressive_sign_directory()
+        else:
+            raise Exception("Path not found.")
 
     def _verify_operation(self):
         if os.path.isfile(self.file_path):
             self._progressive_verify_file()
         elif os.path.isdir(self.file_path):
             self._progressive_verify_directory()
+        else:
+            raise Exception("Path not found.")
 
-    def _progressive_sign_file(self):
-        file_size = os.path.getsize(self.file_path)
-        chunk_size = max(1, file_size // 100)
-        processed = 0
+    def _report_progress(self, processed, total):
+        """Émet le pourcentage et le débit quand le pourcentage change (au plus toutes les PROGRESS_INTERVAL s sinon)."""
+        if total is None:
+            percent = max(self._last_percent, 0)  # Total inconnu (parcours en mémoire bornée) : seul le débit avance
+        else:
+            percent = 100 if total == 0 else min(100, (processed * 100) // total)
+        now = time.perf_counter()
+        if percent != self._last_percent or now - self._last_emit >= PROGRESS_INTERVAL:
+            self._last_percent = percent
+            self._last_emit = now
+            elapsed = now - self._start
+            self.signals.progress.emit(self.job_id, percent, processed / elapsed if elapsed > 0 else 0.0)
 
-        with open(self.file_path, 'rb') as file:
-            while chunk := file.read(chunk_size):
-                processed += len(chunk)
-                self.progress.emit(min(100, (processed * 100) // file_size))
-                QThread.msleep(50)
-        sign_file_standalone(self.file_path, self.key_path)
+    def _progressive_sign_file(self):
+        sign_file_standalone(self.file_path, self.key_path, progress=self._report_progress, cancel=self.cancel_token)
 
     def _progressive_verify_file(self):
         signed_file = self.file_path + ".signed"
-        file_size = os.path.getsize(self.file_path)
-        chunk_size = max(1, file_size // 100)
-        processed = 0
-
-        with open(self.file_path, 'rb') as file:
-            while chunk := file.read(chunk_size):
-                processed += len(chunk)
-                self.progress.emit(min(100, (processed * 100) // file_size))
-                QThread.msleep(50)
-        verify_file_standalone(self.file_path, self.key_path, signed_file)
+        if not verify_file_standalone(self.file_path, self.key_path, signed_file, progress=self._report_progress,
+                                      cancel=self.cancel_token):
+            raise Exception("Signature invalid.")
 
     def _progressive_sign_directory(self):
-        total_items = sum(len(files) for _, _, files in os.walk(self.file_path))
-        processed = 0
-
-        for _, _, files in os.walk(self.file_path):
-            for _ in files:
-                processed += 1
-                self.progress.emit((processed * 100) // total_items)
-                QThread.msleep(50)
-        sign_directory(self.file_path, self.key_path)
+        sign_directory(self.file_path, self.key_path, progress=self._report_progress, cancel=self.cancel_token)
 
     def _progressive_verify_directory(self):
-        total_items = sum(len(files) for _, _, files in os.walk(self.file_path))
-        processed = 0
-
-        for _, _, files in os.walk(self.file_path):
-            for _ in files:
-                processed += 1
-                self.progress.emit((processed * 100) // total_items)
-                QThread.msleep(50)
-        verify_directory(self.file_path, self.key_path)
+        valid, message = verify_directory(self.file_path, self.key_path, progress=self._report_progress,
+                                          fail_fast=self.fail_fast, cancel=self.cancel_token,
+                                          differences=self.differences)
+        if not valid:
+            raise Exception(message)
 
 # Classe principale de l'application
 class DSSignToolApp(QtWidgets.QWidget):
@@ -236,7 +197,15 @@ class DSSignToolApp(QtWidgets.QWidget):
         super().__init__()
         self.setWindowTitle("DS-Sign-Tool")
         self.setWindowIcon(QtGui.QIcon(resource_path("icon/DS-Sign-Tool_Icone.ico")))
-        self.resize(775, 540)
+        self.resize(775, 760)
+        # File d'attente des opérations : chaque tâche a sa ligne dans le panneau "Jobs".
+        # Un QThreadPool plutôt que JobScheduler : soumettre ne bloque jamais le thread de l'interface, une tâche
+        # en file se retire (tryTake) et la limite suit le panneau. DS_SIGN_MAX_JOBS reste le plafond.
+        self.job_pool = QThreadPool(self)
+        self.job_pool.setMaxThreadCount(max(1, MAX_CONCURRENT_OPERATIONS))
+        self.jobs = {}
+        self.batch = []  # Tâches soumises depuis que la file était vide
+        self.next_job_id = 0
         self.setup_ui()
 
     def setup_ui(self):
@@ -245,7 +214,7 @@ class DSSignToolApp(QtWidgets.QWidget):
         self.display_banner()
 
         self.file_path_input = QtWidgets.QLineEdit(self)
-        self.file_path_input.setPlaceholderText("Enter file/folder path or use the import button")
+        self.file_path_input.setPlaceholderText("Enter file/folder paths (separated by ';') or use the import button")
         self.file_path_input.setStyleSheet("padding: 5px;")
 
         import_menu = QtWidgets.QMenu(self)
@@ -308,6 +277,8 @@ class DSSignToolApp(QtWidgets.QWidget):
         buttons_layout.addWidget(verify_file_button)
         main_layout.addLayout(buttons_layout)
 
+        main_layout.addWidget(self.setup_job_panel())
+
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setAlignment(Qt.AlignCenter)
         self.progress_bar.setValue(0)
@@ -319,6 +290,45 @@ class DSSignToolApp(QtWidgets.QWidget):
 
         self.setLayout(main_layout)
 
+    def setup_job_panel(self):
+        job_group = QtWidgets.QGroupBox("Jobs", self)
+        job_layout = QtWidgets.QVBoxLayout(job_group)
+
+        self.job_table = QtWidgets.QTableWidget(0, 6, job_group)
+        self.job_table.setHorizontalHeaderLabels(["Operation", "Path", "Progress", "Throughput", "Status", ""])
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.job_table.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        header = self.job_table.horizontalHeader()
+        header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
+        self.job_table.setMinimumHeight(150)
+        job_layout.addWidget(self.job_table)
+
+        self.max_jobs_input = QtWidgets.QSpinBox(job_group)
+        self.max_jobs_input.setRange(1, self.job_pool.maxThreadCount())
+        self.max_jobs_input.setValue(self.job_pool.maxThreadCount())
+        self.max_jobs_input.valueChanged.connect(self.job_pool.setMaxThreadCount)
+
+        cancel_all_button = QtWidgets.QPushButton("Cancel All", job_group)
+        cancel_all_button.setStyleSheet("background-color: #264653; color: white; padding: 5px;")
+        cancel_all_button.clicked.connect(self.cancel_all_jobs)
+
+        clear_button = QtWidgets.QPushButton("Clear Finished", job_group)
+        clear_button.setStyleSheet("background-color: #264653; color: white; padding: 5px;")
+        clear_button.clicked.connect(self.clear_finished_jobs)
+
+        controls_layout = QtWidgets.QHBoxLayout()
+        controls_layout.addWidget(QLabel("Concurrent jobs:", job_group))
+        controls_layout.addWidget(self.max_jobs_input)
+        self.fail_fast_input = QtWidgets.QCheckBox("Stop verification at first mismatch", job_group)
+        controls_layout.addWidget(self.fail_fast_input)
+        controls_layout.addStretch()
+        controls_layout.addWidget(cancel_all_button)
+        controls_layout.addWidget(clear_button)
+        job_layout.addLayout(controls_layout)
+        return job_group
+
     def display_banner(self):
         banner_label = QLabel(self)
         banner_path = resource_path("icon/banner_png.png")
@@ -334,9 +344,9 @@ class DSSignToolApp(QtWidgets.QWidget):
         self.layout().addWidget(banner_label)
 
     def import_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select File")
-        if file_path:
-            self.file_path_input.setText(file_path)
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Files")
+        if file_paths:
+            self.file_path_input.setText(f"{PATH_SEPARATOR} ".join(file_paths))
 
     def import_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Folder")
@@ -357,47 +367,158 @@ class DSSignToolApp(QtWidgets.QWidget):
         key_name, ok = QtWidgets.QInputDialog.getText(self, "Key Name", "Enter a name for the key:")
         if ok and key_name:
             try:
-                pub_key = os.path.join(KEY_DIR, f"{key_name}_public.pem")
-                priv_key = os.path.join(KEY_DIR, f"{key_name}_private.pem")
-                subprocess.run([OPENSSL_PATH, "ecparam", "-name", "prime256v1", "-genkey", "-out", priv_key])
-                subprocess.run([OPENSSL_PATH, "ec", "-in", priv_key, "-pubout", "-out", pub_key])
+                priv_key, pub_key = generate_key_pair(key_name)
                 QMessageBox.information(self, "Success", f"Keys generated!\nPrivate Key: {priv_key}\nPublic Key: {pub_key}")
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
 
+    def input_paths(self):
+        return [path.strip() for path in self.file_path_input.text().split(PATH_SEPARATOR) if path.strip()]
+
     def sign_file(self):
-        file_path = self.file_path_input.text()
+        file_paths = self.input_paths()
         private_key = self.private_key_input.text()
-        if not file_path or not private_key:
+        if not file_paths or not private_key:
             QMessageBox.warning(self, "Warning", "Please provide both file/folder path and private key path.")
             return
-        self.start_worker("sign", file_path, private_key)
+        self.enqueue_jobs("sign", file_paths, private_key)
 
     def verify_file(self):
-        file_path = self.file_path_input.text()
+        file_paths = self.input_paths()
         public_key = self.public_key_input.text()
-        if not file_path or not public_key:
+        if not file_paths or not public_key:
             QMessageBox.warning(self, "Warning", "Please provide both file path and public key path.")
             return
-        self.start_worker("verify", file_path, public_key)
-
-    def start_worker(self, operation, file_path, key_path):
-        self.progress_bar.setValue(0)
-        self.worker = Worker(operation, file_path, key_path)
-        self.worker.progress.connect(self.update_progress)
-        self.worker.finished.connect(self.show_message)
-        self.worker.start()
-
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
-
-    def show_message(self, message):
-        self.progress_bar.setValue(100)
-        QMessageBox.information(self, "Info", message)
+        self.enqueue_jobs("verify", file_paths, public_key)
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.status in ("Queued", "Running")]
+
+    def enqueue_jobs(self, operation, file_paths, key_path):
+        # Deux opérations simultanées sur un même chemin écriraient les mêmes fichiers de signature
+        busy = {os.path.abspath(job.file_path) for job in self.active_jobs()}
+        skipped = [path for path in file_paths if os.path.abspath(path) in busy]
+        for file_path in dict.fromkeys(file_paths):
+            if file_path not in skipped:
+                self.add_job(operation, file_path, key_path)
+        if skipped:
+            QMessageBox.warning(self, "Warning", "Already queued or running:\n" + "\n".join(skipped))
+
+    def add_job(self, operation, file_path, key_path):
+        job_id = self.next_job_id
+        self.next_job_id += 1
+        job = Job(job_id, operation, file_path, key_path, self.fail_fast_input.isChecked())
+        job.signals.started.connect(self.job_started)
+        job.signals.progress.connect(self.job_progress)
+        job.signals.finished.connect(self.job_finished)
+        self.jobs[job_id] = job
+        self.batch.append(job_id)
+
+        row = self.job_table.rowCount()
+        self.job_table.insertRow(row)
+        operation_item = QtWidgets.QTableWidgetItem(operation.capitalize())
+        operation_item.setData(Qt.UserRole, job_id)
+        self.job_table.setItem(row, 0, operation_item)
+        path_item = QtWidgets.QTableWidgetItem(file_path)
+        path_item.setToolTip(file_path)
+        self.job_table.setItem(row, 1, path_item)
+        progress_bar = QProgressBar(self.job_table)
+        progress_bar.setAlignment(Qt.AlignCenter)
+        progress_bar.setValue(0)
+        self.job_table.setCellWidget(row, 2, progress_bar)
+        self.job_table.setItem(row, 3, QtWidgets.QTableWidgetItem(""))
+        self.job_table.setItem(row, 4, QtWidgets.QTableWidgetItem(job.status))
+        cancel_button = QtWidgets.QPushButton("Cancel", self.job_table)
+        cancel_button.clicked.connect(lambda _, job_id=job_id: self.cancel_job(job_id))
+        self.job_table.setCellWidget(row, 5, cancel_button)
+
+        self.job_pool.start(job)
+        self.update_overall_progress()
+
+    def job_row(self, job_id):
+        for row in range(self.job_table.rowCount()):
+            if self.job_table.item(row, 0).data(Qt.UserRole) == job_id:
+                return row
+        return None
+
+    def job_started(self, job_id):
+        job = self.jobs[job_id]
+        job.status = "Running"
+        row = self.job_row(job_id)
+        if row is not None:
+            self.job_table.item(row, 4).setText(job.status)
+
+    def job_progress(self, job_id, percent, throughput):
+        job = self.jobs[job_id]
+        job.percent = percent
+        row = self.job_row(job_id)
+        if row is not None:
+            self.job_table.cellWidget(row, 2).setValue(percent)
+            self.job_table.item(row, 3).setText(format_rate(throughput))
+        self.update_overall_progress()
+
+    def job_finished(self, job_id, status, message):
+        job = self.jobs[job_id]
+        if job.status not in ("Queued", "Running"):
+            return
+        job.status = status
+        if status == "Done":
+            job.percent = 100
+        row = self.job_row(job_id)
+        if row is not None:
+            if status == "Done":
+                self.job_table.cellWidget(row, 2).setValue(100)
+            status_item = self.job_table.item(row, 4)
+            status_item.setText(status)
+            status_item.setToolTip(message)
+            self.job_table.cellWidget(row, 5).setEnabled(False)
+        self.update_overall_progress()
+        if not self.active_jobs():
+            self.show_batch_result(message, job)
+
+    def cancel_job(self, job_id):
+        job = self.jobs[job_id]
+        job.cancel()
+        # Une tâche encore en file est retirée tout de suite ; une tâche en cours s'arrête au prochain bloc
+        if self.job_pool.tryTake(job):
+            self.job_finished(job_id, "Cancelled", "Operation cancelled.")
+
+    def cancel_all_jobs(self):
+        for job in self.active_jobs():
+            self.cancel_job(job.job_id)
+
+    def clear_finished_jobs(self):
+        for row in reversed(range(self.job_table.rowCount())):
+            job_id = self.job_table.item(row, 0).data(Qt.UserRole)
+            if self.jobs[job_id].status not in ("Queued", "Running"):
+                self.job_table.removeRow(row)
+                if job_id not in self.batch:  # Encore compté dans le résumé du lot en cours
+                    del self.jobs[job_id]
+
+    def update_overall_progress(self):
+        jobs = [self.jobs[job_id] for job_id in self.batch if self.jobs[job_id].status != "Cancelled"]
+        if jobs:
+            self.progress_bar.setValue(sum(job.percent for job in jobs) // len(jobs))
+
+    def show_batch_result(self, message, job=None):
+        statuses = [self.jobs[job_id].status for job_id in self.batch]
+        self.batch = []
+        if len(statuses) == 1:
+            box = QMessageBox(QMessageBox.Information, "Info", message, QMessageBox.Ok, self)
+            if job is not None and job.differences:
+                # Liste complète sous "Show Details...", le message n'en cite que quelques-unes
+                box.setDetailedText(differences_report(job.differences))
+            box.exec_()
+            return
+        counts = ", ".join(f"{statuses.count(status)} {status.lower()}"
+                           for status in ("Done", "Failed", "Cancelled") if status in statuses)
+        QMessageBox.information(self, "Info", f"{len(statuses)} jobs finished: {counts}.")
 
     def closeEvent(self, event):
-        """Handle window close event to terminate all processes."""
+        """Handle window close event to cancel pending jobs and terminate all processes."""
+        self.cancel_all_jobs()
         terminate_all_processes()
+        self.job_pool.waitForDone()
         event.accept()  # Continue with the default close behavior
 
 
@@ -0,0 +1,96 @@
+"""Compare la signature et la vérification d'un répertoire en mémoire et en mémoire bornée (tri externe).
+
+Crée un répertoire de nombreux petits fichiers, puis mesure dans un interpréteur neuf, pour chaque mode
+(manifest, tree) et chaque limite (0 = listings en mémoire), le temps, le débit en fichiers/s et le pic
+de RSS. Le cache d'empreintes est ignoré (paranoid) : chaque mesure relit tous les fichiers. Il reste alimenté
+et élagué, dans un fichier du dossier temporaire plutôt que dans celui de l'utilisateur.
+
+Usage:
+    python benchmarks/bench_bounded_memory.py --files 200000 --limits 0 16M 64M
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ds_sign_core as core
+from bench_hash_strategies import parse_size
+from bench_suite import peak_rss_kb
+
+
+def build_tree(path, count, per_dir):
+    for index in range(count):
+        directory = os.path.join(path, f"d{index // per_dir:05d}")
+        if index % per_dir == 0:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f"file_{index:08d}.txt"), "wb") as f:
+            f.write(b"%d\n" % index)
+
+
+def worker_main(args):
+    start = time.perf_counter()
+    if args.worker == "sign":
+        core.sign_directory(args.path, args.private_key, mode=args.mode, paranoid=True, memory_limit=args.limit)
+    else:
+        valid, message = core.verify_directory(args.path, args.public_key, paranoid=True, memory_limit=args.limit)
+        if not valid:
+            raise SystemExit(message)
+    json.dump({"seconds": time.perf_counter() - start, "peak_rss_kb": peak_rss_kb()}, sys.stdout)
+
+
+def measure(operation, mode, limit, path, private_key, public_key):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", operation, "--mode", mode, "--limit", str(limit),
+         "--path", path, "--private-key", private_key, "--public-key", public_key],
+        capture_output=True, text=True,
+        env={**os.environ, "DS_SIGN_CACHE": os.path.join(os.path.dirname(path), "hash_cache.sqlite3")},
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{operation} {mode} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--per-dir", type=int, default=1000, help="files per directory (default: 1000)")
+    parser.add_argument("--limits", nargs="+", default=["0", "16M"], help="memory limits to compare (0 = in memory)")
+    parser.add_argument("--modes", nargs="+", choices=("manifest", "tree"), default=["manifest", "tree"])
+    parser.add_argument("--worker", choices=("sign", "verify"), help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--limit", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--private-key", help=argparse.SUPPRESS)
+    parser.add_argument("--public-key", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker_main(args)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = os.path.join(workdir, "tree")
+        build_tree(tree, args.files, args.per_dir)
+        core.generate_key_pair("bench", os.path.join(workdir, "keys"))
+        private_key = os.path.join(workdir, "keys", "bench_private.pem")
+        public_key = os.path.join(workdir, "keys", "bench_public.pem")
+        print(f"{args.files} files, {args.per_dir} per directory")
+        print(f"{'mode':<9} {'operation':<7} {'limit':>8} {'seconds':>9} {'files/s':>10} {'peak RSS':>10}")
+        for mode in args.modes:
+            for limit_text in args.limits:
+                limit = parse_size(limit_text)
+                for operation in ("sign", "verify"):
+                    result = measure(operation, mode, limit, tree, private_key, public_key)
+                    print(f"{mode:<9} {operation:<7} {limit_text:>8} {result['seconds']:>9.2f} "
+                          f"{args.files / result['seconds']:>10.0f} {(result['peak_rss_kb'] or 0) // 1024:>7} MB")
+            for name in os.listdir(tree):
+                if name in core.SIGNATURE_FILES:
+                    os.remove(os.path.join(tree, name))
+
+
+if __name__ == "__main__":
+    main()
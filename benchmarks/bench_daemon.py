@@ -0,0 +1,96 @@
+"""Compare le débit de signature (fichiers/s) par fichier et via le service de signature local.
+
+Le service est lancé dans un processus séparé sur un socket temporaire (ou 127.0.0.1 avec --tcp) ;
+tout reste sur la machine. Mesure aussi le débit brut en empreintes signées par seconde.
+
+Usage:
+    python benchmarks/bench_daemon.py --files 2000 --size 4096
+    python benchmarks/bench_daemon.py --tcp 127.0.0.1:18765
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ds_sign_core as tool
+import ds_sign_daemon
+
+
+def write_corpus(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"artifact_{i:06d}.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def start_daemon(priv_path, address, env):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "ds_sign_cli.py"), "daemon", "--key", priv_path, "--listen", address],
+        stdout=subprocess.PIPE, text=True, env=env,
+    )
+    ready = json.loads(process.stdout.readline() or "{}")
+    if ready.get("status") != "listening":
+        process.kill()
+        raise SystemExit(f"daemon failed to start: {ready}")
+    return process
+
+
+def report(method, count, action):
+    start = time.perf_counter()
+    action()
+    print(f"{method:<34} {count / (time.perf_counter() - start):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000, help="number of files to sign")
+    parser.add_argument("--size", type=int, default=4096, help="size of each file in bytes")
+    parser.add_argument("--digests", type=int, default=20000, help="digests for the raw signing rate")
+    parser.add_argument("--openssl-files", type=int, default=100,
+                        help="files signed with the OpenSSL backend (one process each)")
+    parser.add_argument("--tcp", metavar="HOST:PORT", help="use localhost TCP instead of a Unix socket")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        priv_path, pub_path = tool.generate_key_pair("bench", os.path.join(workdir, "keys"))
+        paths = write_corpus(workdir, args.files, args.size)
+        address = args.tcp or os.path.join(workdir, "signing.sock")
+        env = dict(os.environ, DS_SIGN_DAEMON_TOKEN="bench-token") if args.tcp else dict(os.environ)
+        print(f"{args.files} files of {args.size} bytes, daemon on {address}")
+        print(f"{'method':<34} {'per second':>10}")
+
+        openssl_paths = paths[:args.openssl_files]
+        if openssl_paths:
+            report("openssl process per file", len(openssl_paths),
+                   lambda: [tool.sign_file_standalone(p, priv_path, backend="openssl") for p in openssl_paths])
+        report("native, key cached in process", len(paths),
+               lambda: [tool.sign_file_standalone(p, priv_path, backend="native") for p in paths])
+
+        daemon = start_daemon(priv_path, address, env)
+        try:
+            with ds_sign_daemon.SigningClient(address, token="bench-token" if args.tcp else None) as client:
+                report("daemon, batched digests", len(paths), lambda: client.sign_files(paths))
+                digests = [os.urandom(32) for _ in range(args.digests)]
+                report("daemon, raw digests/s", len(digests), lambda: client.sign_digests(digests))
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+        # Les signatures du service sont des fichiers .signed ordinaires
+        for path in paths[:20]:
+            assert tool.verify_file_standalone(path, pub_path, path + ".signed")
+        assert tool.verify_file_standalone(paths[0], os.path.dirname(pub_path), paths[0] + ".signed")
+        print("daemon signatures verify: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Mesure le débit (Mo/s) de chaque stratégie de hachage de `calculate_hash`, puis de chaque algorithme.
+
+Les fichiers sont relus depuis le cache de pages : le test mesure le coût CPU et les copies,
+pas la vitesse du disque. Sur un processeur 64 bits sans extensions SHA, SHA-512 et BLAKE2b
+sont en général plus rapides que SHA-256 ; avec les extensions SHA (SHA-NI), SHA-256 reprend l'avantage.
+
+Usage:
+    python benchmarks/bench_hash_strategies.py --sizes 4K 1M 64M 512M --repeat 3
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ds_sign_core as core
+
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def legacy_hash(file_path):
+    """Boucle d'origine : lectures de 4096 octets, un nouvel objet bytes par bloc."""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while chunk := file.read(4096):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+def best_rate(func, size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return size / best / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["4K", "1M", "64M", "256M"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--buffer", default=None, help="buffer size (default: DS_SIGN_HASH_BUFFER or 1M)")
+    args = parser.parse_args()
+    buffer_size = parse_size(args.buffer) if args.buffer else core.HASH_BUFFER_SIZE
+
+    strategies = ["legacy", "read", "readinto", "mmap", "auto"]
+    print(f"buffer: {buffer_size} bytes, best of {args.repeat} (MB/s)")
+    with tempfile.TemporaryDirectory() as workdir:
+        samples = []
+        for size_text in args.sizes:
+            size = parse_size(size_text)
+            path = os.path.join(workdir, f"sample_{size}.bin")
+            with open(path, "wb") as f:
+                remaining = size
+                while remaining:
+                    block = os.urandom(min(remaining, 16 * 1024 ** 2))
+                    f.write(block)
+                    remaining -= len(block)
+            samples.append((size_text, size, path))
+
+        print(f"{'size':>8} " + " ".join(f"{name:>10}" for name in strategies))
+        for size_text, size, path in samples:
+            expected = legacy_hash(path)
+            rates = []
+            for name in strategies:
+                if name == "legacy":
+                    func = lambda: legacy_hash(path)
+                else:
+                    func = lambda name=name: core.calculate_hash(path, strategy=name, buffer_size=buffer_size)
+                    assert func() == expected, f"{name} digest differs"
+                rates.append(best_rate(func, max(size, 1), args.repeat))
+            print(f"{size_text:>8} " + " ".join(f"{rate:>10.0f}" for rate in rates))
+
+        # Débit par algorithme d'empreinte (--digest), avec la stratégie par défaut
+        print()
+        print(f"{'size':>8} " + " ".join(f"{name:>10}" for name in core.DIGEST_ALGORITHMS))
+        for size_text, size, path in samples:
+            rates = []
+            for algorithm in core.DIGEST_ALGORITHMS:
+                func = lambda algorithm=algorithm: core.calculate_hash(path, buffer_size=buffer_size,
+                                                                       algorithm=algorithm)
+                rates.append(best_rate(func, max(size, 1), args.repeat))
+            print(f"{size_text:>8} " + " ".join(f"{rate:>10.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Mesure le débit (Mo/s) du hachage segmenté d'un gros fichier selon le nombre de threads.
+
+Compare `calculate_hash` (un seul cœur) à `segment_digests` avec 1, 2, 4... threads jusqu'au nombre
+de cœurs. Le fichier est relu depuis le cache de pages après une première passe : le test mesure la
+montée en charge CPU ; pour mesurer le disque, passer un fichier existant plus gros que la mémoire (--file).
+
+Usage:
+    python benchmarks/bench_segmented.py --size 4G --segment 64M
+    python benchmarks/bench_segmented.py --file /srv/images/vm.qcow2 --repeat 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ds_sign_core as core
+from bench_hash_strategies import parse_size
+
+
+def best_rate(func, size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return size / best / 1024 ** 2
+
+
+def worker_counts(limit):
+    count = 1
+    while count < limit:
+        yield count
+        count *= 2
+    yield limit
+
+
+def run(path, segment_size, repeat, algorithm):
+    size = os.path.getsize(path)
+    print(f"{size / 1024 ** 2:.0f} MB, segments of {segment_size // 1024 ** 2} MB, {algorithm}, "
+          f"best of {repeat} (MB/s)")
+    print(f"{'method':<28} {'MB/s':>10}")
+    core.calculate_hash(path, algorithm=algorithm)  # Première passe : le fichier entre dans le cache de pages
+    rate = best_rate(lambda: core.calculate_hash(path, algorithm=algorithm), size, repeat)
+    print(f"{'calculate_hash':<28} {rate:>10.0f}")
+    for workers in worker_counts(os.cpu_count() or 1):
+        rate = best_rate(lambda: core.segment_digests(path, segment_size, workers, algorithm=algorithm), size, repeat)
+        print(f"{f'segmented, {workers} thread(s)':<28} {rate:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="1G", help="size of the generated file (default: 1G)")
+    parser.add_argument("--file", help="hash this existing file instead of a generated one")
+    parser.add_argument("--segment", default=None, help="segment size (default: DS_SIGN_SEGMENT_SIZE or 64M)")
+    parser.add_argument("--digest", choices=core.DIGEST_ALGORITHMS, default="sha256")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    segment_size = parse_size(args.segment) if args.segment else core.SEGMENT_SIZE
+
+    if args.file:
+        run(args.file, segment_size, args.repeat, args.digest)
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "sample.bin")
+        with open(path, "wb") as f:
+            remaining = parse_size(args.size)
+            while remaining:
+                block = os.urandom(min(remaining, 16 * 1024 ** 2))
+                f.write(block)
+                remaining -= len(block)
+        run(path, segment_size, args.repeat, args.digest)
+
+
+if __name__ == "__main__":
+    main()
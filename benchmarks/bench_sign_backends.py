@@ -0,0 +1,84 @@
+"""Compare le débit (fichiers/s) des moteurs de signature natif et OpenSSL.
+
+Usage:
+    python benchmarks/bench_sign_backends.py --files 500 --size 4096
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ds_sign_core as tool
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+
+def write_keys(directory):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    priv_path = os.path.join(directory, "bench_private.pem")
+    pub_path = os.path.join(directory, "bench_public.pem")
+    with open(priv_path, "wb") as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.TraditionalOpenSSL,
+                                          serialization.NoEncryption()))
+    with open(pub_path, "wb") as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+    return priv_path, pub_path
+
+
+def write_corpus(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"artifact_{i:06d}.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def run_backend(backend, paths, priv_path, pub_path):
+    start = time.perf_counter()
+    for path in paths:
+        tool.sign_file_standalone(path, priv_path, backend=backend)
+    sign_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for path in paths:
+        if not tool.verify_file_standalone(path, pub_path, path + ".signed", backend=backend):
+            raise SystemExit(f"{backend}: verification failed for {path}")
+    verify_elapsed = time.perf_counter() - start
+    return len(paths) / sign_elapsed, len(paths) / verify_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="number of files to sign")
+    parser.add_argument("--size", type=int, default=4096, help="size of each file in bytes")
+    parser.add_argument("--backends", nargs="+", default=["native", "openssl"],
+                        choices=["native", "openssl"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        priv_path, pub_path = write_keys(workdir)
+        paths = write_corpus(workdir, args.files, args.size)
+        print(f"{args.files} files of {args.size} bytes")
+        print(f"{'backend':<10} {'sign files/s':>14} {'verify files/s':>16}")
+        for backend in args.backends:
+            sign_rate, verify_rate = run_backend(backend, paths, priv_path, pub_path)
+            print(f"{backend:<10} {sign_rate:>14.1f} {verify_rate:>16.1f}")
+
+        # Les signatures natives doivent rester lisibles par OpenSSL et inversement
+        if set(args.backends) == {"native", "openssl"}:
+            tool.sign_file_standalone(paths[0], priv_path, backend="native")
+            assert tool.verify_file_standalone(paths[0], pub_path, paths[0] + ".signed", backend="openssl")
+            tool.sign_file_standalone(paths[0], priv_path, backend="openssl")
+            assert tool.verify_file_standalone(paths[0], pub_path, paths[0] + ".signed", backend="native")
+            print("cross-backend signatures: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Suite de benchmarks reproductible pour le hachage, l'arborescence, la signature et la vérification.
+
+Génère des corpus synthétiques (beaucoup de petits fichiers, quelques très gros fichiers,
+arborescence profonde, dossier très large), mesure chaque opération dans un interpréteur neuf
+(temps, fichiers/s, Mo/s, pic de RSS) et enregistre les résultats en JSON pour comparer deux runs.
+Fonctionne hors ligne, sans interface graphique.
+
+Usage:
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --output after.json --compare before.json
+    python benchmarks/bench_suite.py --corpora tiny wide --operations hash tree --scale 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Corpus à l'échelle 1 ; `scale` agit sur le nombre de fichiers ou sur leur taille
+CORPORA = {
+    "tiny": {"files": 20000, "size": 1024, "layout": "spread", "scale": "files"},
+    "huge": {"files": 4, "size": 256 * 1024 ** 2, "layout": "flat", "scale": "size"},
+    "deep": {"files": 400, "size": 4096, "layout": "deep", "scale": "files"},
+    "wide": {"files": 50000, "size": 256, "layout": "flat", "scale": "files"},
+}
+DEEP_LEVELS = 200
+
+OPERATIONS = (
+    "hash",                 # calculate_hash sur chaque fichier
+    "tree",                 # generate_tree
+    "sign-dir-tree",
+    "verify-dir-tree",
+    "sign-dir-manifest",    # cache ignoré (paranoid)
+    "verify-dir-manifest",
+    "resign-dir-manifest",  # re-signature avec le cache chaud
+    "sign-dir-merkle",
+    "sign-files",           # sign_file_standalone sur chaque fichier
+    "verify-files",         # cache des vérifications ignoré (paranoid)
+    "reverify-files",       # vérification avec le cache des vérifications chaud
+)
+
+
+def build_corpus(path, spec, scale, seed):
+    """Crée un corpus déterministe (contenu et noms dépendent uniquement de `seed`)."""
+    rng = random.Random(seed)
+    count = max(1, int(spec["files"] * scale)) if spec["scale"] == "files" else spec["files"]
+    size = max(1, int(spec["size"] * scale)) if spec["scale"] == "size" else spec["size"]
+    for index in range(count):
+        if spec["layout"] == "spread":
+            directory = os.path.join(path, f"d{index % 100:03d}", f"s{index % 7}")
+        elif spec["layout"] == "deep":
+            directory = os.path.join(path, *[f"l{level}" for level in range(index % DEEP_LEVELS + 1)])
+        else:
+            directory = path
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{index:07d}.bin"), "wb") as f:
+            remaining = size
+            while remaining:
+                length = min(remaining, 8 * 1024 ** 2)
+                block = rng.getrandbits(8 * length).to_bytes(length, "little")  # = randbytes(), absent en 3.8
+                f.write(block)
+                remaining -= len(block)
+
+
+def _remove_signatures(corpus_path, files):
+    import ds_sign_core as core
+    for path in files:
+        for suffix in (".signed", ".signed" + core.KEY_ID_SUFFIX):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    for name in core.SIGNATURE_FILES:
+        target = os.path.join(corpus_path, name)
+        if os.path.exists(target):
+            os.remove(target)
+
+
+def run_operation(operation, corpus_path, private_key, public_key):
+    """Exécute une opération dans le processus courant et retourne (fichiers, octets, secondes).
+
+    Les vérifications signent d'abord le corpus (hors mesure) et chaque opération supprime ses
+    fichiers de signature, pour que les opérations restent indépendantes les unes des autres.
+    """
+    import ds_sign_core as core
+    files = [os.path.join(corpus_path, *rel.split("/")) for rel in core.list_directory_files(corpus_path)]
+    total_bytes = sum(os.path.getsize(p) for p in files)
+    if operation == "verify-dir-tree":
+        core.sign_directory(corpus_path, private_key, mode="tree")
+    elif operation in ("verify-dir-manifest", "resign-dir-manifest"):
+        core.sign_directory(corpus_path, private_key, mode="manifest")
+    elif operation in ("verify-files", "reverify-files"):
+        for path in files:
+            core.sign_file_standalone(path, private_key)
+    if operation == "reverify-files":
+        core.VERIFY_CACHE_MIN_SIZE = 0  # Mesure le cache lui-même, y compris pour les petits fichiers
+        for path in files:
+            core.verify_file_standalone(path, public_key, path + ".signed")
+
+    start = time.perf_counter()
+    if operation == "hash":
+        for path in files:
+            core.calculate_hash(path)
+    elif operation == "tree":
+        output = os.path.join(os.path.dirname(corpus_path), "bench_dir_file")
+        open(output, "w").close()
+        core.generate_tree(corpus_path, output)
+        os.remove(output)
+    elif operation == "sign-dir-tree":
+        core.sign_directory(corpus_path, private_key, mode="tree")
+    elif operation == "sign-dir-manifest":
+        core.sign_directory(corpus_path, private_key, mode="manifest", paranoid=True)
+    elif operation == "resign-dir-manifest":
+        core.sign_directory(corpus_path, private_key, mode="manifest")
+    elif operation == "sign-dir-merkle":
+        core.sign_directory(corpus_path, private_key, mode="merkle", paranoid=True)
+    elif operation in ("verify-dir-tree", "verify-dir-manifest"):
+        valid, message = core.verify_directory(corpus_path, public_key, paranoid=True)
+        assert valid, message
+    elif operation == "sign-files":
+        for path in files:
+            core.sign_file_standalone(path, private_key)
+    elif operation == "verify-files":
+        for path in files:
+            assert core.verify_file_standalone(path, public_key, path + ".signed", paranoid=True)
+    elif operation == "reverify-files":
+        for path in files:
+            assert core.verify_file_standalone(path, public_key, path + ".signed")
+    elapsed = time.perf_counter() - start
+
+    _remove_signatures(corpus_path, files)
+    return len(files), total_bytes, elapsed
+
+
+def peak_rss_kb():
+    # VmHWM appartient à l'espace mémoire courant ; ru_maxrss, lui, survit à exec et
+    # refléterait le pic du processus parent
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def worker_main(args):
+    files, total_bytes, elapsed = run_operation(args.worker, args.corpus_path, args.private_key, args.public_key)
+    json.dump({"files": files, "bytes": total_bytes, "seconds": elapsed, "peak_rss_kb": peak_rss_kb()}, sys.stdout)
+
+
+def measure(operation, corpus_path, private_key, public_key, env):
+    # Un interpréteur neuf par mesure : pic de RSS propre à l'opération, pas de cache de clés partagé
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", operation, "--corpus-path", corpus_path,
+         "--private-key", private_key, "--public-key", public_key],
+        capture_output=True, text=True, env=env,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"{operation} failed on {corpus_path}:\n{completed.stderr}")
+    return json.loads(completed.stdout)
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["corpus"], r["operation"]): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {baseline_path} (wall time, negative is faster)")
+    for result in current["results"]:
+        before = baseline.get((result["corpus"], result["operation"]))
+        if not before or not before["seconds"]:
+            continue
+        delta = (result["seconds"] - before["seconds"]) * 100 / before["seconds"]
+        print(f"{result['corpus']:<6} {result['operation']:<20} {before['seconds']:>9.3f}s -> "
+              f"{result['seconds']:>9.3f}s  {delta:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpora", nargs="+", choices=sorted(CORPORA), default=sorted(CORPORA))
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply corpus file counts")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workdir", help="where to build corpora (default: a temporary directory)")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a previous JSON result")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus-path", help=argparse.SUPPRESS)
+    parser.add_argument("--private-key", help=argparse.SUPPRESS)
+    parser.add_argument("--public-key", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker_main(args)
+
+    import ds_sign_core as core
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ds_sign_bench_")
+    # Les caches restent dans le dossier de travail, jamais dans ceux de l'utilisateur
+    env = dict(os.environ, DS_SIGN_CACHE=os.path.join(workdir, "hash_cache.sqlite3"),
+               DS_SIGN_VERIFY_CACHE=os.path.join(workdir, "verify_cache.sqlite3"))
+    private_key, public_key = core.generate_key_pair("bench", os.path.join(workdir, "keys"))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    print(f"{'corpus':<6} {'operation':<20} {'files':>8} {'seconds':>9} {'files/s':>10} {'MB/s':>9} {'peak RSS':>10}")
+    try:
+        for corpus in args.corpora:
+            corpus_path = os.path.join(workdir, corpus)
+            if os.path.exists(corpus_path):
+                shutil.rmtree(corpus_path)
+            build_corpus(corpus_path, CORPORA[corpus], args.scale, args.seed)
+            for operation in args.operations:
+                m = measure(operation, corpus_path, private_key, public_key, env)
+                result = {
+                    "corpus": corpus,
+                    "operation": operation,
+                    "files": m["files"],
+                    "bytes": m["bytes"],
+                    "seconds": round(m["seconds"], 6),
+                    "files_per_second": round(m["files"] / m["seconds"], 1) if m["seconds"] else None,
+                    "mb_per_second": round(m["bytes"] / 1024 ** 2 / m["seconds"], 1) if m["seconds"] else None,
+                    "peak_rss_kb": m["peak_rss_kb"],
+                }
+                report["results"].append(result)
+                print(f"{corpus:<6} {operation:<20} {result['files']:>8} {result['seconds']:>9.3f} "
+                      f"{result['files_per_second'] or 0:>10.0f} {result['mb_per_second'] or 0:>9.1f} "
+                      f"{(result['peak_rss_kb'] or 0) // 1024:>7} MB")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
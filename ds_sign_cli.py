@@ -0,0 +1,502 @@
+"""Mode ligne de commande de DS-Sign-Tool, utilisable sans affichage (CI, serveurs).
+
+Ce module n'importe jamais Qt. Exemples :
+
+    python DS_Sign_Tool.py keygen release
+    python DS_Sign_Tool.py sign "dist/**/*.whl" --key keys/release_private.pem --jobs 16
+    find dist -type f | python DS_Sign_Tool.py verify - --key keys/release_public.pem
+    python DS_Sign_Tool.py sign-dir build/ --key keys/release_private.pem --mode manifest
+    python DS_Sign_Tool.py sign-archive dist/*.tar.xz --key keys/release_private.pem
+    tar c data | zstd | python DS_Sign_Tool.py sign-stream --key keys/release_private.pem \
+        --signature data.tar.zst.signed --output - > data.tar.zst
+    python DS_Sign_Tool.py watch shared/ --key keys/release_private.pem --mode manifest
+
+Chaque commande affiche un résumé JSON (statut et durée par fichier) et retourne 0 si tout a réussi,
+1 sinon.
+"""
+import argparse
+import json
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from functools import partial
+
+import ds_sign_core as core
+import ds_sign_profile
+from ds_sign_metrics import metrics
+
+
+# Développe les motifs glob ("**" compris) ; "-" lit une liste de chemins sur l'entrée standard
+def expand_paths(patterns, stdin=None):
+    paths = []
+    for pattern in patterns:
+        if pattern == "-":
+            paths.extend(line.rstrip("\r\n") for line in (stdin or sys.stdin) if line.strip())
+        elif any(char in pattern for char in "*?["):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    return list(dict.fromkeys(paths))
+
+
+# Une tâche retourne (statut, message) ou (statut, message, détails) ; les détails (dictionnaire)
+# sont ajoutés au résultat JSON
+def _timed(path, action):
+    profile = ds_sign_profile.job_profile()
+    start = time.perf_counter()
+    details = None
+    try:
+        status, message, *extra = action() if profile is None else profile.runcall(action)
+        details = extra[0] if extra else None
+    except Exception as e:
+        status, message = "error", str(e)
+    result = {"path": path, "status": status, "message": message, "seconds": round(time.perf_counter() - start, 6)}
+    if details:
+        result.update(details)
+    # Mesures et profil sont rapatriés par run_jobs, y compris depuis un processus de travail
+    if metrics.enabled:
+        result["metrics"] = metrics.drain()
+    if profile is not None:
+        result["profile"] = ds_sign_profile.job_stats(profile)
+    return result
+
+
+def collect_worker_data(result):
+    data = result.pop("metrics", None)
+    if data is not None:
+        metrics.merge(data)
+    stats = result.pop("profile", None)
+    if stats is not None:
+        ds_sign_profile.merge_job_stats(stats)
+    return result
+
+
+def export_metrics(args):
+    if args.metrics:
+        metrics.write_json(args.metrics)
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+
+
+# Les tâches sont des fonctions de module pour pouvoir être envoyées aux processus du pool
+def sign_job(path, key, backend=None, digest=None, segmented=None):
+    def action():
+        if not os.path.isfile(path):
+            return "error", "Not a file."
+        return "ok", core.sign_file_standalone(path, key, backend=backend, algorithm=digest, segmented=segmented)
+    return _timed(path, action)
+
+
+def verify_job(path, key, backend=None, paranoid=None):
+    def action():
+        signed_file = path + ".signed"
+        if not os.path.exists(signed_file):
+            return "error", "Missing signature file."
+        if core.verify_file_standalone(path, key, signed_file, backend=backend, paranoid=paranoid):
+            return "ok", "Verified OK"
+        return "failed", "Signature invalid."
+    return _timed(path, action)
+
+
+def sign_dir_job(path, key, mode=None, max_workers=None, paranoid=None, digest=None, memory_limit=None,
+                 backend=None):
+    def action():
+        if not os.path.isdir(path):
+            return "error", "Not a directory."
+        _, signature = core.sign_directory(path, key, mode=mode, max_workers=max_workers, paranoid=paranoid,
+                                           algorithm=digest, memory_limit=memory_limit, backend=backend)
+        return "ok", signature
+    return _timed(path, action)
+
+
+def verify_dir_job(path, key, max_workers=None, paranoid=None, fail_fast=False, memory_limit=None, backend=None):
+    def action():
+        if not os.path.isdir(path):
+            return "error", "Not a directory."
+        differences = {}
+        valid, message = core.verify_directory(path, key, max_workers=max_workers, paranoid=paranoid,
+                                               fail_fast=fail_fast, differences=differences,
+                                               memory_limit=memory_limit, backend=backend)
+        # Listes complètes des entrées modifiées, manquantes et ajoutées (le message n'en cite que quelques-unes)
+        return ("ok" if valid else "failed"), message, {"differences": differences} if differences else None
+    return _timed(path, action)
+
+
+def sign_archive_job(path, key, backend=None, digest=None):
+    def action():
+        if not os.path.isfile(path):
+            return "error", "Not a file."
+        _, signature = core.sign_archive(path, key, backend=backend, algorithm=digest)
+        return "ok", signature
+    return _timed(path, action)
+
+
+def verify_archive_job(path, key, backend=None, fail_fast=False):
+    def action():
+        if not os.path.isfile(path):
+            return "error", "Not a file."
+        valid, message = core.verify_archive(path, key, backend=backend, fail_fast=fail_fast)
+        return ("ok" if valid else "failed"), message
+    return _timed(path, action)
+
+
+def stream_job(command, key, signature, input_path="-", output_path=None, backend=None, digest=None):
+    """Signe ou vérifie un flux (entrée standard par défaut), recopié dans `output_path` ("-" : sortie standard)."""
+    def action():
+        source = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+        target = None
+        if output_path:
+            target = sys.stdout.buffer if output_path == "-" else open(output_path, "wb")
+        try:
+            if command == "sign-stream":
+                _, size = core.sign_stream(source, key, signature, target, backend, algorithm=digest)
+                return "ok", f"{signature} ({size} bytes)"
+            valid, size = core.verify_stream(source, key, signature, target, backend)
+            return ("ok", f"Verified OK ({size} bytes)") if valid else ("failed", "Signature invalid.")
+        finally:
+            for stream, standard in ((source, sys.stdin.buffer), (target, sys.stdout.buffer)):
+                if stream is not None and stream is not standard:
+                    stream.close()
+    return _timed(input_path, action)
+
+
+def batch_results(results, elapsed):
+    # Les fichiers d'un catalogue ou envoyés au service sont traités en lot : la durée est répartie uniformément
+    share = round(elapsed / len(results), 6) if results else 0.0
+    return [{"path": path, "status": status, "message": message, "seconds": share}
+            for path, status, message in results]
+
+
+def skipped_results(items):
+    return [{"path": item, "status": "error", "message": "Skipped after the first failure.", "seconds": None}
+            for item in items]
+
+
+def daemon_sign(paths, key, address, jobs):
+    """Signe les fichiers via le service de signature : hachage local, seules les empreintes sont envoyées."""
+    import ds_sign_daemon
+    files = [path for path in paths if os.path.isfile(path)]
+    outcomes = {path: ("error", "Not a file.") for path in paths}
+    # Comme avec run_jobs, un fichier illisible n'est compté en erreur que pour lui-même
+    errors = {}
+    try:
+        with ds_sign_daemon.SigningClient(address) as client:
+            client.sign_files(files, ds_sign_daemon.resolve_key_id(key), jobs, errors=errors)
+        outcomes.update((path, ("ok", path + ".signed")) for path in files)
+        outcomes.update((path, ("error", str(error) or type(error).__name__)) for path, error in errors.items())
+    except Exception as e:
+        outcomes.update((path, ("error", str(e))) for path in files)
+    return [(path, *outcomes[path]) for path in paths]
+
+
+def run_jobs(job, items, jobs, timeout=None, fail_fast=False):
+    """Exécute `job` sur chaque élément via un ordonnanceur de `jobs` processus (en ligne si jobs == 1).
+
+    Avec `fail_fast`, les éléments restants ne sont pas traités après le premier échec.
+    """
+    results = []
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            results.append(collect_worker_data(job(item)))
+            if fail_fast and results[-1]["status"] != "ok":
+                break
+        return results + skipped_results(items[len(results):])
+    # Regrouper les petits fichiers limite le coût des échanges entre processus
+    chunksize = max(1, min(64, len(items) // (jobs * 4)))
+    with core.JobScheduler(jobs, use_processes=True) as scheduler:
+        for item, outcome in scheduler.map(job, items, timeout=timeout, chunksize=chunksize):
+            if isinstance(outcome, Exception):
+                outcome = {"path": item, "status": "error", "message": str(outcome) or type(outcome).__name__,
+                           "seconds": None}
+            results.append(collect_worker_data(outcome))
+            if fail_fast and outcome["status"] != "ok":
+                scheduler.cancel_pending()
+                break
+    return results + skipped_results(items[len(results):])
+
+
+def summarize(command, jobs, results, elapsed):
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "failed", "error")}
+    return {
+        "command": command,
+        "jobs": jobs,
+        "total": len(results),
+        **counts,
+        "seconds": round(elapsed, 6),
+        "items_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "results": results,
+    }
+
+
+def print_summary(summary, output_format, stream=None):
+    stream = stream or sys.stdout
+    if output_format == "json":
+        json.dump(summary, stream, indent=2, ensure_ascii=False)
+        stream.write("\n")
+        return
+    for result in summary.get("results", []):
+        seconds = "-" if result["seconds"] is None else f"{result['seconds']:.3f}s"
+        stream.write(f"{result['status'].upper():<6} {result['path']} ({seconds}) {result['message']}\n")
+    stream.write(f"{summary['ok']}/{summary['total']} ok in {summary['seconds']:.3f}s\n")
+
+
+def parse_size(text):
+    """Taille en octets, avec un suffixe K, M ou G facultatif."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = text.strip().upper()
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="DS-Sign-Tool", description="Sign and verify files without the GUI.")
+    parser.add_argument("--format", choices=("json", "text"), default="json", help="summary format (default: json)")
+    parser.add_argument("--metrics", metavar="FILE", help="write phase timings, counters and latency histograms "
+                                                          "to this JSON file")
+    parser.add_argument("--prometheus", metavar="FILE", help="write the same metrics in Prometheus text format "
+                                                             "(for node_exporter's textfile collector)")
+    parser.add_argument("--profile", metavar="FILE", help="profile the run: pstats to FILE, hottest functions to "
+                                                          "FILE.txt, sampled stacks to FILE.folded")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub, key_help, directory=False, optional_paths=False):
+        sub.add_argument("paths", nargs="*" if optional_paths else "+",
+                         help="paths or glob patterns ('-' reads one path per line from stdin)")
+        sub.add_argument("--key", required=True, help=key_help)
+        sub.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                         help="number of parallel workers (default: CPU count)")
+        sub.add_argument("--backend", choices=core.SIGN_BACKENDS, default=None)
+        sub.add_argument("--timeout", type=float, default=None,
+                         help="seconds to wait for each job (or batch of small files) before reporting an error")
+        if directory:
+            sub.add_argument("--paranoid", action="store_true", help="ignore the hash cache")
+
+    def add_fail_fast(sub):
+        sub.add_argument("--fail-fast", action="store_true",
+                         help="stop at the first mismatch instead of checking everything")
+
+    def add_digest(sub):
+        sub.add_argument("--digest", choices=core.DIGEST_ALGORITHMS, default=None,
+                         help="digest algorithm, recorded next to the signature (default: the key's preference, "
+                              "then DS_SIGN_DIGEST or sha256; blake2b needs an EC key)")
+
+    sign = subparsers.add_parser("sign", help="sign files")
+    add_common(sign, "private key (PEM)")
+    verify = subparsers.add_parser("verify", help="verify files against their .signed signature")
+    add_common(verify, "public key (PEM), or a key directory to pick each key from the recorded key ID",
+               optional_paths=True)
+    add_fail_fast(verify)
+    verify.add_argument("--paranoid", action="store_true",
+                        help="ignore the verification cache and reread every file")
+    for sub in (sign, verify):
+        sub.add_argument("--catalog", help="store/read signatures in this catalog file instead of .signed files "
+                                           "(verify without paths checks every catalog entry)")
+        sub.add_argument("--root", help="directory catalog paths are relative to (default: the catalog's folder)")
+    sign.add_argument("--daemon", nargs="?", const="", metavar="ADDRESS",
+                      help="send digests to a running signing daemon (default address: DS_SIGN_DAEMON); "
+                           "--key then names the key to use: a PEM file or a key ID")
+    add_digest(sign)
+    sign.add_argument("--segmented", action="store_true", default=None,
+                      help="hash each file as fixed-size segments in parallel and sign their root (for multi-GB "
+                           "files; default: above DS_SIGN_SEGMENT_THRESHOLD bytes). verify detects it.")
+    sign_dir = subparsers.add_parser("sign-dir", help="sign directories")
+    add_common(sign_dir, "private key (PEM)", directory=True)
+    sign_dir.add_argument("--mode", choices=core.DIRECTORY_MODES, default=None)
+    add_digest(sign_dir)
+    verify_dir = subparsers.add_parser("verify-dir", help="verify signed directories")
+    add_common(verify_dir, "public key (PEM), or a key directory to pick each key from the recorded key ID",
+               directory=True)
+    add_fail_fast(verify_dir)
+    for sub in (sign_dir, verify_dir):
+        sub.add_argument("--memory-limit", type=parse_size, default=None, metavar="SIZE",
+                         help="sort manifest and tree listings on disk beyond this much memory, e.g. 256M "
+                              "(default: DS_SIGN_MEMORY_LIMIT; 0 keeps them in memory)")
+
+    sign_archive = subparsers.add_parser("sign-archive", help="sign the members of zip/tar archives without "
+                                                               "extracting them (writes ARCHIVE.manifest)")
+    add_common(sign_archive, "private key (PEM)")
+    add_digest(sign_archive)
+    verify_archive = subparsers.add_parser("verify-archive", help="verify archive members against ARCHIVE.manifest")
+    add_common(verify_archive, "public key (PEM), or a key directory to pick each key from the recorded key ID")
+    add_fail_fast(verify_archive)
+
+    for command, help_text, key_help in (
+            ("sign-stream", "sign data read from stdin (or --input) as it streams through", "private key (PEM)"),
+            ("verify-stream", "verify data read from stdin (or --input) against a signature",
+             "public key (PEM), or a key directory to pick the key from the recorded key ID")):
+        stream = subparsers.add_parser(command, help=help_text)
+        stream.add_argument("--key", required=True, help=key_help)
+        stream.add_argument("--signature", required=True, help="signature file to write or check")
+        stream.add_argument("--input", default="-", help="file or named pipe to read (default: stdin)")
+        stream.add_argument("--output", help="copy the data to this file as it is read ('-' for stdout; the "
+                                             "summary then goes to stderr). With verify-stream, the copy is "
+                                             "only trustworthy once the command succeeds.")
+        stream.add_argument("--backend", choices=core.SIGN_BACKENDS, default=None)
+        if command == "sign-stream":
+            add_digest(stream)
+
+    watch = subparsers.add_parser("watch", help="keep a directory signed as its files change (until Ctrl+C)")
+    watch.add_argument("directory")
+    watch.add_argument("--key", required=True, help="private key (PEM)")
+    watch.add_argument("--mode", choices=core.DIRECTORY_MODES, default=None)
+    watch.add_argument("--debounce", type=float, default=None,
+                       help="seconds without changes before re-signing (default: DS_SIGN_WATCH_DEBOUNCE or 1)")
+    watch.add_argument("--poll", type=float, default=None, metavar="SECONDS",
+                       help="compare file metadata every SECONDS instead of using inotify")
+    watch.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                       help="number of threads hashing changed files (default: CPU count)")
+    add_digest(watch)
+
+    daemon = subparsers.add_parser("daemon", help="serve signatures of precomputed digests (until Ctrl+C)")
+    daemon.add_argument("--key", required=True, action="append",
+                        help="private key (PEM) or key directory to load; repeat for several keys")
+    daemon.add_argument("--listen", default=None,
+                        help="Unix socket path or 127.0.0.1:PORT (default: DS_SIGN_DAEMON or ~/.ds_sign_tool/signing.sock)")
+
+    keygen = subparsers.add_parser("keygen", help="generate a key pair")
+    keygen.add_argument("name")
+    keygen.add_argument("--dir", default=core.KEY_DIR, help=f"output directory (default: {core.KEY_DIR})")
+    keygen.add_argument("--rsa", type=int, metavar="BITS", help="generate an RSA key instead of EC prime256v1")
+    keygen.add_argument("--backend", choices=core.SIGN_BACKENDS, default=None)
+    keygen.add_argument("--digest", choices=core.DIGEST_ALGORITHMS, default=None,
+                        help="digest algorithm this key signs with by default (recorded in PRIVATE_KEY.digest)")
+    # Noms des sous-commandes : DS_Sign_Tool.py s'en sert pour choisir entre la CLI et l'interface
+    parser.commands = tuple(subparsers.choices)
+    return parser
+
+
+def main(argv=None):
+    multiprocessing.freeze_support()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.metrics or args.prometheus:
+        os.environ["DS_SIGN_METRICS"] = "1"  # Pour les processus de travail lancés par spawn
+        metrics.enable()
+        metrics.reset()
+    profiler = ds_sign_profile.start_profiler() if args.profile else None
+    try:
+        return run_command(parser, args)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            label = " ".join(sys.argv[1:] if argv is None else argv)
+            written = profiler.write(args.profile, label)
+            # La sortie standard porte le résumé JSON (ou les données de sign-stream) : message sur stderr
+            print(f"Profile written to {', '.join(written)}", file=sys.stderr)
+        if metrics.enabled:
+            export_metrics(args)
+
+
+def run_command(parser, args):
+
+    if args.command == "keygen":
+        try:
+            priv_key, pub_key = core.generate_key_pair(args.name, args.dir, args.rsa, args.backend, args.digest)
+        except Exception as e:
+            print(json.dumps({"command": "keygen", "status": "error", "message": str(e)}))
+            return 1
+        print(json.dumps({"command": "keygen", "status": "ok", "private_key": priv_key, "public_key": pub_key}))
+        return 0
+
+    if args.command == "watch":
+        import ds_sign_watch
+
+        def on_signed(result):
+            # Une ligne JSON par signature, pour suivre le flux avec `jq` ou un collecteur de logs
+            print(json.dumps(result), flush=True)
+            if metrics.enabled:
+                export_metrics(args)  # Les fichiers de métriques suivent chaque re-signature
+        try:
+            ds_sign_watch.watch_directory(args.directory, args.key, args.mode, args.debounce, args.poll,
+                                          use_inotify=False if args.poll else None, max_workers=max(1, args.jobs),
+                                          on_signed=on_signed, algorithm=args.digest)
+        except KeyboardInterrupt:
+            return 0
+        except Exception as e:
+            print(json.dumps({"command": "watch", "status": "error", "message": str(e)}))
+            return 1
+        return 0
+
+    if args.command == "daemon":
+        import ds_sign_daemon
+
+        def on_ready(server):
+            print(json.dumps({"command": "daemon", "status": "listening", "address": server.address,
+                              "key_ids": list(server.service.keys)}), flush=True)
+        try:
+            ds_sign_daemon.serve(args.key, args.listen, on_ready=on_ready)
+        except KeyboardInterrupt:
+            return 0
+        except Exception as e:
+            print(json.dumps({"command": "daemon", "status": "error", "message": str(e)}))
+            return 1
+        return 0
+
+    if args.command in ("sign-stream", "verify-stream"):
+        start = time.perf_counter()
+        results = [collect_worker_data(stream_job(args.command, args.key, args.signature, args.input,
+                                                  args.output, args.backend, getattr(args, "digest", None)))]
+        summary = summarize(args.command, 1, results, time.perf_counter() - start)
+        # Les données recopiées occupent la sortie standard : le résumé passe sur la sortie d'erreur
+        print_summary(summary, args.format, sys.stderr if args.output == "-" else None)
+        return 0 if summary["ok"] == summary["total"] else 1
+
+    if getattr(args, "catalog", None) or getattr(args, "daemon", None) is not None:
+        if getattr(args, "digest", None):
+            parser.error("--digest cannot be combined with --catalog or --daemon (they sign SHA-256 digests)")
+        if getattr(args, "segmented", None):
+            parser.error("--segmented cannot be combined with --catalog or --daemon")
+    paths = expand_paths(args.paths)
+    jobs = max(1, args.jobs)
+    start = time.perf_counter()
+    if getattr(args, "catalog", None):
+        # Le hachage du lot se fait sur `jobs` threads, la signature dans le processus courant
+        try:
+            if args.command == "sign":
+                rel_paths = core.sign_to_catalog(paths, args.key, args.catalog, args.root, jobs)
+                raw = [(rel_path, "ok", args.catalog) for rel_path in rel_paths]
+            else:
+                raw = core.verify_from_catalog(args.catalog, args.key, paths or None, args.root, jobs, args.fail_fast)
+        except Exception as e:
+            raw = [(args.catalog, "error", str(e))]
+        results = batch_results(raw, time.perf_counter() - start)
+    elif not paths:
+        parser.error("no paths given")
+    elif getattr(args, "daemon", None) is not None:
+        results = batch_results(daemon_sign(paths, args.key, args.daemon or None, jobs), time.perf_counter() - start)
+    elif args.command == "sign":
+        results = run_jobs(partial(sign_job, key=args.key, backend=args.backend, digest=args.digest,
+                                   segmented=args.segmented), paths, jobs, args.timeout)
+    elif args.command == "verify":
+        results = run_jobs(partial(verify_job, key=args.key, backend=args.backend, paranoid=args.paranoid or None),
+                           paths, jobs, args.timeout, args.fail_fast)
+    elif args.command == "sign-archive":
+        results = run_jobs(partial(sign_archive_job, key=args.key, backend=args.backend, digest=args.digest), paths,
+                           jobs, args.timeout)
+    elif args.command == "verify-archive":
+        results = run_jobs(partial(verify_archive_job, key=args.key, backend=args.backend, fail_fast=args.fail_fast),
+                           paths, jobs, args.timeout, args.fail_fast)
+    else:
+        # Les répertoires sont traités l'un après l'autre, chacun haché sur `jobs` threads
+        if args.command == "sign-dir":
+            job = partial(sign_dir_job, key=args.key, mode=args.mode, max_workers=jobs,
+                          paranoid=args.paranoid or None, digest=args.digest, memory_limit=args.memory_limit,
+                          backend=args.backend)
+        else:
+            job = partial(verify_dir_job, key=args.key, max_workers=jobs, paranoid=args.paranoid or None,
+                          fail_fast=args.fail_fast, memory_limit=args.memory_limit, backend=args.backend)
+        results = run_jobs(job, paths, 1, fail_fast=getattr(args, "fail_fast", False))
+
+    summary = summarize(args.command, jobs, results, time.perf_counter() - start)
+    print_summary(summary, args.format)
+    return 0 if summary["ok"] == summary["total"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2561 @@
+"""Moteur de signature de DS-Sign-Tool, sans dépendance à Qt.
+
+Utilisé par l'interface graphique (DS_Sign_Tool.py) et par le mode ligne de commande (ds_sign_cli.py).
+"""
+import os
+import functools
+import hashlib
+import heapq
+import json
+import mmap
+import subprocess
+import sys
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from ds_sign_metrics import metrics
+
+# Répertoire pour stocker les clés (créé à la première génération de clés)
+KEY_DIR = "keys/"
+
+# Processus OpenSSL en cours ; chacun est retiré dès qu'il se termine
+active_processes = set()
+_processes_lock = threading.Lock()
+# Nombre maximal de processus OpenSSL simultanés et délai maximal par processus (secondes, 0 = aucun)
+MAX_CHILD_PROCESSES = int(os.environ.get("DS_SIGN_MAX_PROCESSES", os.cpu_count() or 1))
+OPENSSL_TIMEOUT = float(os.environ.get("DS_SIGN_OPENSSL_TIMEOUT", 0)) or None
+_process_slots = threading.BoundedSemaphore(MAX_CHILD_PROCESSES)
+# Nombre maximal d'opérations (signature/vérification) exécutées en même temps par l'interface ;
+# le panneau "Jobs" peut l'abaisser, pas le dépasser
+MAX_CONCURRENT_OPERATIONS = int(os.environ.get("DS_SIGN_MAX_JOBS", 2))
+
+# Fonction pour récupérer les ressources dynamiquement
+def resource_path(relative_path):
+    """Obtenir le chemin relatif pour les ressources (icônes, etc.)."""
+    try:
+        base_path = sys._MEIPASS  # Si l'application est exécutée depuis un exécutable PyInstaller
+    except Exception:
+        base_path = os.path.abspath(".")  # Si l'application est exécutée depuis le script source
+    return os.path.join(base_path, relative_path)
+
+# Chemin vers OpenSSL (exécutable embarqué, sinon celui du système)
+OPENSSL_PATH = os.environ.get("DS_SIGN_OPENSSL") or resource_path("openssl/openssl.exe")
+if not os.path.exists(OPENSSL_PATH):
+    OPENSSL_PATH = shutil.which("openssl") or OPENSSL_PATH
+
+# Moteur de signature natif (cryptography), OpenSSL CLI en repli
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa, utils
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+# "auto" utilise le moteur natif si disponible, sinon "openssl"
+SIGN_BACKEND = os.environ.get("DS_SIGN_BACKEND", "auto")
+SIGN_BACKENDS = ("auto", "native", "openssl")
+
+# Mode de signature des répertoires : "tree" (structure seule), "manifest" (contenu des fichiers)
+# ou "merkle" (arbre de hachage, vérifiable fichier par fichier)
+DIRECTORY_MODE = os.environ.get("DS_SIGN_DIR_MODE", "tree")
+DIRECTORY_MODES = ("tree", "manifest", "merkle")
+
+# Fichiers générés par la signature d'un répertoire, exclus du manifeste
+DIR_FILE = "dir_file"
+HASH_FILE = "hash_file"
+MANIFEST_FILE = "manifest_file"
+MERKLE_FILE = "merkle_file"
+MERKLE_ROOT_FILE = "merkle_root"
+CATALOG_FILE = "signatures.catalog"
+TREE_INDEX_FILE = "tree_index"  # Listing trié des entrées du mode tree, pour détailler les différences
+MANIFEST_HEADER = "# DS-Sign-Tool manifest v1 sha256"
+MERKLE_HEADER = "# DS-Sign-Tool merkle v1 sha256"
+ARCHIVE_MANIFEST_HEADER = "# DS-Sign-Tool archive manifest v1 sha256"
+TREE_INDEX_HEADER = "# DS-Sign-Tool tree index v1"
+ARCHIVE_MANIFEST_SUFFIX = ".manifest"  # Manifeste d'une archive, écrit à côté de celle-ci
+SIGNATURE_FILES = (DIR_FILE, HASH_FILE, HASH_FILE + ".signed", MANIFEST_FILE, MANIFEST_FILE + ".signed",
+                   MERKLE_FILE, MERKLE_ROOT_FILE, MERKLE_ROOT_FILE + ".signed",
+                   HASH_FILE + ".signed.keyid", MANIFEST_FILE + ".signed.keyid", MERKLE_ROOT_FILE + ".signed.keyid",
+                   HASH_FILE + ".signed.digest", MANIFEST_FILE + ".signed.digest", MERKLE_ROOT_FILE + ".signed.digest",
+                   HASH_FILE + ".signed.segments", MANIFEST_FILE + ".signed.segments",
+                   MERKLE_ROOT_FILE + ".signed.segments",
+                   CATALOG_FILE, CATALOG_FILE + "-journal", TREE_INDEX_FILE)
+
+# Cache persistant des empreintes de fichiers (re-signature incrémentale)
+HASH_CACHE_PATH = os.environ.get("DS_SIGN_CACHE") or os.path.join(os.path.expanduser("~"), ".ds_sign_tool", "hash_cache.sqlite3")
+# Mode paranoïaque : toujours recalculer les empreintes sans consulter le cache
+PARANOID = os.environ.get("DS_SIGN_PARANOID", "0") == "1"
+# Cache persistant des vérifications réussies : un fichier inchangé, avec la même signature et la même clé,
+# n'est pas relu. Au plus DS_SIGN_VERIFY_CACHE_SIZE entrées (les moins récemment utilisées sont évincées,
+# 0 désactive le cache) ; le mode paranoïaque l'ignore aussi.
+VERIFY_CACHE_PATH = os.environ.get("DS_SIGN_VERIFY_CACHE") or os.path.join(os.path.expanduser("~"), ".ds_sign_tool", "verify_cache.sqlite3")
+VERIFY_CACHE_SIZE = int(os.environ.get("DS_SIGN_VERIFY_CACHE_SIZE", 100000))
+# En deçà de cette taille, vérifier de nouveau coûte moins cher qu'une consultation du cache
+VERIFY_CACHE_MIN_SIZE = int(os.environ.get("DS_SIGN_VERIFY_CACHE_MIN_SIZE", 64 * 1024))
+
+# Mémoire bornée pour les très grandes arborescences (modes manifest et tree) : au-delà de DS_SIGN_MEMORY_LIMIT
+# octets, les listings sont écrits en runs triés sur disque (dans DS_SIGN_SORT_DIR ou le dossier temporaire)
+# puis fusionnés ; 0 conserve les listings en mémoire
+MEMORY_LIMIT = int(os.environ.get("DS_SIGN_MEMORY_LIMIT", 0))
+SORT_DIR = os.environ.get("DS_SIGN_SORT_DIR") or None
+MERGE_FAN_IN = 64  # Runs ouverts à la fois pendant une fusion
+RUN_BUFFER_SIZE = 256 * 1024
+DIFFERENCES_LIMIT = 10000  # Différences détaillées par catégorie en mémoire bornée
+CACHE_BATCH_SIZE = 10000  # Empreintes enregistrées dans le cache par transaction en mémoire bornée
+
+# Moteur de hachage : stratégie de lecture choisie selon la taille du fichier ("auto") ou imposée
+HASH_STRATEGY = os.environ.get("DS_SIGN_HASH_STRATEGY", "auto")
+HASH_STRATEGIES = ("auto", "read", "readinto", "mmap")
+HASH_BUFFER_SIZE = int(os.environ.get("DS_SIGN_HASH_BUFFER", 1024 * 1024))
+HASH_MMAP_THRESHOLD = int(os.environ.get("DS_SIGN_HASH_MMAP_THRESHOLD", 64 * 1024 * 1024))
+
+# Algorithme d'empreinte, choisi par exécution (paramètre `algorithm`, DS_SIGN_DIGEST) ou par clé
+# (fichier "<clé privée>.digest"). Il est enregistré à côté de toute signature qui n'utilise pas SHA-256
+# (fichier ".digest") ; sans ce fichier, une signature se vérifie en SHA-256 comme avec les versions précédentes.
+DIGEST_ALGORITHM = os.environ.get("DS_SIGN_DIGEST", "sha256")
+DIGEST_ALGORITHMS = ("sha256", "sha512", "sha512_256", "blake2b")
+DIGEST_SUFFIX = ".digest"
+_OPENSSL_DIGEST_NAMES = {"sha256": "sha256", "sha512": "sha512", "sha512_256": "sha512-256", "blake2b": "blake2b512"}
+
+# Mode segmenté des très gros fichiers : des segments de taille fixe sont hachés en parallèle et leurs
+# empreintes, listées dans "<signature>.segments", sont combinées en une racine qui est signée.
+# Sur demande (`segmented=True`, `sign --segmented`) ou au-delà de DS_SIGN_SEGMENT_THRESHOLD octets (0 : jamais).
+SEGMENT_SIZE = int(os.environ.get("DS_SIGN_SEGMENT_SIZE", 64 * 1024 * 1024))
+SEGMENT_THRESHOLD = int(os.environ.get("DS_SIGN_SEGMENT_THRESHOLD", 0))
+SEGMENT_WORKERS = int(os.environ.get("DS_SIGN_SEGMENT_WORKERS", 0)) or None  # None : un thread par cœur
+SEGMENTS_HEADER = "# DS-Sign-Tool segments v1"
+SEGMENTS_SUFFIX = ".segments"
+
+# Un tampon de lecture réutilisable par thread (les répertoires sont hachés sur un pool de threads)
+_hash_buffers = threading.local()
+
+# Nombre maximal de clés analysées gardées en mémoire par keystore (cache LRU)
+KEY_CACHE_SIZE = int(os.environ.get("DS_SIGN_KEY_CACHE", 64))
+# Identifiant de la clé (empreinte SHA-256 de la clé publique) écrit à côté de chaque signature, sur demande
+# (DS_SIGN_KEY_IDS=1) : un fichier de plus par signature. Les catalogues l'enregistrent toujours.
+KEY_ID_SUFFIX = ".keyid"
+WRITE_KEY_IDS = os.environ.get("DS_SIGN_KEY_IDS", "0") == "1"
+
+class OperationCancelled(Exception):
+    """Levée par les boucles du moteur lorsque leur jeton d'annulation a été déclenché."""
+
+# Mesure d'une opération publique (ds_sign_metrics) ; `failed(résultat)` repère un résultat négatif.
+# Instrumentation désactivée : un simple test avant l'appel.
+def _measured(operation, failed=None):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            with metrics.operation(operation, cancelled=OperationCancelled) as span:
+                result = function(*args, **kwargs)
+                if failed is not None and failed(result):
+                    span.fail()
+                return result
+        return wrapper
+    return decorate
+
+def _verification_failed(result):
+    return not result[0]
+
+class CancellationToken:
+    """Jeton d'annulation coopératif, partagé entre l'appelant et les boucles du moteur.
+
+    `cancel()` peut être appelé depuis n'importe quel thread. Les boucles de hachage, de parcours et de
+    signature appellent `check()` entre deux blocs ; les processus OpenSSL sont tués par un rappel.
+    Un jeton créé avec `parent` est annulé en même temps que lui, mais peut l'être seul (arrêt d'un
+    travail parallèle sans annuler l'opération appelante).
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._parent = parent
+        if parent is not None:
+            parent.add_callback(self.cancel)
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def check(self):
+        if self._event.is_set():
+            raise OperationCancelled("Operation cancelled.")
+
+    def wait(self, timeout=None):
+        """Attend l'annulation au plus `timeout` secondes ; retourne True si le jeton est annulé."""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback):
+        """Appelle `callback` à l'annulation (immédiatement si le jeton est déjà annulé)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def release(self):
+        """Détache le jeton de son parent une fois le travail terminé."""
+        if self._parent is not None:
+            self._parent.remove_callback(self.cancel)
+
+def _hash_buffer(size):
+    buffer = getattr(_hash_buffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = _hash_buffers.buffer = bytearray(size)
+    return buffer
+
+def select_hash_strategy(size, strategy=None, buffer_size=None):
+    """Petits fichiers : une seule lecture ; moyens : readinto dans un tampon réutilisé ; gros : mmap."""
+    strategy = strategy or HASH_STRATEGY
+    if strategy not in HASH_STRATEGIES:
+        raise ValueError(f"Unknown hash strategy: {strategy}")
+    if strategy != "auto":
+        return strategy
+    if size <= (buffer_size or HASH_BUFFER_SIZE):
+        return "read"
+    if size >= HASH_MMAP_THRESHOLD:
+        return "mmap"
+    return "readinto"
+
+def _hash_read(file, hasher, size, buffer_size, progress, cancel):
+    # Un fichier d'un seul bloc est lu par un unique read() de sa taille, puis la fin de fichier est
+    # contrôlée par une lecture d'un octet : un read(n) non tamponné alloue toujours n octets, même
+    # pour n'en rendre aucun. Si le fichier a grandi, la suite est lue par blocs de buffer_size
+    processed = 0
+    request = buffer_size
+    if 0 < size <= buffer_size:
+        processed = len(chunk := file.read(size))
+        hasher.update(chunk)
+        if progress:
+            progress(processed, size)
+        request = 1
+    while chunk := file.read(request):
+        if cancel is not None:
+            cancel.check()
+        hasher.update(chunk)
+        if progress:
+            processed += len(chunk)
+            progress(processed, size)
+        request = buffer_size
+
+def _hash_readinto(file, hasher, size, buffer_size, progress, cancel):
+    buffer = _hash_buffer(buffer_size)
+    view = memoryview(buffer)
+    processed = 0
+    while count := file.readinto(buffer):
+        if cancel is not None:
+            cancel.check()
+        hasher.update(view[:count])
+        if progress:
+            processed += count
+            progress(processed, size)
+
+def _hash_mmap(file, hasher, size, buffer_size, progress, cancel):
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, len(mapped), buffer_size):
+                if cancel is not None:
+                    cancel.check()
+                hasher.update(view[offset:offset + buffer_size])
+                if progress:
+                    progress(min(offset + buffer_size, size), size)
+        finally:
+            view.release()
+
+_HASH_READERS = {"read": _hash_read, "readinto": _hash_readinto, "mmap": _hash_mmap}
+
+def _check_digest_algorithm(algorithm):
+    if algorithm not in DIGEST_ALGORITHMS:
+        raise ValueError(f"Unknown digest algorithm: {algorithm}")
+    return algorithm
+
+def new_hasher(algorithm="sha256"):
+    algorithm = _check_digest_algorithm(algorithm)
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    if algorithm == "blake2b":
+        return hashlib.blake2b()  # Empreinte de 64 octets, comme blake2b512 d'OpenSSL
+    return hashlib.new(algorithm)
+
+# Fonction pour calculer le hachage (SHA-256 par défaut, ou `algorithm` parmi DIGEST_ALGORITHMS)
+# `progress(octets_lus, taille_totale)` est appelé au fil de l'unique lecture du fichier
+# `cancel` (CancellationToken) est vérifié avant chaque bloc lu
+def calculate_hash(file_path, progress=None, strategy=None, buffer_size=None, cancel=None, algorithm="sha256"):
+    hasher = new_hasher(algorithm)
+    buffer_size = buffer_size or HASH_BUFFER_SIZE
+    with metrics.phase("hash"), open(file_path, 'rb', buffering=0) as file:
+        size = os.fstat(file.fileno()).st_size
+        strategy = select_hash_strategy(size, strategy, buffer_size)
+        if size > buffer_size and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if strategy == "mmap" and size == 0:
+            strategy = "read"  # Un fichier vide ne peut pas être projeté en mémoire
+        _HASH_READERS[strategy](file, hasher, size, buffer_size, progress, cancel)
+    metrics.add("bytes_hashed", size)
+    metrics.add("files_hashed")
+    return hasher.hexdigest()
+
+def resolve_backend(backend=None):
+    """Retourne le moteur effectif ("native" ou "openssl") pour une demande donnée."""
+    backend = backend or SIGN_BACKEND
+    if backend not in SIGN_BACKENDS:
+        raise ValueError(f"Unknown signing backend: {backend}")
+    if backend == "auto":
+        return "native" if HAS_CRYPTOGRAPHY else "openssl"
+    if backend == "native" and not HAS_CRYPTOGRAPHY:
+        raise Exception("The native signing backend requires the 'cryptography' package.")
+    return backend
+
+def _parse_key(key_path, private):
+    with open(key_path, "rb") as key_file:
+        data = key_file.read()
+    if private:
+        key = serialization.load_pem_private_key(data, password=None)
+    else:
+        key = serialization.load_pem_public_key(data)
+    if not isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey,
+                            rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        raise Exception(f"Unsupported key type: {type(key).__name__}")
+    return key
+
+def key_fingerprint(key):
+    """Identifiant de clé : SHA-256 de la clé publique au format DER (SubjectPublicKeyInfo)."""
+    public_key = key.public_key() if hasattr(key, "public_key") else key
+    der = public_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha256(der).hexdigest()
+
+class KeyCache:
+    """Cache LRU borné des clés analysées, indexé par (chemin, type, mtime) et sûr entre threads."""
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or KEY_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, key_path, private):
+        """Retourne (clé, empreinte), en n'analysant le PEM qu'en cas d'absence ou de modification."""
+        cache_key = (os.path.abspath(key_path), private, os.stat(key_path).st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                return entry
+        key = _parse_key(key_path, private)
+        entry = (key, key_fingerprint(key))
+        with self._lock:
+            self._entries[cache_key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+# Cache partagé par toutes les opérations et tous les keystores
+_key_cache = KeyCache()
+
+class KeyStore:
+    """Clés PEM d'un dossier, indexées par empreinte de clé publique.
+
+    L'index (empreinte -> chemin) ne garde aucune clé en mémoire ; les clés analysées passent par
+    le cache LRU partagé.
+    """
+
+    def __init__(self, key_dir, cache=None):
+        self.key_dir = key_dir
+        self.cache = cache or _key_cache
+        self._scanned = {}  # chemin -> (mtime_ns, privée, empreinte)
+        self._public_index = {}
+        self._private_index = {}
+
+    def refresh(self):
+        """Réindexe le dossier ; seuls les fichiers nouveaux ou modifiés sont analysés."""
+        scanned = {}
+        with os.scandir(self.key_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".pem"):
+                    continue
+                mtime_ns = entry.stat().st_mtime_ns
+                previous = self._scanned.get(entry.path)
+                if previous and previous[0] == mtime_ns:
+                    scanned[entry.path] = previous
+                    continue
+                with open(entry.path, "rb") as key_file:
+                    private = b"PRIVATE KEY" in key_file.read()
+                try:
+                    scanned[entry.path] = (mtime_ns, private, self.cache.load(entry.path, private)[1])
+                except Exception:
+                    continue  # Fichier PEM qui n'est pas une clé prise en charge
+        self._scanned = scanned
+        self._public_index = {fp: path for path, (_, private, fp) in sorted(scanned.items()) if not private}
+        self._private_index = {fp: path for path, (_, private, fp) in sorted(scanned.items()) if private}
+
+    def _lookup(self, index_name, fingerprint):
+        index = getattr(self, index_name)
+        if fingerprint not in index:
+            self.refresh()
+            index = getattr(self, index_name)
+        if fingerprint not in index:
+            raise Exception(f"No key with ID {fingerprint[:16]} in {self.key_dir}")
+        return index[fingerprint]
+
+    def public_key_path(self, fingerprint):
+        return self._lookup("_public_index", fingerprint)
+
+    def private_key_path(self, fingerprint):
+        return self._lookup("_private_index", fingerprint)
+
+    def key_ids(self):
+        self.refresh()
+        return {"public": dict(self._public_index), "private": dict(self._private_index)}
+
+_keystores = {}
+
+def get_keystore(key_dir):
+    key_dir = os.path.abspath(key_dir)
+    if key_dir not in _keystores:
+        _keystores[key_dir] = KeyStore(key_dir)
+    return _keystores[key_dir]
+
+def _load_key(key_path, private):
+    return _key_cache.load(key_path, private)[0]
+
+def load_private_key(key_path):
+    return _load_key(key_path, private=True)
+
+def load_public_key(key_path):
+    return _load_key(key_path, private=False)
+
+def read_key_id(signed_file):
+    with open(signed_file + KEY_ID_SUFFIX, "r", encoding="utf-8") as key_id_file:
+        return key_id_file.read().strip()
+
+def write_key_id(signed_file, key_id):
+    key_id_path = signed_file + KEY_ID_SUFFIX
+    if not WRITE_KEY_IDS:
+        # Un identifiant laissé par une signature précédente désignerait peut-être une autre clé
+        if os.path.exists(key_id_path):
+            os.remove(key_id_path)
+        return
+    with metrics.phase("write"), open(key_id_path, "w", encoding="utf-8") as key_id_file:
+        key_id_file.write(key_id + "\n")
+
+def _record_key_id(signed_file, private_key):
+    if not WRITE_KEY_IDS:
+        write_key_id(signed_file, None)
+    elif HAS_CRYPTOGRAPHY:
+        write_key_id(signed_file, _key_cache.load(private_key, True)[1])
+
+def key_digest_algorithm(private_key):
+    """Algorithme préféré d'une clé privée (fichier "<clé>.digest" écrit par generate_key_pair), ou None."""
+    preference_path = private_key + DIGEST_SUFFIX
+    if not os.path.isfile(preference_path):
+        return None
+    with open(preference_path, "r", encoding="utf-8") as preference_file:
+        return _check_digest_algorithm(preference_file.read().strip())
+
+def resolve_digest_algorithm(algorithm=None, private_key=None):
+    """Algorithme effectif d'une signature : choix explicite, sinon préférence de la clé, sinon DS_SIGN_DIGEST."""
+    if algorithm:
+        return _check_digest_algorithm(algorithm)
+    if private_key:
+        preferred = key_digest_algorithm(private_key)
+        if preferred:
+            return preferred
+    return _check_digest_algorithm(DIGEST_ALGORITHM)
+
+def read_digest_algorithm(signed_file):
+    """Algorithme enregistré à côté d'une signature ; SHA-256 si rien n'est enregistré (anciennes versions)."""
+    try:
+        with open(signed_file + DIGEST_SUFFIX, "r", encoding="utf-8") as digest_file:
+            return _check_digest_algorithm(digest_file.read().strip())
+    except FileNotFoundError:
+        return "sha256"
+
+def write_digest_algorithm(signed_file, algorithm):
+    digest_path = signed_file + DIGEST_SUFFIX
+    if algorithm == "sha256":
+        # SHA-256 reste implicite ; un fichier laissé par une signature précédente est retiré
+        if os.path.exists(digest_path):
+            os.remove(digest_path)
+        return
+    with metrics.phase("write"), open(digest_path, "w", encoding="utf-8") as digest_file:
+        digest_file.write(algorithm + "\n")
+
+def resolve_public_key(public_key, signed_file):
+    """Une clé publique peut être un fichier PEM ou un dossier de clés : dans ce cas, la clé est
+    choisie d'après l'identifiant enregistré à côté de la signature."""
+    if os.path.isdir(public_key):
+        if not os.path.exists(signed_file + KEY_ID_SUFFIX):
+            raise Exception(f"No key ID recorded next to {signed_file} "
+                            "(sign with DS_SIGN_KEY_IDS=1, or give the public key file)")
+        return get_keystore(public_key).public_key_path(read_key_id(signed_file))
+    return public_key
+
+def signature_algorithm(key, algorithm="sha256"):
+    """Paramètres identiques à `openssl dgst -<algorithme> -sign` (ECDSA ou RSA PKCS#1 v1.5)."""
+    is_ec = isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey))
+    if algorithm == "blake2b":
+        if not is_ec:
+            raise Exception("BLAKE2b signatures require an EC key (RSA PKCS#1 v1.5 has no BLAKE2b identifier)")
+        prehashed = utils.Prehashed(hashes.BLAKE2b(64))
+    else:
+        prehashed = utils.Prehashed({"sha256": hashes.SHA256, "sha512": hashes.SHA512,
+                                     "sha512_256": hashes.SHA512_256}[_check_digest_algorithm(algorithm)]())
+    if is_ec:
+        return (ec.ECDSA(prehashed),)
+    return (padding.PKCS1v15(), prehashed)
+
+def _sign_digest_native(digest, private_key, algorithm="sha256"):
+    with metrics.phase("crypto"):
+        key = load_private_key(private_key)
+        return key.sign(digest, *signature_algorithm(key, algorithm))
+
+def _verify_digest_native(digest, public_key, signature, algorithm="sha256"):
+    with metrics.phase("crypto"):
+        key = load_public_key(public_key)
+        try:
+            key.verify(signature, digest, *signature_algorithm(key, algorithm))
+        except InvalidSignature:
+            return False
+        return True
+
+def _run_openssl(args, input_data=None, timeout=None, cancel=None):
+    timeout = timeout or OPENSSL_TIMEOUT
+    if cancel is not None:
+        cancel.check()
+    # Au plus MAX_CHILD_PROCESSES processus OpenSSL en même temps, quel que soit le nombre de tâches
+    with _process_slots, metrics.phase("openssl"):
+        process = subprocess.Popen(
+            [OPENSSL_PATH, *args],
+            stdin=subprocess.PIPE if input_data is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        with _processes_lock:
+            active_processes.add(process)
+        if cancel is not None:
+            cancel.add_callback(process.kill)  # L'annulation tue le processus sans attendre sa fin
+        try:
+            stdout, stderr = process.communicate(input_data, timeout=timeout)  # Attendre la fin du processus
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise Exception(f"OpenSSL timed out after {timeout}s")
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(process.kill)
+            with _processes_lock:
+                active_processes.discard(process)
+    if cancel is not None:
+        cancel.check()
+    return (process.returncode,
+            stdout.decode("utf-8", errors="ignore"),
+            stderr.decode("utf-8", errors="ignore"))
+
+def _sign_digest_openssl(digest, private_key, signed_file, algorithm="sha256"):
+    # `pkeyutl` avec digest:sha256 produit la même signature que `dgst -sha256 -sign`
+    returncode, _, stderr = _run_openssl(
+        ["pkeyutl", "-sign", "-inkey", private_key, "-pkeyopt", f"digest:{_OPENSSL_DIGEST_NAMES[algorithm]}",
+         "-out", signed_file], digest)
+    if returncode != 0:
+        raise Exception(f"Error signing digest: {stderr}")
+
+def _verify_digest_openssl(digest, public_key, signed_file, algorithm="sha256"):
+    returncode, stdout, stderr = _run_openssl(
+        ["pkeyutl", "-verify", "-pubin", "-inkey", public_key, "-sigfile", signed_file,
+         "-pkeyopt", f"digest:{_OPENSSL_DIGEST_NAMES[algorithm]}"], digest)
+    if "Signature Verified Successfully" in stdout:
+        return True
+    if "Failure" in stdout:
+        return False
+    raise Exception(f"Error verifying digest: {stderr}")
+
+# Signature d'une empreinte déjà calculée (aucune relecture du fichier) ; `algorithm` est celui
+# qui a produit `digest`, enregistré à côté de la signature
+def sign_digest_standalone(digest, private_key, signed_file, backend=None, algorithm="sha256"):
+    try:
+        if resolve_backend(backend) == "native":
+            signature = _sign_digest_native(digest, private_key, algorithm)
+            with metrics.phase("write"), open(signed_file, "wb") as f:
+                f.write(signature)
+        else:
+            _sign_digest_openssl(digest, private_key, signed_file, algorithm)
+        _record_key_id(signed_file, private_key)
+        write_digest_algorithm(signed_file, algorithm)
+        return signed_file
+    except Exception as e:
+        raise Exception(f"Error signing digest: {e}")
+
+# Vérification d'une empreinte déjà calculée avec `algorithm`
+def verify_digest_standalone(digest, public_key, signed_file, backend=None, algorithm="sha256"):
+    try:
+        public_key = resolve_public_key(public_key, signed_file)
+        if resolve_backend(backend) == "native":
+            with open(signed_file, "rb") as f:
+                return _verify_digest_native(digest, public_key, f.read(), algorithm)
+        return _verify_digest_openssl(digest, public_key, signed_file, algorithm)
+    except Exception as e:
+        raise Exception(f"Error verifying digest: {e}")
+
+def _sign_file_native(file_path, private_key, progress=None, cancel=None, algorithm="sha256"):
+    digest = bytes.fromhex(calculate_hash(file_path, progress, cancel=cancel, algorithm=algorithm))
+    return sign_digest_standalone(digest, private_key, file_path + ".signed", backend="native", algorithm=algorithm)
+
+def _verify_file_native(file_path, public_key, signed_file, progress=None, cancel=None, algorithm="sha256"):
+    digest = bytes.fromhex(calculate_hash(file_path, progress, cancel=cancel, algorithm=algorithm))
+    return verify_digest_standalone(digest, public_key, signed_file, backend="native", algorithm=algorithm)
+
+def _sign_file_openssl(file_path, private_key, cancel=None, algorithm="sha256"):
+    signed_file = file_path + ".signed"
+    returncode, _, stderr = _run_openssl(["dgst", f"-{_OPENSSL_DIGEST_NAMES[algorithm]}", "-sign", private_key,
+                                          "-out", signed_file, file_path], cancel=cancel)
+    if returncode != 0:
+        raise Exception(f"Error signing file: {stderr}")
+    return signed_file
+
+def _verify_file_openssl(file_path, public_key, signed_file, cancel=None, algorithm="sha256"):
+    returncode, stdout, stderr = _run_openssl(
+        ["dgst", f"-{_OPENSSL_DIGEST_NAMES[algorithm]}", "-verify", public_key, "-signature", signed_file, file_path],
+        cancel=cancel)
+    if "Verified OK" in stdout:
+        return True
+    if "Verification failure" in stdout:
+        return False
+    raise Exception(f"Error verifying file: {stderr}")
+
+class _SegmentMismatch(Exception):
+    """Interrompt la vérification segmentée dès le premier segment différent."""
+
+def _hash_segment(file_path, offset, length, buffer_size, algorithm, on_bytes, cancel):
+    hasher = new_hasher(algorithm)
+    buffer = _hash_buffer(buffer_size)
+    view = memoryview(buffer)
+    with metrics.phase("hash"), open(file_path, "rb", buffering=0) as file:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(file.fileno(), offset, length, os.POSIX_FADV_SEQUENTIAL)
+        file.seek(offset)
+        remaining = length
+        while remaining:
+            if cancel is not None:
+                cancel.check()
+            count = file.readinto(view[:min(remaining, buffer_size)])
+            if not count:
+                raise Exception(f"{file_path} was truncated while it was being hashed")
+            hasher.update(view[:count])
+            remaining -= count
+            if on_bytes:
+                on_bytes(count)
+    return hasher.digest()
+
+# Empreintes (bytes) des segments de `segment_size` octets d'un fichier, calculées sur `max_workers` threads :
+# chaque thread lit son segment par son propre descripteur, dans son tampon réutilisable.
+# `on_segment(index, empreinte)` est appelé dans l'ordre des segments ; une exception levée arrête le reste.
+def segment_digests(file_path, segment_size=None, max_workers=None, progress=None, cancel=None, algorithm="sha256",
+                    on_segment=None):
+    segment_size = segment_size or SEGMENT_SIZE
+    buffer_size = min(HASH_BUFFER_SIZE, segment_size)
+    size = os.path.getsize(file_path)
+    workers_cancel = CancellationToken(parent=cancel)
+    progress_lock = threading.Lock()
+    processed = 0
+
+    def on_bytes(count):
+        nonlocal processed
+        with progress_lock:
+            processed += count
+            progress(processed, size)
+
+    def hash_one(index):
+        offset = index * segment_size
+        return _hash_segment(file_path, offset, min(segment_size, size - offset), buffer_size, algorithm,
+                             on_bytes if progress else None, workers_cancel)
+
+    digests = []
+    try:
+        with JobScheduler(max_workers or SEGMENT_WORKERS) as scheduler:
+            try:
+                for index, digest in scheduler.map(hash_one, range(-(-size // segment_size))):
+                    if isinstance(digest, Exception):
+                        raise digest
+                    digests.append(digest)
+                    if on_segment:
+                        on_segment(index, digest)
+            except BaseException:
+                workers_cancel.cancel()  # Avant la sortie du `with`, qui attend les segments en cours
+                raise
+    finally:
+        workers_cancel.release()
+    metrics.add("bytes_hashed", size)
+    metrics.add("files_hashed")
+    return digests
+
+# Racine signée d'un fichier segmenté : empreinte de l'en-tête (algorithme, taille des segments, taille du
+# fichier) suivi des empreintes des segments dans l'ordre
+def segments_root(digests, segment_size, size, algorithm="sha256"):
+    hasher = new_hasher(algorithm)
+    hasher.update(f"{SEGMENTS_HEADER} {algorithm} {segment_size} {size}\n".encode("ascii"))
+    for digest in digests:
+        hasher.update(digest)
+    return hasher.digest()
+
+# Écrit la liste des segments à côté de la signature ; sans segments, un fichier laissé par une
+# signature segmentée précédente est retiré
+def write_segments(signed_file, digests=None, segment_size=None, size=None, algorithm="sha256"):
+    segments_path = signed_file + SEGMENTS_SUFFIX
+    if digests is None:
+        if os.path.exists(segments_path):
+            os.remove(segments_path)
+        return
+    with metrics.phase("write"), open(segments_path, "w", encoding="utf-8", newline="\n") as segments_file:
+        segments_file.write(f"{SEGMENTS_HEADER} {algorithm} {segment_size} {size}\n")
+        for digest in digests:
+            segments_file.write(digest.hex() + "\n")
+
+def read_segments(signed_file):
+    """Retourne (algorithme, taille des segments, taille du fichier, empreintes) ; None sans signature segmentée."""
+    try:
+        with open(signed_file + SEGMENTS_SUFFIX, "r", encoding="utf-8", newline="\n") as segments_file:
+            header = segments_file.readline().rstrip("\n")
+            digests = [bytes.fromhex(line.strip()) for line in segments_file if line.strip()]
+    except FileNotFoundError:
+        return None
+    if not header.startswith(SEGMENTS_HEADER + " "):
+        raise Exception(f"Invalid segment list: {signed_file + SEGMENTS_SUFFIX}")
+    algorithm, segment_size, size = header[len(SEGMENTS_HEADER) + 1:].split(" ")
+    return _check_digest_algorithm(algorithm), int(segment_size), int(size), digests
+
+def _use_segments(file_path, segmented):
+    if segmented is not None:
+        return segmented
+    return SEGMENT_THRESHOLD > 0 and os.path.getsize(file_path) >= SEGMENT_THRESHOLD
+
+def _sign_file_segmented(file_path, private_key, backend=None, progress=None, cancel=None, algorithm="sha256",
+                         segment_size=None, max_workers=None):
+    segment_size = segment_size or SEGMENT_SIZE
+    size = os.path.getsize(file_path)
+    digests = segment_digests(file_path, segment_size, max_workers, progress, cancel, algorithm)
+    signed_file = file_path + ".signed"
+    sign_digest_standalone(segments_root(digests, segment_size, size, algorithm), private_key, signed_file, backend,
+                           algorithm)
+    write_segments(signed_file, digests, segment_size, size, algorithm)
+    return signed_file
+
+def _verify_file_segmented(file_path, public_key, signed_file, segments, backend=None, progress=None, cancel=None,
+                           max_workers=None):
+    algorithm, segment_size, size, expected = segments
+    if os.path.getsize(file_path) != size or len(expected) != -(-size // segment_size):
+        return False
+    # La liste des segments est authentifiée par la signature de sa racine avant toute lecture du fichier
+    if not verify_digest_standalone(segments_root(expected, segment_size, size, algorithm), public_key, signed_file,
+                                    backend, algorithm):
+        return False
+
+    def on_segment(index, digest):
+        if digest != expected[index]:
+            raise _SegmentMismatch(index)
+    try:
+        segment_digests(file_path, segment_size, max_workers, progress, cancel, algorithm, on_segment)
+    except _SegmentMismatch:
+        return False
+    return True
+
+# Fonction standalone pour signer un fichier
+# Avec `progress`, le fichier est haché une seule fois ici puis l'empreinte est signée directement
+# `algorithm` : voir resolve_digest_algorithm (par défaut, préférence de la clé puis DS_SIGN_DIGEST)
+# `segmented` : voir SEGMENT_THRESHOLD (None : selon la taille du fichier) ; `max_workers` pour le mode segmenté
+@_measured("sign_file")
+def sign_file_standalone(file_path, private_key, backend=None, progress=None, cancel=None, algorithm=None,
+                         segmented=None, max_workers=None):
+    try:
+        algorithm = resolve_digest_algorithm(algorithm, private_key)
+        if _use_segments(file_path, segmented):
+            return _sign_file_segmented(file_path, private_key, backend, progress, cancel, algorithm,
+                                        max_workers=max_workers)
+        write_segments(file_path + ".signed")
+        if resolve_backend(backend) == "native":
+            return _sign_file_native(file_path, private_key, progress, cancel, algorithm)
+        if progress:
+            digest = bytes.fromhex(calculate_hash(file_path, progress, cancel=cancel, algorithm=algorithm))
+            return sign_digest_standalone(digest, private_key, file_path + ".signed", "openssl", algorithm)
+        signed_file = _sign_file_openssl(file_path, private_key, cancel, algorithm)
+        _record_key_id(signed_file, private_key)
+        write_digest_algorithm(signed_file, algorithm)
+        return signed_file
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error signing file: {e}")
+
+def _verify_file(file_path, public_key, signed_file, backend=None, progress=None, cancel=None, max_workers=None):
+    segments = read_segments(signed_file)
+    if segments is not None:
+        return _verify_file_segmented(file_path, public_key, signed_file, segments, backend, progress, cancel,
+                                      max_workers)
+    algorithm = read_digest_algorithm(signed_file)
+    if resolve_backend(backend) == "native":
+        return _verify_file_native(file_path, public_key, signed_file, progress, cancel, algorithm)
+    if progress:
+        digest = bytes.fromhex(calculate_hash(file_path, progress, cancel=cancel, algorithm=algorithm))
+        return verify_digest_standalone(digest, public_key, signed_file, "openssl", algorithm)
+    return _verify_file_openssl(file_path, public_key, signed_file, cancel, algorithm)
+
+# Fonction standalone pour vérifier un fichier ; l'algorithme d'empreinte est lu à côté de la signature
+# Une signature segmentée (liste "<signature>.segments") est vérifiée segment par segment, en parallèle
+# Un succès est mémorisé dans le VerifyCache : tant que rien n'a changé, le fichier n'est plus relu
+# (`paranoid` ou DS_SIGN_PARANOID=1 : toujours relire)
+@_measured("verify_file", failed=lambda valid: not valid)
+def verify_file_standalone(file_path, public_key, signed_file, backend=None, progress=None, cancel=None,
+                           max_workers=None, paranoid=None):
+    try:
+        public_key = resolve_public_key(public_key, signed_file)
+        paranoid = PARANOID if paranoid is None else paranoid
+        if paranoid or VERIFY_CACHE_SIZE <= 0:
+            return _verify_file(file_path, public_key, signed_file, backend, progress, cancel, max_workers)
+        st = os.stat(file_path)
+        if st.st_size < VERIFY_CACHE_MIN_SIZE:
+            return _verify_file(file_path, public_key, signed_file, backend, progress, cancel, max_workers)
+        entry = verification_entry(file_path, public_key, signed_file, st)
+        cache = get_verify_cache()
+        with metrics.phase("cache"):
+            hit = cache.lookup(*entry)
+        if hit:
+            metrics.add("verify_cache_hits")
+            if progress:
+                progress(entry[2][0], entry[2][0])
+            return True
+        valid = _verify_file(file_path, public_key, signed_file, backend, progress, cancel, max_workers)
+        # Un fichier (ou une signature) modifié pendant la vérification n'est pas mémorisé
+        if valid and verification_entry(file_path, public_key, signed_file) == entry:
+            with metrics.phase("cache"):
+                cache.store(*entry)
+        return valid
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error verifying file: {e}")
+
+# Hachage d'un flux (tube, entrée standard, socket) au fil de sa lecture, avec un seul tampon réutilisé :
+# la mémoire reste constante quelle que soit la taille du flux. Chaque bloc est recopié dans `output`
+# (objet fichier binaire) s'il est fourni. `progress(octets_lus, None)` : la taille totale est inconnue.
+# Retourne (empreinte hex, nombre d'octets lus).
+def hash_stream(stream, output=None, buffer_size=None, progress=None, cancel=None, algorithm="sha256"):
+    hasher = new_hasher(algorithm)
+    buffer_size = buffer_size or HASH_BUFFER_SIZE
+    readinto = getattr(stream, "readinto", None)
+    buffer = _hash_buffer(buffer_size)
+    view = memoryview(buffer)
+    processed = 0
+    with metrics.phase("hash"):
+        while True:
+            if cancel is not None:
+                cancel.check()
+            if readinto is not None:
+                count = readinto(buffer)
+                chunk = view[:count]
+            else:
+                chunk = stream.read(buffer_size)
+                count = len(chunk)
+            if not count:
+                break
+            hasher.update(chunk)
+            if output is not None:
+                output.write(chunk)
+            processed += count
+            if progress:
+                progress(processed, None)
+        if output is not None:
+            output.flush()
+    metrics.add("bytes_hashed", processed)
+    metrics.add("files_hashed")
+    return hasher.hexdigest(), processed
+
+# Signer un flux : la signature est écrite dans `signed_file` une fois le flux terminé
+@_measured("sign_stream")
+def sign_stream(stream, private_key, signed_file, output=None, backend=None, progress=None, cancel=None,
+                algorithm=None):
+    try:
+        algorithm = resolve_digest_algorithm(algorithm, private_key)
+        digest, size = hash_stream(stream, output, progress=progress, cancel=cancel, algorithm=algorithm)
+        sign_digest_standalone(bytes.fromhex(digest), private_key, signed_file, backend, algorithm)
+        return signed_file, size
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error signing stream: {e}")
+
+# Vérifier un flux contre une signature `.signed` ; retourne (valide, nombre d'octets lus)
+# Attention : les données recopiées dans `output` ne sont vérifiées qu'à la fin du flux.
+@_measured("verify_stream", failed=_verification_failed)
+def verify_stream(stream, public_key, signed_file, output=None, backend=None, progress=None, cancel=None):
+    try:
+        if not os.path.exists(signed_file):
+            raise Exception(f"Missing signature file: {signed_file}")  # Avant de consommer le flux
+        public_key = resolve_public_key(public_key, signed_file)
+        algorithm = read_digest_algorithm(signed_file)
+        digest, size = hash_stream(stream, output, progress=progress, cancel=cancel, algorithm=algorithm)
+        return verify_digest_standalone(bytes.fromhex(digest), public_key, signed_file, backend, algorithm), size
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error verifying stream: {e}")
+
+def terminate_all_processes():
+    """Termine tous les processus OpenSSL encore actifs."""
+    with _processes_lock:
+        processes = list(active_processes)
+    for process in processes:
+        if process.poll() is None:  # Vérifier si le processus est toujours actif
+            process.terminate()  # Terminer le processus
+
+def _run_chunk(fn, chunk):
+    """Exécute `fn` sur un lot ; chaque élément donne (succès, résultat ou exception)."""
+    outcomes = []
+    for item in chunk:
+        try:
+            outcomes.append((True, fn(item)))
+        except Exception as e:
+            outcomes.append((False, e))
+    return outcomes
+
+class JobScheduler:
+    """Pool de threads (ou de processus) à concurrence bornée.
+
+    `submit` bloque tant que `max_pending` tâches sont déjà en attente ou en cours (contre-pression) ;
+    une tâche terminée est aussitôt retirée du suivi. `map` lit ses entrées au fur et à mesure, ce
+    qui permet de lui passer un générateur de centaines de milliers de fichiers.
+
+    Un délai (`timeout`) s'applique à l'attente du résultat de chaque tâche : une tâche pas encore
+    démarrée est annulée, une tâche en cours ne s'arrête que si elle surveille un CancellationToken
+    (les processus OpenSSL ont leur propre délai, OPENSSL_TIMEOUT).
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, use_processes=False):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=self.max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(cancel=exc_info[0] is not None)
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._active.add(future)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        with self._lock:
+            self._active.discard(future)
+        self._slots.release()
+
+    @property
+    def pending(self):
+        """Nombre de tâches soumises et pas encore terminées."""
+        with self._lock:
+            return len(self._active)
+
+    def map(self, fn, items, timeout=None, chunksize=1):
+        """Produit (élément, résultat ou exception) dans l'ordre des entrées.
+
+        Avec `chunksize` > 1, les éléments sont envoyés par lots (moins d'échanges avec les processus) ;
+        le délai s'applique alors au lot.
+        """
+        window = deque()
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) < chunksize:
+                continue
+            if len(window) >= self.max_pending:
+                yield from self._collect(*window.popleft(), timeout)
+            window.append((chunk, self.submit(_run_chunk, fn, chunk)))
+            chunk = []
+        if chunk:
+            window.append((chunk, self.submit(_run_chunk, fn, chunk)))
+        while window:
+            yield from self._collect(*window.popleft(), timeout)
+
+    @staticmethod
+    def _collect(chunk, future, timeout):
+        try:
+            outcomes = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            outcomes = [(False, TimeoutError(f"Job timed out after {timeout}s"))] * len(chunk)
+        except Exception as e:
+            outcomes = [(False, e)] * len(chunk)
+        for item, (_, value) in zip(chunk, outcomes):
+            yield item, value
+
+    def cancel_pending(self):
+        """Annule les tâches qui n'ont pas encore démarré."""
+        with self._lock:
+            futures = list(self._active)
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self, cancel=False):
+        if sys.version_info >= (3, 9):
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+            return
+        # Python 3.8 : pas de `cancel_futures`, les tâches pas encore démarrées sont annulées une à une
+        if cancel:
+            self.cancel_pending()
+        self._executor.shutdown(wait=True)
+
+# Entrées d'un dossier triées par nom ; is_dir() réutilise le d_type fourni par scandir
+def _sorted_tree_entries(directory):
+    with os.scandir(directory) as entries:
+        listing = [(entry.name, entry.is_dir()) for entry in entries]
+    listing.sort()
+    return listing
+
+def _directory_identity(path):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+# Parcours en profondeur avec une pile explicite (pas de limite de récursion), dans l'ordre de
+# l'arborescence : produit (préfixe, chemin relatif avec "/", nom, dossier ?) pour chaque entrée
+def _iter_tree(directory, prefix="", cancel=None):
+    root_identity = _directory_identity(directory)
+    active_dirs = {root_identity}
+    stack = [(directory, "", _sorted_tree_entries(directory), 0, prefix, root_identity)]
+    while stack:
+        if cancel is not None:
+            cancel.check()
+        path, rel_dir, entries, index, prefix, identity = stack.pop()
+        if index == len(entries):
+            active_dirs.discard(identity)
+            continue
+        stack.append((path, rel_dir, entries, index + 1, prefix, identity))
+        entry, is_dir = entries[index]
+        rel_path = f"{rel_dir}/{entry}" if rel_dir else entry
+        yield prefix, rel_path, entry, is_dir
+        if is_dir:
+            full_path = os.path.join(path, entry)
+            child_identity = _directory_identity(full_path)
+            # Un lien symbolique vers un dossier parent bouclerait indéfiniment
+            if child_identity in active_dirs:
+                raise Exception(f"Symbolic link loop detected at {full_path}")
+            active_dirs.add(child_identity)
+            is_last = index == len(entries) - 1
+            new_prefix = f"{prefix}│   " if not is_last else f"{prefix}    "
+            stack.append((full_path, rel_path, _sorted_tree_entries(full_path), 0, new_prefix, child_identity))
+
+# Fonction pour générer l'arborescence d'un répertoire
+# Un seul fichier de sortie ouvert ; le format reste identique octet pour octet à la version récursive.
+# `on_entry(chemin relatif, dossier ?)` reçoit au passage les entrées du même parcours.
+def generate_tree(directory, output_file, prefix="", cancel=None, on_entry=None):
+    with metrics.phase("walk"), open(output_file, "a", encoding="utf-8", buffering=1024 * 1024) as f:
+        for entry_prefix, rel_path, entry, is_dir in _iter_tree(directory, prefix, cancel):
+            if is_dir:
+                f.write(f"{entry_prefix}├───📁 {entry}\n")
+            else:
+                f.write(f"{entry_prefix}└───📄 {entry}\n")
+            if on_entry is not None:
+                on_entry(rel_path, is_dir)
+
+# Index du mode tree : une ligne "d  chemin" ou "f  chemin" par entrée, triée par chemin, sans les fichiers
+# de signature. Comme avec sha256sum, une ligne dont le chemin contient "\\" ou un saut de ligne commence
+# par "\\" et le chemin y est échappé.
+def _tree_index_entries(entries):
+    return sorted((rel_path, "d" if is_dir else "f") for rel_path, is_dir in entries if rel_path not in SIGNATURE_FILES)
+
+def tree_index_entries(directory_path, cancel=None):
+    """Listing trié (chemin relatif, "d" ou "f") de l'arborescence actuelle d'un répertoire."""
+    with metrics.phase("walk"):
+        return _tree_index_entries((rel_path, is_dir) for _, rel_path, _, is_dir in _iter_tree(directory_path,
+                                                                                                cancel=cancel))
+
+def _escape_index_path(rel_path):
+    return rel_path.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _unescape_index_path(text):
+    parts = text.split("\\\\")
+    return "\\".join(part.replace("\\n", "\n") for part in parts)
+
+def write_tree_index(index_path, entries):
+    with metrics.phase("write"), open(index_path, "w", encoding="utf-8", newline="\n") as index_file:
+        index_file.write(TREE_INDEX_HEADER + "\n")
+        for rel_path, kind in entries:
+            if "\\" in rel_path or "\n" in rel_path:
+                index_file.write(f"\\{kind}  {_escape_index_path(rel_path)}\n")
+            else:
+                index_file.write(f"{kind}  {rel_path}\n")
+
+def read_tree_index(index_path):
+    """Relit l'index au fil du fichier : produit (chemin relatif, "d" ou "f") dans l'ordre trié."""
+    with open(index_path, "r", encoding="utf-8", newline="\n") as index_file:
+        for line in index_file:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("\\"):
+                kind, rel_path = line[1:].split("  ", 1)
+                yield _unescape_index_path(rel_path), kind
+            else:
+                kind, rel_path = line.split("  ", 1)
+                yield rel_path, kind
+
+# Fusion de deux listings triés (chemin, valeur) en une seule passe, en temps linéaire et sans les charger :
+# produit (chemin, valeur enregistrée, valeur actuelle), None du côté où le chemin est absent
+def _merge_join(stored, live):
+    stored, live = iter(stored), iter(live)
+    old, new = next(stored, None), next(live, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield old[0], old[1], None
+            old = next(stored, None)
+        elif old is None or new[0] < old[0]:
+            yield new[0], None, new[1]
+            new = next(live, None)
+        else:
+            yield new[0], old[1], new[1]
+            old, new = next(stored, None), next(live, None)
+
+# Produit ("modified" | "missing" | "added", chemin) ; une entrée est modifiée quand sa valeur a changé
+def _merge_diff(stored, live):
+    for rel_path, old, new in _merge_join(stored, live):
+        if new is None:
+            yield "missing", rel_path
+        elif old is None:
+            yield "added", rel_path
+        elif old != new:
+            yield "modified", rel_path
+
+def _collect_differences(diffs, stop_at_first=False, limit=None):
+    """Retourne (modifiés, manquants, ajoutés, tronqué ?) avec au plus `limit` chemins par catégorie."""
+    found = {"modified": [], "missing": [], "added": []}
+    truncated = False
+    for label, rel_path in diffs:
+        if limit is None or len(found[label]) < limit:
+            found[label].append(rel_path)
+        else:
+            truncated = True
+        if stop_at_first:
+            break
+    return found["modified"], found["missing"], found["added"], truncated
+
+def diff_tree_entries(stored, live, stop_at_first=False):
+    """Compare deux listings triés (chemin, type) en une seule passe de fusion, en temps linéaire.
+
+    Retourne (modifiés, manquants, ajoutés) ; une entrée est modifiée quand son type a changé
+    (fichier devenu dossier ou l'inverse). Avec `stop_at_first`, s'arrête à la première différence.
+    """
+    return _collect_differences(_merge_diff(stored, live), stop_at_first)[:3]
+
+# Liste triée des fichiers d'un répertoire (chemins relatifs avec "/")
+def list_directory_files(directory_path, excluded=SIGNATURE_FILES, cancel=None):
+    files = []
+    with metrics.phase("walk"):
+        for root, dirs, names in os.walk(directory_path):
+            if cancel is not None:
+                cancel.check()
+            dirs.sort()
+            rel_root = os.path.relpath(root, directory_path)
+            for name in names:
+                if rel_root == "." and name in excluded:
+                    continue
+                rel_path = name if rel_root == "." else os.path.join(rel_root, name)
+                files.append(rel_path.replace(os.sep, "/"))
+    files.sort()
+    return files
+
+# Hachage parallèle des fichiers (hashlib libère le GIL sur les gros blocs)
+# `on_file_done(chemin_relatif, empreinte)` est appelé depuis le thread appelant, dans l'ordre de `rel_paths` ;
+# s'il lève une exception, les hachages en cours s'arrêtent au bloc suivant et ceux en attente sont annulés
+def hash_files_parallel(directory_path, rel_paths, max_workers=None, on_file_done=None, cancel=None,
+                        algorithm="sha256"):
+    workers_cancel = CancellationToken(parent=cancel)
+
+    def hash_one(rel_path):
+        return calculate_hash(os.path.join(directory_path, *rel_path.split("/")), cancel=workers_cancel,
+                              algorithm=algorithm)
+
+    digests = {}
+    try:
+        with JobScheduler(max_workers) as scheduler:
+            try:
+                for rel_path, digest in scheduler.map(hash_one, rel_paths):
+                    if isinstance(digest, Exception):
+                        raise digest
+                    digests[rel_path] = digest
+                    if on_file_done:
+                        on_file_done(rel_path, digest)
+            except BaseException:
+                workers_cancel.cancel()  # Avant la sortie du `with`, qui attend les tâches en cours
+                raise
+    finally:
+        workers_cancel.release()
+    return digests
+
+# Écriture et lecture du manifeste (format compatible sha256sum) : comme sha256sum, une ligne dont le chemin
+# contient "\\" ou un saut de ligne commence par "\\" et le chemin y est échappé
+def _manifest_line(digest, rel_path):
+    if "\\" in rel_path or "\n" in rel_path:
+        return f"\\{digest}  {_escape_index_path(rel_path)}\n"
+    return f"{digest}  {rel_path}\n"
+
+def write_manifest(manifest_path, digests, header=MANIFEST_HEADER):
+    with metrics.phase("write"), open(manifest_path, "w", encoding="utf-8", newline="\n") as manifest:
+        manifest.write(header + "\n")
+        for rel_path in sorted(digests):
+            manifest.write(_manifest_line(digests[rel_path], rel_path))
+
+# L'en-tête d'un manifeste se termine par l'algorithme des empreintes ("# DS-Sign-Tool manifest v1 sha256")
+def manifest_header(header, algorithm):
+    return f"{header.rsplit(' ', 1)[0]} {algorithm}"
+
+def read_manifest_algorithm(manifest_path):
+    """Algorithme indiqué par l'en-tête d'un manifeste ; SHA-256 sans en-tête ou sans fichier."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8", newline="\n") as manifest:
+            first_line = manifest.readline().strip()
+    except FileNotFoundError:
+        return "sha256"
+    if first_line.startswith("# DS-Sign-Tool "):
+        return _check_digest_algorithm(first_line.rsplit(" ", 1)[-1])
+    return "sha256"
+
+def iter_manifest(manifest_path):
+    """Relit un manifeste au fil du fichier : produit (chemin relatif, empreinte) dans l'ordre du fichier."""
+    with open(manifest_path, "r", encoding="utf-8", newline="\n") as manifest:
+        for line in manifest:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("\\"):
+                digest, rel_path = line[1:].split("  ", 1)
+                yield _unescape_index_path(rel_path), digest
+            else:
+                digest, rel_path = line.split("  ", 1)
+                yield rel_path, digest
+
+def read_manifest(manifest_path):
+    return dict(iter_manifest(manifest_path))
+
+class HashCache:
+    """Cache SQLite des empreintes, indexé par chemin absolu et validé par (taille, mtime_ns, ctime_ns, inode).
+
+    Une entrée n'est réutilisée que si toutes les métadonnées du fichier sont identiques. Les fichiers
+    modifiés dans les deux dernières secondes ne sont pas mis en cache, pour ne pas manquer une
+    écriture survenue dans la même graduation d'horodatage que la lecture. Chaque algorithme a sa table
+    (`hashes` pour SHA-256, comme dans les versions précédentes).
+    """
+
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, path=None, algorithm="sha256"):
+        self.path = path or HASH_CACHE_PATH
+        self.table = "hashes" if _check_digest_algorithm(algorithm) == "sha256" else f"hashes_{algorithm}"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER, inode INTEGER, digest TEXT)"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _prefix_range(directory):
+        prefix = os.path.join(os.path.abspath(directory), "")
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def load_directory(self, directory):
+        """Charge en une requête toutes les entrées situées sous `directory`."""
+        rows = self.connection.execute(
+            f"SELECT path, size, mtime_ns, ctime_ns, inode, digest FROM {self.table} WHERE path >= ? AND path < ?",
+            self._prefix_range(directory),
+        )
+        return {row[0]: (tuple(row[1:5]), row[5]) for row in rows}
+
+    def update_directory(self, directory, entries, cached):
+        """Enregistre les nouvelles empreintes et évince celles des fichiers disparus sous `directory`.
+
+        `entries` associe chemin absolu -> (signature stat, empreinte) pour les fichiers présents,
+        `cached` est le résultat de `load_directory` pour ce même répertoire.
+        """
+        now_ns = time.time_ns()
+        stale = [(path,) for path in cached if path not in entries]
+        changed = [
+            (path, *stat_key, digest)
+            for path, (stat_key, digest) in entries.items()
+            if cached.get(path) != (stat_key, digest) and now_ns - stat_key[1] > self.RACY_WINDOW_NS
+        ]
+        with self.connection:
+            self.connection.executemany(f"DELETE FROM {self.table} WHERE path = ?", stale)
+            self.connection.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)", changed)
+
+    def lookup(self, path):
+        """Entrée (signature stat, empreinte) d'un seul fichier, ou None (parcours en mémoire bornée)."""
+        row = self.connection.execute(
+            f"SELECT size, mtime_ns, ctime_ns, inode, digest FROM {self.table} WHERE path = ?", (path,)
+        ).fetchone()
+        return None if row is None else (tuple(row[:4]), row[4])
+
+    def store(self, entries):
+        """Enregistre [(chemin absolu, signature stat, empreinte)] sans évincer d'entrée (voir `prune`, appelé
+        à la fin de chaque passe en mémoire bornée)."""
+        now_ns = time.time_ns()
+        rows = [(path, *key, digest) for path, key, digest in entries if now_ns - key[1] > self.RACY_WINDOW_NS]
+        with self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def prune(self, directory=None):
+        """Supprime les entrées (de l'algorithme du cache) dont le fichier n'existe plus, sous `directory`
+        ou dans tout le cache. Les chemins sont relus par lots de CACHE_BATCH_SIZE : la mémoire utilisée
+        ne dépend pas de la taille du cache."""
+        low, high = self._prefix_range(directory) if directory is not None else ("", None)
+        removed = 0
+        while True:
+            query = f"SELECT path FROM {self.table} WHERE path > ?" + (" AND path < ?" if high else "")
+            paths = [row[0] for row in self.connection.execute(
+                query + " ORDER BY path LIMIT ?", (low, high, CACHE_BATCH_SIZE) if high else (low, CACHE_BATCH_SIZE))]
+            if not paths:
+                return removed
+            stale = [(path,) for path in paths if not os.path.exists(path)]
+            with self.connection:
+                self.connection.executemany(f"DELETE FROM {self.table} WHERE path = ?", stale)
+            removed += len(stale)
+            low = paths[-1]
+
+def stat_key(st):
+    return (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+
+class VerifyCache:
+    """Cache SQLite des vérifications réussies, partagé entre processus (WAL, transactions courtes).
+
+    Une entrée associe (chemin absolu, identifiant de la clé publique) à la signature stat du fichier
+    (taille, mtime_ns, ctime_ns, inode) et à l'empreinte de la signature et de ses métadonnées ; elle ne
+    sert que si tout est identique. Seuls les succès sont mémorisés, et jamais pour un fichier modifié dans
+    les deux dernières secondes. Au-delà de `max_size` entrées, les moins récemment utilisées sont évincées.
+
+    Une consultation réussie ne réécrit `last_used` que s'il date de plus de LAST_USED_REFRESH_NS, et le nombre
+    d'entrées est suivi au fil des insertions (recompté seulement quand il semble dépasser `max_size`) : un
+    succès du cache ne coûte qu'une lecture. `get_verify_cache()` réutilise la connexion d'un thread.
+    """
+
+    RACY_WINDOW_NS = HashCache.RACY_WINDOW_NS
+    LAST_USED_REFRESH_NS = 600_000_000_000
+
+    def __init__(self, path=None, max_size=None):
+        self.path = path or VERIFY_CACHE_PATH
+        self.max_size = VERIFY_CACHE_SIZE if max_size is None else max_size
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Cache reconstructible : pas de fsync par transaction
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS verified ("
+                "path TEXT, key_id TEXT, size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER, inode INTEGER, "
+                "signature TEXT, last_used INTEGER, PRIMARY KEY (path, key_id))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS verified_last_used ON verified (last_used)")
+        self._count = self.connection.execute("SELECT COUNT(*) FROM verified").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def lookup(self, path, key_id, stat_key, signature):
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, ctime_ns, inode, signature, last_used FROM verified WHERE path = ? AND key_id = ?",
+            (path, key_id),
+        ).fetchone()
+        if row is None or tuple(row[:4]) != stat_key or row[4] != signature:
+            return False
+        now_ns = time.time_ns()
+        if now_ns - row[5] > self.LAST_USED_REFRESH_NS:
+            with self.connection:
+                self.connection.execute("UPDATE verified SET last_used = ? WHERE path = ? AND key_id = ?",
+                                        (now_ns, path, key_id))
+        return True
+
+    def store(self, path, key_id, stat_key, signature):
+        """Mémorise une vérification réussie ; l'insertion et l'éviction forment une seule transaction."""
+        now_ns = time.time_ns()
+        if now_ns - stat_key[1] <= self.RACY_WINDOW_NS:
+            return False
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO verified VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (path, key_id, *stat_key, signature, now_ns))
+            # Estimation majorée (un remplacement compte comme une insertion) ; les insertions des autres
+            # processus sont rattrapées au prochain recomptage
+            self._count += 1
+            if self._count > self.max_size:
+                self._count = self.connection.execute("SELECT COUNT(*) FROM verified").fetchone()[0]
+                excess = self._count - self.max_size
+                if excess > 0:
+                    self.connection.execute(
+                        "DELETE FROM verified WHERE rowid IN (SELECT rowid FROM verified ORDER BY last_used LIMIT ?)",
+                        (excess,))
+                    self._count -= excess
+        return True
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM verified")
+        self._count = 0
+
+_verify_caches = threading.local()
+
+def get_verify_cache(path=None):
+    """VerifyCache du thread appelant, ouvert une seule fois par thread et par processus."""
+    path = path or VERIFY_CACHE_PATH
+    cache = getattr(_verify_caches, "cache", None)
+    # Une connexion SQLite ne doit pas servir dans un processus enfant créé par fork
+    if cache is None or cache.path != path or cache.pid != os.getpid():
+        cache = _verify_caches.cache = VerifyCache(path)
+    return cache
+
+def signature_fingerprint(signed_file):
+    """Empreinte de la signature et des fichiers qui en changent le sens (algorithme, liste des segments)."""
+    hasher = hashlib.sha256()
+    for path in (signed_file, signed_file + DIGEST_SUFFIX, signed_file + SEGMENTS_SUFFIX):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            hasher.update(b"-")
+            continue
+        hasher.update(len(data).to_bytes(8, "big") + data)
+    return hasher.hexdigest()
+
+def verification_entry(file_path, public_key, signed_file, st=None):
+    """Clé d'une vérification dans le VerifyCache : (chemin, clé, signature stat, empreinte de la signature)."""
+    if HAS_CRYPTOGRAPHY:
+        key_id = _key_cache.load(public_key, False)[1]
+    else:
+        with open(public_key, "rb") as key_file:
+            key_id = hashlib.sha256(key_file.read()).hexdigest()
+    st = os.stat(file_path) if st is None else st
+    return (os.path.abspath(file_path), key_id, stat_key(st), signature_fingerprint(signed_file))
+
+# Hachage d'un répertoire en ne recalculant que les fichiers modifiés depuis le dernier passage
+# `progress(octets_traités, octets_totaux)` suit les octets réellement hachés ou repris du cache
+# `on_digest(chemin_relatif, empreinte)` reçoit chaque empreinte (cache puis hachage) ; lever une exception arrête tout
+def hash_directory_files(directory_path, rel_paths, max_workers=None, paranoid=None, progress=None,
+                         on_digest=None, cancel=None, algorithm="sha256"):
+    paranoid = PARANOID if paranoid is None else paranoid
+    with HashCache(algorithm=algorithm) as cache:
+        with metrics.phase("cache"):
+            cached = cache.load_directory(directory_path)
+        entries, digests, to_hash, sizes = {}, {}, [], {}
+        cached_bytes = 0
+        for rel_path in rel_paths:
+            if cancel is not None:
+                cancel.check()
+            abs_path = os.path.join(os.path.abspath(directory_path), *rel_path.split("/"))
+            key = stat_key(os.stat(abs_path))
+            hit = cached.get(abs_path)
+            if not paranoid and hit is not None and hit[0] == key:
+                if on_digest:
+                    on_digest(rel_path, hit[1])
+                digests[rel_path] = hit[1]
+                entries[abs_path] = hit
+                cached_bytes += key[0]
+            else:
+                to_hash.append((rel_path, abs_path, key))
+                sizes[rel_path] = key[0]
+
+        metrics.add("cache_hits", len(rel_paths) - len(to_hash))
+        total_bytes = cached_bytes + sum(sizes.values())
+        done_bytes = cached_bytes
+        if progress:
+            progress(done_bytes, total_bytes)
+
+        def on_file_done(rel_path, digest):
+            nonlocal done_bytes
+            if on_digest:
+                on_digest(rel_path, digest)
+            if progress:
+                done_bytes += sizes[rel_path]
+                progress(done_bytes, total_bytes)
+
+        fresh = hash_files_parallel(directory_path, [rel_path for rel_path, _, _ in to_hash], max_workers,
+                                    on_file_done if progress or on_digest else None, cancel, algorithm)
+        for rel_path, abs_path, key in to_hash:
+            digests[rel_path] = fresh[rel_path]
+            entries[abs_path] = (key, fresh[rel_path])
+        with metrics.phase("cache"):
+            cache.update_directory(directory_path, entries, cached)
+    return digests
+
+# Mode mémoire bornée (DS_SIGN_MEMORY_LIMIT) : un seul parcours en flux, dont les entrées sont triées par runs
+# sur disque puis fusionnées. Le listing obtenu est identique octet pour octet à celui du mode en mémoire ;
+# il est haché au fil de son écriture et signé sans être relu.
+class SortedRuns:
+    """Listing (chemin, valeur) trié par tri externe, en mémoire bornée.
+
+    Les enregistrements s'accumulent jusqu'à `memory_limit` octets (taille estimée des objets Python),
+    sont triés puis écrits en run sur disque ; l'itération fusionne les runs avec heapq.merge, par passes
+    d'au plus MERGE_FAN_IN fichiers. Tant qu'aucun run n'a été écrit, tout reste en mémoire.
+    Un enregistrement est la chaîne "chemin\\0valeur" : "\\0" précède tout autre caractère, l'ordre
+    des enregistrements est donc celui des chemins. Dans les runs, un enregistrement dont le chemin
+    contient "\\" ou un saut de ligne est échappé comme dans l'index du mode tree.
+    """
+
+    def __init__(self, memory_limit, sort_dir=None):
+        self.memory_limit = memory_limit
+        self.sort_dir = sort_dir or SORT_DIR
+        self.count = 0
+        self.runs_written = 0
+        self._records = []
+        self._size = 0
+        self._runs = []
+        self._workdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def add(self, rel_path, value):
+        record = f"{rel_path}\0{value}"
+        self._records.append(record)
+        self._size += sys.getsizeof(record) + 8  # La chaîne et son pointeur dans la liste
+        self.count += 1
+        if self._size >= self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        self._records.sort()
+        self._runs.append(self._write_run(self._records))
+        self._records = []
+        self._size = 0
+
+    def _write_run(self, records):
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix="ds-sign-sort-", dir=self.sort_dir)
+        path = os.path.join(self._workdir, f"run{self.runs_written:06d}")
+        self.runs_written += 1
+        with metrics.phase("sort"), open(path, "w", encoding="utf-8", newline="\n",
+                                         buffering=RUN_BUFFER_SIZE) as run:
+            run.writelines(map(_encode_record, records))
+        return path
+
+    @staticmethod
+    def _open_runs(paths):
+        return [open(path, "r", encoding="utf-8", newline="\n", buffering=RUN_BUFFER_SIZE) for path in paths]
+
+    @staticmethod
+    def _merge(files):
+        return heapq.merge(*(map(_decode_record, run) for run in files))
+
+    def __iter__(self):
+        """Produit (chemin, valeur) dans l'ordre des chemins."""
+        if not self._runs:
+            self._records.sort()
+            for record in self._records:
+                yield tuple(record.split("\0", 1))
+            return
+        if self._records:
+            self._spill()
+        while len(self._runs) > MERGE_FAN_IN:
+            group, self._runs = self._runs[:MERGE_FAN_IN], self._runs[MERGE_FAN_IN:]
+            files = self._open_runs(group)
+            try:
+                self._runs.append(self._write_run(self._merge(files)))
+            finally:
+                for run in files:
+                    run.close()
+            for path in group:
+                os.remove(path)
+        files = self._open_runs(self._runs)
+        try:
+            for record in self._merge(files):
+                yield tuple(record.split("\0", 1))
+        finally:
+            for run in files:
+                run.close()
+
+def _encode_record(record):
+    if "\\" in record or "\n" in record:
+        return f"\\{_escape_index_path(record)}\n"
+    return record + "\n"
+
+def _decode_record(line):
+    return _unescape_index_path(line[1:-1]) if line.startswith("\\") else line[:-1]
+
+# Parcours en flux des fichiers d'un répertoire (chemins relatifs avec "/", dans un ordre quelconque) :
+# même sélection que list_directory_files, y compris les dossiers illisibles ignorés comme par os.walk,
+# sans jamais construire la liste complète
+def iter_directory_files(directory_path, excluded=SIGNATURE_FILES, cancel=None):
+    pending = [""]
+    while pending:
+        if cancel is not None:
+            cancel.check()
+        rel_dir = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(directory_path, *rel_dir.split("/")) if rel_dir else directory_path)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():  # Liens vers des dossiers listés mais pas suivis, comme os.walk
+                        pending.append(rel_path)
+                elif rel_dir or entry.name not in excluded:
+                    yield rel_path
+
+# Empreintes des fichiers `rel_paths` (itérable lu au fil de l'eau) : produit (chemin relatif, empreinte)
+# dans un ordre proche de celui des entrées. Le cache est consulté fichier par fichier ; les fichiers à hacher
+# passent par une fenêtre bornée de tâches et les nouvelles empreintes sont enregistrées par lots.
+# `progress(octets traités, None)` : le total est inconnu.
+def _iter_hashed_files(directory_path, rel_paths, max_workers=None, paranoid=None, progress=None, cancel=None,
+                       algorithm="sha256"):
+    paranoid = PARANOID if paranoid is None else paranoid
+    root = os.path.abspath(directory_path)
+    workers_cancel = CancellationToken(parent=cancel)
+    window, fresh = deque(), []
+    done_bytes = 0
+    try:
+        with HashCache(algorithm=algorithm) as cache, JobScheduler(max_workers) as scheduler:
+            def collect():
+                nonlocal done_bytes
+                rel_path, abs_path, key, future = window.popleft()
+                digest = future.result()
+                fresh.append((abs_path, key, digest))
+                if len(fresh) >= CACHE_BATCH_SIZE:
+                    with metrics.phase("cache"):
+                        cache.store(fresh)
+                    fresh.clear()
+                done_bytes += key[0]
+                if progress:
+                    progress(done_bytes, None)
+                return rel_path, digest
+
+            try:
+                for rel_path in rel_paths:
+                    abs_path = os.path.join(root, *rel_path.split("/"))
+                    key = stat_key(os.stat(abs_path))
+                    hit = None if paranoid else cache.lookup(abs_path)
+                    if hit is not None and hit[0] == key:
+                        metrics.add("cache_hits")
+                        done_bytes += key[0]
+                        if progress:
+                            progress(done_bytes, None)
+                        yield rel_path, hit[1]
+                        continue
+                    while window and (window[0][3].done() or len(window) >= scheduler.max_pending):
+                        yield collect()
+                    future = scheduler.submit(calculate_hash, abs_path, cancel=workers_cancel, algorithm=algorithm)
+                    window.append((rel_path, abs_path, key, future))
+                while window:
+                    yield collect()
+                with metrics.phase("cache"):
+                    if fresh:
+                        cache.store(fresh)
+                    # Passe complète : les entrées des fichiers supprimés ou renommés sous le dossier sont évincées
+                    cache.prune(root)
+            except BaseException:
+                workers_cancel.cancel()  # Avant la sortie du `with`, qui attend les tâches en cours
+                raise
+    finally:
+        workers_cancel.release()
+
+# Écrit un listing (en-tête puis lignes) et retourne son empreinte, calculée au fil de l'écriture
+def _write_hashed_listing(path, header, lines, algorithm="sha256"):
+    hasher = new_hasher(algorithm)
+    with metrics.phase("write"), open(path, "wb") as listing:
+        chunk = [header + "\n"]
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= 4096:
+                data = "".join(chunk).encode("utf-8")
+                hasher.update(data)
+                listing.write(data)
+                chunk = []
+        data = "".join(chunk).encode("utf-8")
+        hasher.update(data)
+        listing.write(data)
+    return hasher.digest()
+
+def _sign_directory_manifest_bounded(directory_path, private_key, memory_limit, max_workers=None, paranoid=None,
+                                     progress=None, cancel=None, algorithm="sha256", backend=None):
+    manifest_path = os.path.join(directory_path, MANIFEST_FILE)
+    with SortedRuns(memory_limit) as listing:
+        for rel_path, digest in _iter_hashed_files(directory_path, iter_directory_files(directory_path, cancel=cancel),
+                                                   max_workers, paranoid, progress, cancel, algorithm):
+            listing.add(rel_path, digest)
+        digest = _write_hashed_listing(manifest_path, manifest_header(MANIFEST_HEADER, algorithm),
+                                       (_manifest_line(digest, rel_path) for rel_path, digest in listing), algorithm)
+    signed_manifest_path = manifest_path + ".signed"
+    write_segments(signed_manifest_path)
+    return manifest_path, sign_digest_standalone(digest, private_key, signed_manifest_path, backend, algorithm)
+
+def _verify_directory_manifest_bounded(directory_path, public_key, memory_limit, max_workers=None, paranoid=None,
+                                       progress=None, fail_fast=False, cancel=None, differences=None, backend=None):
+    manifest_path = os.path.join(directory_path, MANIFEST_FILE)
+    signed_manifest_path = manifest_path + ".signed"
+    if not os.path.exists(signed_manifest_path):
+        return False, "Missing signature files in directory."
+    if not verify_file_standalone(manifest_path, public_key, signed_manifest_path, backend, cancel=cancel,
+                                  paranoid=paranoid):
+        return False, "Signature invalid."
+
+    # Le listing trié des fichiers présents est fusionné en flux avec le manifeste (trié lui aussi) : les
+    # fichiers manquants et ajoutés sont relevés au passage, les fichiers communs hachés dans cet ordre.
+    # Avec `fail_fast`, le parcours de fusion et le hachage s'arrêtent à la première différence.
+    algorithm = read_manifest_algorithm(manifest_path)
+    found = {"modified": [], "missing": [], "added": []}
+    truncated = False
+    expected = {}  # Empreintes attendues des fichiers en cours de hachage (au plus une fenêtre de tâches)
+
+    def note(label, rel_path):
+        nonlocal truncated
+        if len(found[label]) < DIFFERENCES_LIMIT:
+            found[label].append(rel_path)
+        else:
+            truncated = True
+
+    def common_files(live):
+        for rel_path, old, new in _merge_join(iter_manifest(manifest_path), live):
+            if old is None:
+                note("added", rel_path)
+            elif new is None:
+                note("missing", rel_path)
+            else:
+                expected[rel_path] = old
+                yield rel_path
+            if fail_fast and (found["added"] or found["missing"]):
+                return
+
+    with SortedRuns(memory_limit) as live:
+        for rel_path in iter_directory_files(directory_path, cancel=cancel):
+            live.add(rel_path, "")
+        for rel_path, digest in _iter_hashed_files(directory_path, common_files(live), max_workers, paranoid,
+                                                   progress, cancel, algorithm):
+            if digest != expected.pop(rel_path):
+                note("modified", rel_path)
+                if fail_fast:
+                    break
+    modified, missing, added = found["modified"], found["missing"], found["added"]
+    if modified or missing or added:
+        _record_differences(differences, modified, missing, added, truncated)
+        if fail_fast:
+            return False, _fail_fast_message("Directory content mismatch", modified, missing, added)
+        return False, "Directory content mismatch.\n" + _format_differences(modified, missing, added)
+    return True, f"Directory verification successful ({live.count} files checked)."
+
+# Arbre de Merkle calqué sur l'arborescence : chaque dossier est la racine d'un arbre binaire
+# sur ses entrées triées par nom. Les préfixes 0x00/0x01/0x02 séparent feuilles, nœuds et dossiers vides.
+MERKLE_EMPTY = hashlib.sha256(b"\x02").digest()
+
+def _merkle_pair(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def _merkle_entry(name, is_dir, digest):
+    encoded = name.encode("utf-8")
+    kind = b"d" if is_dir else b"f"
+    return hashlib.sha256(b"\x00" + kind + len(encoded).to_bytes(4, "big") + encoded + digest).digest()
+
+def _merkle_levels(leaves):
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_merkle_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])  # Le nœud impair remonte tel quel
+        levels.append(parents)
+    return levels
+
+def _merkle_climb(node, index, count, siblings):
+    """Remonte d'une feuille à la racine de son dossier à partir des nœuds frères."""
+    siblings = iter(siblings)
+    while count > 1:
+        if index % 2:
+            node = _merkle_pair(bytes.fromhex(next(siblings)), node)
+        elif index + 1 < count:
+            node = _merkle_pair(node, bytes.fromhex(next(siblings)))
+        index //= 2
+        count = (count + 1) // 2
+    if next(siblings, None) is not None:
+        raise ValueError("Malformed Merkle proof.")
+    return node
+
+def _build_merkle_tree(digests):
+    """Construit {nom: sous-arbre | empreinte} à partir de {chemin relatif: empreinte hex}."""
+    tree = {}
+    for rel_path, digest in digests.items():
+        node = tree
+        *parents, name = rel_path.split("/")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[name] = bytes.fromhex(digest)
+    return tree
+
+def _hash_merkle_tree(node):
+    """Retourne (empreinte du dossier, feuilles triées, enfants annotés) pour un sous-arbre."""
+    names = sorted(node)
+    children = {}
+    leaves = []
+    for name in names:
+        child = node[name]
+        if isinstance(child, dict):
+            children[name] = _hash_merkle_tree(child)
+            leaves.append(_merkle_entry(name, True, children[name][0]))
+        else:
+            leaves.append(_merkle_entry(name, False, child))
+    root = _merkle_levels(leaves)[-1][0] if leaves else MERKLE_EMPTY
+    return root, names, leaves, children
+
+def merkle_root_from_digests(digests):
+    return _hash_merkle_tree(_build_merkle_tree(digests))[0]
+
+def build_merkle_proof(digests, rel_path, algorithm="sha256"):
+    """Preuve d'inclusion d'un fichier ou d'un sous-dossier, du niveau le plus profond vers la racine.
+
+    `algorithm` est celui des empreintes des feuilles ; la vérification l'exige identique à celui de la racine signée.
+    """
+    parts = rel_path.strip("/").split("/")
+    annotated = _hash_merkle_tree(_build_merkle_tree(digests))
+    steps = []
+    for depth, name in enumerate(parts):
+        _, names, leaves, children = annotated
+        if name not in names:
+            raise ValueError(f"{rel_path} is not part of the signed tree.")
+        index = names.index(name)
+        siblings = []
+        position = index
+        for level in _merkle_levels(leaves)[:-1]:
+            if position ^ 1 < len(level):
+                siblings.append(level[position ^ 1].hex())
+            position //= 2
+        steps.append({"index": index, "count": len(leaves), "siblings": siblings})
+        if depth < len(parts) - 1:
+            if name not in children:
+                raise ValueError(f"{rel_path} is not part of the signed tree.")
+            annotated = children[name]
+    is_dir = parts[-1] in annotated[3]
+    return {"version": 1, "path": "/".join(parts), "type": "dir" if is_dir else "file", "algorithm": algorithm,
+            "steps": steps[::-1]}
+
+def merkle_root_from_proof(proof, target_digest):
+    """Recalcule la racine à partir de l'empreinte de la cible (contenu du fichier ou du sous-dossier)."""
+    parts = proof["path"].split("/")
+    node = target_digest
+    for depth, step in zip(range(len(parts) - 1, -1, -1), proof["steps"]):
+        is_dir = depth < len(parts) - 1 or proof["type"] == "dir"
+        leaf = _merkle_entry(parts[depth], is_dir, node)
+        node = _merkle_climb(leaf, step["index"], step["count"], step["siblings"])
+    if len(proof["steps"]) != len(parts):
+        raise ValueError("Malformed Merkle proof.")
+    return node
+
+def merkle_proof(directory_path, rel_path):
+    """Preuve pour `rel_path`, construite depuis `merkle_file` sans relire le contenu des fichiers."""
+    merkle_path = os.path.join(directory_path, MERKLE_FILE)
+    return build_merkle_proof(read_manifest(merkle_path), rel_path.replace(os.sep, "/"),
+                              read_manifest_algorithm(merkle_path))
+
+def write_merkle_proof(directory_path, rel_path, output_path):
+    with open(output_path, "w", encoding="utf-8") as proof_file:
+        json.dump(merkle_proof(directory_path, rel_path), proof_file, indent=1)
+    return output_path
+
+# Vérifier un seul fichier (ou sous-dossier) d'un répertoire signé en mode Merkle
+def verify_merkle_member(directory_path, rel_path, public_key, proof=None):
+    try:
+        root_path = os.path.join(directory_path, MERKLE_ROOT_FILE)
+        if not os.path.exists(root_path + ".signed"):
+            return False, "Missing signature files in directory."
+        if not verify_file_standalone(root_path, public_key, root_path + ".signed"):
+            return False, "Signature invalid."
+        algorithm, signed_root = read_merkle_root(root_path)
+
+        rel_path = rel_path.replace(os.sep, "/").strip("/")
+        if proof is None:
+            proof = merkle_proof(directory_path, rel_path)
+        elif isinstance(proof, str):
+            with open(proof, "r", encoding="utf-8") as proof_file:
+                proof = json.load(proof_file)
+        if proof["path"] != rel_path:
+            return False, "Proof does not match the requested path."
+        # L'algorithme des feuilles est celui de la racine signée ; une preuve d'un autre algorithme est refusée
+        proof_algorithm = proof.get("algorithm", "sha256")
+        if proof_algorithm != algorithm:
+            return False, f"Proof digest algorithm {proof_algorithm} does not match the signed root ({algorithm})."
+
+        # Seule la cible est relue : un fichier, ou les fichiers du sous-dossier demandé
+        # Les nœuds de l'arbre restent en SHA-256
+        target_path = os.path.join(directory_path, *rel_path.split("/"))
+        if proof["type"] == "dir":
+            target_digest = merkle_root_from_digests(
+                hash_directory_files(target_path, list_directory_files(target_path, excluded=()),
+                                     algorithm=algorithm))
+        else:
+            target_digest = bytes.fromhex(calculate_hash(target_path, algorithm=algorithm))
+
+        if merkle_root_from_proof(proof, target_digest) != signed_root:
+            return False, f"Merkle proof mismatch for {rel_path}."
+        return True, f"{rel_path} verified against the signed Merkle root."
+    except Exception as e:
+        return False, str(e)
+
+# Écrit le manifeste (ou l'arbre de Merkle) d'empreintes déjà calculées et signe sa racine,
+# sans relire les fichiers ; utilisé aussi par le mode surveillance (ds_sign_watch.py)
+def sign_directory_digests(directory_path, digests, private_key, mode, cancel=None, algorithm="sha256", backend=None):
+    if mode == "manifest":
+        manifest_path = os.path.join(directory_path, MANIFEST_FILE)
+        write_manifest(manifest_path, digests, header=manifest_header(MANIFEST_HEADER, algorithm))
+        # Une seule signature couvre l'ensemble du manifeste
+        return manifest_path, sign_file_standalone(manifest_path, private_key, backend, cancel=cancel,
+                                                   algorithm=algorithm)
+    if mode != "merkle":
+        raise ValueError(f"Directory mode {mode} does not sign file digests")
+    merkle_path = os.path.join(directory_path, MERKLE_FILE)
+    root_path = os.path.join(directory_path, MERKLE_ROOT_FILE)
+    write_manifest(merkle_path, digests, header=manifest_header(MERKLE_HEADER, algorithm))
+    with open(root_path, "w", encoding="utf-8") as root_file:
+        root_file.write(_format_tree_hash(merkle_root_from_digests(digests).hex(), algorithm))
+    # Seule la racine est signée, avec l'algorithme des feuilles
+    return merkle_path, sign_file_standalone(root_path, private_key, backend, cancel=cancel, algorithm=algorithm)
+
+def _sign_directory_merkle(directory_path, private_key, max_workers=None, paranoid=None, progress=None, cancel=None,
+                           algorithm="sha256", backend=None):
+    digests = hash_directory_files(directory_path, list_directory_files(directory_path, cancel=cancel), max_workers,
+                                   paranoid, progress, cancel=cancel, algorithm=algorithm)
+    return sign_directory_digests(directory_path, digests, private_key, "merkle", cancel, algorithm, backend)
+
+# Le fichier de hash de l'arborescence préfixe l'empreinte par son algorithme, sauf pour SHA-256 ("blake2b:...") ;
+# une seconde ligne "index <empreinte>" rattache l'index trié à la signature
+def _format_tree_hash(hash_value, algorithm, index_hash=None):
+    content = hash_value if algorithm == "sha256" else f"{algorithm}:{hash_value}"
+    return content if index_hash is None else f"{content}\nindex {index_hash}"
+
+def _parse_tree_hash(content):
+    """Retourne (algorithme, empreinte de l'arborescence, empreinte de l'index ou None)."""
+    lines = content.strip().splitlines()
+    algorithm, _, hash_value = lines[0].strip().rpartition(":")
+    index_hash = None
+    if len(lines) > 1 and lines[1].startswith("index "):
+        index_hash = lines[1][len("index "):].strip()
+    return _check_digest_algorithm(algorithm or "sha256"), hash_value, index_hash
+
+# La racine de Merkle est écrite comme le hash du mode tree ("blake2b:<racine>", sans préfixe en SHA-256) :
+# l'algorithme des feuilles est ainsi couvert par la signature, pas seulement par l'en-tête de merkle_file
+def read_merkle_root(root_path):
+    """Retourne (algorithme des feuilles, racine en octets) d'un fichier merkle_root."""
+    with open(root_path, "r", encoding="utf-8") as root_file:
+        algorithm, root, _ = _parse_tree_hash(root_file.read())
+    return algorithm, bytes.fromhex(root)
+
+def _sign_directory_tree(directory_path, private_key, cancel=None, algorithm="sha256", memory_limit=0, backend=None):
+    dir_file_path = os.path.join(directory_path, DIR_FILE)
+    hash_file_path = os.path.join(directory_path, HASH_FILE)
+    signed_hash_file_path = hash_file_path + ".signed"
+
+    # Générer le fichier d'arborescence et, du même parcours, l'index trié des entrées
+    with open(dir_file_path, "w", encoding="utf-8") as dir_file:
+        dir_file.write(f"{directory_path}:\n")
+    index_path = os.path.join(directory_path, TREE_INDEX_FILE)
+    if memory_limit:
+        with SortedRuns(memory_limit) as listing:
+            def on_entry(rel_path, is_dir):
+                if rel_path not in SIGNATURE_FILES:
+                    listing.add(rel_path, "d" if is_dir else "f")
+            generate_tree(directory_path, dir_file_path, cancel=cancel, on_entry=on_entry)
+            write_tree_index(index_path, listing)
+    else:
+        entries = []
+        generate_tree(directory_path, dir_file_path, cancel=cancel,
+                      on_entry=lambda rel_path, is_dir: entries.append((rel_path, is_dir)))
+        write_tree_index(index_path, _tree_index_entries(entries))
+
+    # Calculer le hash du fichier d'arborescence (et de l'index)
+    with open(hash_file_path, "w", encoding="utf-8") as hash_file:
+        hash_value = calculate_hash(dir_file_path, cancel=cancel, algorithm=algorithm)
+        index_hash = calculate_hash(index_path, cancel=cancel, algorithm=algorithm)
+        hash_file.write(_format_tree_hash(hash_value, algorithm, index_hash))
+
+    # Signer le hash
+    sign_file_standalone(hash_file_path, private_key, backend, cancel=cancel, algorithm=algorithm)
+    return dir_file_path, signed_hash_file_path
+
+def _sign_directory_manifest(directory_path, private_key, max_workers=None, paranoid=None, progress=None,
+                             cancel=None, algorithm="sha256", backend=None):
+    digests = hash_directory_files(directory_path, list_directory_files(directory_path, cancel=cancel), max_workers,
+                                   paranoid, progress, cancel=cancel, algorithm=algorithm)
+    return sign_directory_digests(directory_path, digests, private_key, "manifest", cancel, algorithm, backend)
+
+# Fonction pour signer un répertoire
+# Avec `memory_limit` (octets, DS_SIGN_MEMORY_LIMIT par défaut), les modes manifest et tree trient leurs listings
+# sur disque au-delà de cette taille ; le mode merkle garde ses empreintes en mémoire
+@_measured("sign_directory")
+def sign_directory(directory_path, private_key, mode=None, max_workers=None, paranoid=None, progress=None,
+                   cancel=None, algorithm=None, memory_limit=None, backend=None):
+    try:
+        mode = mode or DIRECTORY_MODE
+        algorithm = resolve_digest_algorithm(algorithm, private_key)
+        memory_limit = MEMORY_LIMIT if memory_limit is None else memory_limit
+        if mode == "manifest" and memory_limit:
+            return _sign_directory_manifest_bounded(directory_path, private_key, memory_limit, max_workers, paranoid,
+                                                    progress, cancel, algorithm, backend)
+        if mode == "manifest":
+            return _sign_directory_manifest(directory_path, private_key, max_workers, paranoid, progress, cancel,
+                                            algorithm, backend)
+        if mode == "merkle":
+            return _sign_directory_merkle(directory_path, private_key, max_workers, paranoid, progress, cancel,
+                                          algorithm, backend)
+        if mode != "tree":
+            raise ValueError(f"Unknown directory signing mode: {mode}")
+        return _sign_directory_tree(directory_path, private_key, cancel, algorithm, memory_limit, backend)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error signing directory: {e}")
+
+def _verify_directory_tree(directory_path, public_key, paranoid=None, fail_fast=False, cancel=None, differences=None,
+                           memory_limit=0, backend=None):
+    dir_file_path = os.path.join(directory_path, DIR_FILE)
+    hash_file_path = os.path.join(directory_path, HASH_FILE)
+    signed_hash_file_path = hash_file_path + ".signed"
+
+    # Vérifier si les fichiers nécessaires existent
+    if not all(os.path.exists(p) for p in (dir_file_path, hash_file_path, signed_hash_file_path)):
+        return False, "Missing signature files in directory."
+
+    # Vérifier le hash de l'arborescence
+    with open(hash_file_path, "r", encoding="utf-8") as hash_file:
+        algorithm, original_hash, index_hash = _parse_tree_hash(hash_file.read())
+    recalculated_hash = calculate_hash(dir_file_path, cancel=cancel, algorithm=algorithm)
+
+    if recalculated_hash != original_hash:
+        return False, "Directory structure hash mismatch."
+
+    # Vérifier la signature du hash
+    valid = verify_file_standalone(hash_file_path, public_key, signed_hash_file_path, backend, cancel=cancel,
+                                   paranoid=paranoid)
+    if not valid:
+        return False, "Signature invalid."
+    if index_hash is None:
+        return True, "Directory verification successful."  # Signature antérieure à l'index
+
+    # L'arborescence actuelle est comparée à l'index signé en une seule passe de fusion
+    index_path = os.path.join(directory_path, TREE_INDEX_FILE)
+    if not os.path.exists(index_path) or calculate_hash(index_path, cancel=cancel, algorithm=algorithm) != index_hash:
+        return False, "Directory index hash mismatch."
+    if memory_limit:
+        with SortedRuns(memory_limit) as live:
+            with metrics.phase("walk"):
+                for _, rel_path, _, is_dir in _iter_tree(directory_path, cancel=cancel):
+                    if rel_path not in SIGNATURE_FILES:
+                        live.add(rel_path, "d" if is_dir else "f")
+            modified, missing, added, truncated = _collect_differences(
+                _merge_diff(read_tree_index(index_path), live), fail_fast, DIFFERENCES_LIMIT)
+        count = live.count
+    else:
+        live = tree_index_entries(directory_path, cancel)
+        modified, missing, added, truncated = _collect_differences(_merge_diff(read_tree_index(index_path), live),
+                                                                   fail_fast)
+        count = len(live)
+    if modified or missing or added:
+        _record_differences(differences, modified, missing, added, truncated)
+        if fail_fast:
+            return False, _fail_fast_message("Directory structure mismatch", modified, missing, added)
+        return False, "Directory structure mismatch.\n" + _format_differences(modified, missing, added)
+    return True, f"Directory verification successful ({count} entries checked)."
+
+# `differences` (dictionnaire fourni par l'appelant) reçoit les listes complètes, pour la CLI et l'interface ;
+# en mémoire bornée, au plus DIFFERENCES_LIMIT chemins par catégorie et "truncated" quand il en manque
+def _record_differences(differences, modified, missing, added, truncated=False):
+    if differences is not None:
+        differences.update(modified=list(modified), missing=list(missing), added=list(added))
+        if truncated:
+            differences["truncated"] = True
+
+def differences_report(differences):
+    """Texte listant toutes les différences enregistrées par une vérification (une ligne par entrée)."""
+    lines = []
+    for label in ("modified", "missing", "added"):
+        lines += [f"{label.capitalize()}: {path}" for path in differences.get(label, ())]
+    if differences.get("truncated"):
+        lines.append(f"(at most {DIFFERENCES_LIMIT} entries of each kind are listed)")
+    return "\n".join(lines)
+
+def _format_differences(modified, missing, added, limit=5):
+    details = [f"{label}: {', '.join(paths[:limit])}{' ...' if len(paths) > limit else ''}"
+               for label, paths in (("Modified", modified), ("Missing", missing), ("Added", added)) if paths]
+    return "\n".join(details)
+
+class _FirstMismatch(Exception):
+    """Interrompt une vérification « fail-fast » dès la première empreinte différente."""
+
+def _stop_at_first_mismatch(expected):
+    def on_digest(rel_path, digest):
+        if digest != expected[rel_path]:
+            raise _FirstMismatch(rel_path)
+    return on_digest
+
+def _fail_fast_message(title, modified, missing, added):
+    return f"{title} (stopped at the first difference).\n" + _format_differences(modified, missing, added)
+
+def _verify_directory_manifest(directory_path, public_key, max_workers=None, paranoid=None, progress=None,
+                               fail_fast=False, cancel=None, differences=None, backend=None):
+    manifest_path = os.path.join(directory_path, MANIFEST_FILE)
+    signed_manifest_path = manifest_path + ".signed"
+    if not os.path.exists(signed_manifest_path):
+        return False, "Missing signature files in directory."
+
+    # Vérifier d'abord la signature du manifeste lui-même
+    if not verify_file_standalone(manifest_path, public_key, signed_manifest_path, backend, cancel=cancel,
+                                  paranoid=paranoid):
+        return False, "Signature invalid."
+
+    expected = read_manifest(manifest_path)
+    algorithm = read_manifest_algorithm(manifest_path)
+    present = list_directory_files(directory_path, cancel=cancel)
+    missing = sorted(set(expected) - set(present))
+    added = sorted(set(present) - set(expected))
+    to_check = [rel_path for rel_path in present if rel_path in expected]
+    if fail_fast and (missing or added):
+        _record_differences(differences, [], missing, added)
+        return False, _fail_fast_message("Directory content mismatch", [], missing, added)
+    try:
+        actual = hash_directory_files(directory_path, to_check, max_workers, paranoid, progress,
+                                      _stop_at_first_mismatch(expected) if fail_fast else None, cancel, algorithm)
+    except _FirstMismatch as e:
+        _record_differences(differences, [e.args[0]], [], [])
+        return False, _fail_fast_message("Directory content mismatch", [e.args[0]], [], [])
+    modified = [rel_path for rel_path in to_check if actual[rel_path] != expected[rel_path]]
+
+    if missing or added or modified:
+        _record_differences(differences, modified, missing, added)
+        return False, "Directory content mismatch.\n" + _format_differences(modified, missing, added)
+
+    return True, f"Directory verification successful ({len(present)} files checked)."
+
+def _verify_directory_merkle(directory_path, public_key, max_workers=None, paranoid=None, progress=None,
+                             fail_fast=False, cancel=None, differences=None, backend=None):
+    root_path = os.path.join(directory_path, MERKLE_ROOT_FILE)
+    if not os.path.exists(root_path + ".signed"):
+        return False, "Missing signature files in directory."
+    if not verify_file_standalone(root_path, public_key, root_path + ".signed", backend, cancel=cancel,
+                                  paranoid=paranoid):
+        return False, "Signature invalid."
+    algorithm, signed_root = read_merkle_root(root_path)
+    signed_root = signed_root.hex()
+    present = list_directory_files(directory_path, cancel=cancel)
+    on_digest = None
+    if fail_fast:
+        # Le listing des feuilles, s'il correspond à la racine signée, permet de comparer fichier par fichier
+        expected = read_manifest(os.path.join(directory_path, MERKLE_FILE))
+        if merkle_root_from_digests(expected).hex() != signed_root:
+            return False, "Merkle root mismatch."
+        missing = sorted(set(expected) - set(present))
+        added = sorted(set(present) - set(expected))
+        if missing or added:
+            _record_differences(differences, [], missing, added)
+            return False, _fail_fast_message("Merkle root mismatch", [], missing, added)
+        on_digest = _stop_at_first_mismatch(expected)
+    try:
+        actual = hash_directory_files(directory_path, present, max_workers, paranoid, progress, on_digest, cancel,
+                                      algorithm)
+    except _FirstMismatch as e:
+        _record_differences(differences, [e.args[0]], [], [])
+        return False, _fail_fast_message("Merkle root mismatch", [e.args[0]], [], [])
+    if merkle_root_from_digests(actual).hex() == signed_root:
+        return True, f"Directory verification successful ({len(present)} files checked)."
+
+    # Le listing n'est utilisé pour le détail que s'il correspond bien à la racine signée
+    expected = read_manifest(os.path.join(directory_path, MERKLE_FILE))
+    if merkle_root_from_digests(expected).hex() != signed_root:
+        return False, "Merkle root mismatch."
+    missing = sorted(set(expected) - set(actual))
+    added = sorted(set(actual) - set(expected))
+    modified = [rel_path for rel_path in present if rel_path in expected and actual[rel_path] != expected[rel_path]]
+    _record_differences(differences, modified, missing, added)
+    return False, "Merkle root mismatch.\n" + _format_differences(modified, missing, added)
+
+# Fonction pour vérifier un répertoire
+# Avec `fail_fast`, la vérification s'arrête à la première différence
+# `differences` (dictionnaire) reçoit en cas d'échec les listes complètes "modified", "missing" et "added"
+# `memory_limit` : voir sign_directory (les listings des modes manifest et tree sont alors fusionnés en flux)
+@_measured("verify_directory", failed=_verification_failed)
+def verify_directory(directory_path, public_key, max_workers=None, paranoid=None, progress=None, fail_fast=False,
+                     cancel=None, differences=None, memory_limit=None, backend=None):
+    try:
+        memory_limit = MEMORY_LIMIT if memory_limit is None else memory_limit
+        # Le mode est déduit des fichiers présents ; le manifeste est prioritaire
+        if os.path.exists(os.path.join(directory_path, MANIFEST_FILE)) and memory_limit:
+            return _verify_directory_manifest_bounded(directory_path, public_key, memory_limit, max_workers,
+                                                      paranoid, progress, fail_fast, cancel, differences, backend)
+        if os.path.exists(os.path.join(directory_path, MANIFEST_FILE)):
+            return _verify_directory_manifest(directory_path, public_key, max_workers, paranoid, progress,
+                                              fail_fast, cancel, differences, backend)
+        if os.path.exists(os.path.join(directory_path, MERKLE_ROOT_FILE)):
+            return _verify_directory_merkle(directory_path, public_key, max_workers, paranoid, progress,
+                                            fail_fast, cancel, differences, backend)
+        return _verify_directory_tree(directory_path, public_key, paranoid, fail_fast, cancel, differences,
+                                      memory_limit, backend)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        return False, str(e)
+
+class SignatureCatalog:
+    """Catalogue SQLite des signatures d'un dossier ou d'une release, à la place des fichiers `.signed`.
+
+    Chaque ligne associe un chemin relatif à l'empreinte SHA-256 du fichier, à sa signature DER
+    (la même que dans un `.signed`) et à l'identifiant de la clé. La clé primaire est un B-tree :
+    la recherche par chemin est en O(log n) et les ajouts se font par lots dans une transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "path TEXT PRIMARY KEY, digest TEXT NOT NULL, signature BLOB NOT NULL, key_id TEXT) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO meta VALUES ('format', 'ds-sign-catalog v1 sha256')")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def add_many(self, rows):
+        """`rows` : itérable de (chemin relatif, empreinte hex, signature, key_id) ; remplace l'existant."""
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)", rows)
+
+    def get(self, rel_path):
+        row = self.connection.execute(
+            "SELECT digest, signature, key_id FROM signatures WHERE path = ?", (rel_path,)).fetchone()
+        return None if row is None else (row[0], bytes(row[1]), row[2])
+
+    def load_all(self):
+        """Toutes les entrées en une seule requête : {chemin: (empreinte, signature, key_id)}."""
+        rows = self.connection.execute("SELECT path, digest, signature, key_id FROM signatures")
+        return {row[0]: (row[1], bytes(row[2]), row[3]) for row in rows}
+
+    def remove(self, rel_paths):
+        with self.connection:
+            self.connection.executemany("DELETE FROM signatures WHERE path = ?", [(p,) for p in rel_paths])
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+def _catalog_rel_paths(root, file_paths):
+    rel_paths = []
+    for file_path in file_paths:
+        rel_path = os.path.relpath(os.path.abspath(file_path), root).replace(os.sep, "/")
+        if rel_path == ".." or rel_path.startswith("../"):
+            raise ValueError(f"{file_path} is outside of the catalog root {root}")
+        rel_paths.append(rel_path)
+    return rel_paths
+
+# Signer des fichiers dans un catalogue (hachage parallèle, une transaction pour tout le lot)
+@_measured("sign_to_catalog")
+def sign_to_catalog(file_paths, private_key, catalog_path, root=None, max_workers=None, cancel=None):
+    try:
+        if not HAS_CRYPTOGRAPHY:
+            raise Exception("Signature catalogs require the 'cryptography' package.")
+        root = os.path.abspath(root or os.path.dirname(os.path.abspath(catalog_path)))
+        rel_paths = _catalog_rel_paths(root, file_paths)
+        digests = hash_files_parallel(root, rel_paths, max_workers, cancel=cancel)
+        key, key_id = _key_cache.load(private_key, True)
+        algorithm = signature_algorithm(key)
+        rows = []
+        for rel_path in rel_paths:
+            if cancel is not None:
+                cancel.check()
+            rows.append((rel_path, digests[rel_path], key.sign(bytes.fromhex(digests[rel_path]), *algorithm), key_id))
+        with SignatureCatalog(catalog_path) as catalog:
+            catalog.add_many(rows)
+        return rel_paths
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error signing to catalog: {e}")
+
+# Vérifier des fichiers depuis un catalogue ; sans `file_paths`, toutes les entrées sont vérifiées
+# Retourne une liste de (chemin relatif, statut "ok" | "failed" | "error", message) ; avec `fail_fast`,
+# elle s'arrête au premier échec
+@_measured("verify_from_catalog", failed=lambda results: any(r[1] != "ok" for r in results))
+def verify_from_catalog(catalog_path, public_key, file_paths=None, root=None, max_workers=None, fail_fast=False,
+                        cancel=None):
+    if not HAS_CRYPTOGRAPHY:
+        raise Exception("Signature catalogs require the 'cryptography' package.")
+    if not os.path.exists(catalog_path):
+        raise Exception(f"Missing signature catalog: {catalog_path}")
+    root = os.path.abspath(root or os.path.dirname(os.path.abspath(catalog_path)))
+    with SignatureCatalog(catalog_path) as catalog:
+        if file_paths is None:
+            entries = catalog.load_all()
+            rel_paths = sorted(entries)
+        else:
+            rel_paths = _catalog_rel_paths(root, file_paths)
+            entries = {rel_path: catalog.get(rel_path) for rel_path in rel_paths}
+
+    results = []
+    present = []
+    for rel_path in rel_paths:
+        if entries[rel_path] is not None and os.path.isfile(os.path.join(root, *rel_path.split("/"))):
+            present.append(rel_path)
+        elif fail_fast:
+            # Première entrée absente : inutile de tester l'existence des suivantes
+            return [(rel_path, "error", "Not in catalog." if entries[rel_path] is None else "Missing file.")]
+    on_digest = _stop_at_first_mismatch({p: entries[p][0] for p in present}) if fail_fast else None
+    try:
+        digests = hash_files_parallel(root, present, max_workers, on_digest, cancel)
+    except _FirstMismatch as e:
+        return [(e.args[0], "failed", "Content mismatch.")]
+    for rel_path in rel_paths:
+        if cancel is not None:
+            cancel.check()
+        if fail_fast and results and results[-1][1] != "ok":
+            break
+        entry = entries[rel_path]
+        if entry is None:
+            results.append((rel_path, "error", "Not in catalog."))
+            continue
+        if rel_path not in digests:
+            results.append((rel_path, "error", "Missing file."))
+            continue
+        digest, signature, key_id = entry
+        if digests[rel_path] != digest:
+            results.append((rel_path, "failed", "Content mismatch."))
+            continue
+        try:
+            key_path = get_keystore(public_key).public_key_path(key_id) if os.path.isdir(public_key) else public_key
+            valid = _verify_digest_native(bytes.fromhex(digest), key_path, signature)
+        except Exception as e:
+            results.append((rel_path, "error", str(e)))
+            continue
+        results.append((rel_path, "ok", "Verified OK") if valid else (rel_path, "failed", "Signature invalid."))
+    return results
+
+def _archive_member_name(name):
+    if "\n" in name or "\r" in name:
+        raise Exception(f"Unsupported archive member name: {name!r}")
+    return name
+
+def _link_digest(kind, target, algorithm="sha256"):
+    # Un lien n'a pas de contenu propre : son empreinte couvre son type et sa cible
+    hasher = new_hasher(algorithm)
+    hasher.update(f"{kind}:{target}".encode("utf-8"))
+    return hasher.hexdigest()
+
+# Parcours des membres d'une archive zip ou tar (gzip, bz2, xz) sans extraction : chaque membre est lu en
+# flux par hash_stream, la mémoire reste bornée par le tampon de hachage quelle que soit la taille de
+# l'archive. Produit des couples (nom du membre, empreinte hex) ; les dossiers sont ignorés.
+# `progress(octets_lus, taille_archive)` suit la lecture de l'archive compressée.
+def iter_archive_digests(archive_path, progress=None, cancel=None, algorithm="sha256"):
+    total = os.path.getsize(archive_path)
+    with open(archive_path, "rb") as raw:
+        on_chunk = (lambda _processed, _size: progress(raw.tell(), total)) if progress else None
+        if zipfile.is_zipfile(raw):
+            with zipfile.ZipFile(raw) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    with archive.open(info) as member:
+                        digest, _ = hash_stream(member, progress=on_chunk, cancel=cancel, algorithm=algorithm)
+                    yield _archive_member_name(info.filename), digest
+            if progress:
+                progress(total, total)
+            return
+        raw.seek(0)
+        try:
+            # Mode flux ("r|*") : lecture séquentielle, la compression est détectée automatiquement
+            archive = tarfile.open(fileobj=raw, mode="r|*")
+        except tarfile.ReadError:
+            raise Exception(f"Unsupported archive format: {archive_path}")
+        with archive:
+            while True:
+                if cancel is not None:
+                    cancel.check()
+                member = archive.next()
+                if member is None:
+                    break
+                archive.members = []  # Sinon chaque en-tête lu reste en mémoire jusqu'à la fin
+                if member.isfile():
+                    digest, _ = hash_stream(archive.extractfile(member), progress=on_chunk, cancel=cancel,
+                                            algorithm=algorithm)
+                elif member.issym():
+                    digest = _link_digest("symlink", member.linkname, algorithm)
+                elif member.islnk():
+                    digest = _link_digest("hardlink", member.linkname, algorithm)
+                else:
+                    continue
+                yield _archive_member_name(member.name), digest
+        if progress:
+            progress(total, total)
+
+# Signer les membres d'une archive : le manifeste (un membre par ligne) est écrit à côté de l'archive
+# (`manifest_path` par défaut : archive + ".manifest") puis signé. Retourne (manifeste, signature).
+@_measured("sign_archive")
+def sign_archive(archive_path, private_key, manifest_path=None, backend=None, progress=None, cancel=None,
+                 algorithm=None):
+    try:
+        manifest_path = manifest_path or archive_path + ARCHIVE_MANIFEST_SUFFIX
+        algorithm = resolve_digest_algorithm(algorithm, private_key)
+        digests = {}
+        for name, digest in iter_archive_digests(archive_path, progress, cancel, algorithm):
+            # Un nom en double serait ambigu : l'outil d'extraction décide lequel garder
+            if name in digests:
+                raise Exception(f"Duplicate archive member: {name}")
+            digests[name] = digest
+        write_manifest(manifest_path, digests, header=manifest_header(ARCHIVE_MANIFEST_HEADER, algorithm))
+        return manifest_path, sign_file_standalone(manifest_path, private_key, backend, cancel=cancel,
+                                                   algorithm=algorithm)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Error signing archive: {e}")
+
+# Vérifier les membres d'une archive contre son manifeste signé, sans extraction
+# Avec `fail_fast`, la lecture de l'archive s'arrête à la première différence
+@_measured("verify_archive", failed=_verification_failed)
+def verify_archive(archive_path, public_key, manifest_path=None, backend=None, progress=None, fail_fast=False,
+                   cancel=None):
+    try:
+        manifest_path = manifest_path or archive_path + ARCHIVE_MANIFEST_SUFFIX
+        signed_manifest_path = manifest_path + ".signed"
+        if not os.path.exists(signed_manifest_path):
+            return False, "Missing archive manifest signature."
+        if not verify_file_standalone(manifest_path, public_key, signed_manifest_path, backend, cancel=cancel):
+            return False, "Signature invalid."
+
+        expected = read_manifest(manifest_path)
+        algorithm = read_manifest_algorithm(manifest_path)
+        actual = {}
+        modified, added = [], []
+        for name, digest in iter_archive_digests(archive_path, progress, cancel, algorithm):
+            if name in actual:
+                return False, f"Archive content mismatch.\nDuplicate member: {name}"
+            actual[name] = digest
+            if name not in expected:
+                added.append(name)
+            elif digest != expected[name]:
+                modified.append(name)
+            if fail_fast and (modified or added):
+                return False, _fail_fast_message("Archive content mismatch", modified, [], added)
+        missing = sorted(set(expected) - set(actual))
+        if modified or missing or added:
+            return False, "Archive content mismatch.\n" + _format_differences(modified, missing, added)
+        return True, f"Archive verification successful ({len(actual)} members checked)."
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        return False, str(e)
+
+# Fonction pour générer une paire de clés (EC prime256v1 par défaut, RSA si `rsa_bits`)
+# `digest` enregistre l'algorithme d'empreinte préféré de la clé ("<clé privée>.digest")
+def generate_key_pair(key_name, key_dir=None, rsa_bits=None, backend=None, digest=None):
+    key_dir = key_dir or KEY_DIR
+    os.makedirs(key_dir, exist_ok=True)
+    pub_key = os.path.join(key_dir, f"{key_name}_public.pem")
+    priv_key = os.path.join(key_dir, f"{key_name}_private.pem")
+    try:
+        if digest:
+            _check_digest_algorithm(digest)
+            if rsa_bits and digest == "blake2b":
+                raise ValueError("BLAKE2b signatures require an EC key")
+        if resolve_backend(backend) == "native":
+            if rsa_bits:
+                key = rsa.generate_private_key(public_exponent=65537, key_size=rsa_bits)
+            else:
+                key = ec.generate_private_key(ec.SECP256R1())
+            with open(priv_key, "wb") as f:
+                f.write(key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.TraditionalOpenSSL,
+                                          serialization.NoEncryption()))
+            with open(pub_key, "wb") as f:
+                f.write(key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+        else:
+            if rsa_bits:
+                generate = ["genrsa", "-out", priv_key, str(rsa_bits)]
+                export = ["rsa", "-in", priv_key, "-pubout", "-out", pub_key]
+            else:
+                generate = ["ecparam", "-name", "prime256v1", "-genkey", "-out", priv_key]
+                export = ["ec", "-in", priv_key, "-pubout", "-out", pub_key]
+            for args in (generate, export):
+                returncode, _, stderr = _run_openssl(args)
+                if returncode != 0:
+                    raise Exception(stderr)
+        preference_path = priv_key + DIGEST_SUFFIX
+        if digest:
+            with open(preference_path, "w", encoding="utf-8") as preference_file:
+                preference_file.write(digest + "\n")
+        elif os.path.exists(preference_path):
+            os.remove(preference_path)
+        return priv_key, pub_key
+    except Exception as e:
+        raise Exception(f"Error generating keys: {e}")
@@ -0,0 +1,377 @@
+"""Service de signature local : les clés privées sont chargées une fois, les clients n'envoient que des empreintes.
+
+Le service écoute sur un socket Unix (accessible au seul utilisateur courant) ou, à défaut, sur
+127.0.0.1 avec un jeton partagé. Le protocole est du JSON, une requête et une réponse par ligne :
+
+    {"op": "sign", "key_id": "<empreinte de clé>", "digests": ["<sha256 hex>", ...]}
+    -> {"status": "ok", "key_id": "...", "signatures": ["<signature DER en base64>", ...]}
+
+Les autres opérations sont "ping" et "keys". Les signatures sont identiques aux fichiers `.signed`.
+
+    python DS_Sign_Tool.py daemon --key keys/release_private.pem
+    python DS_Sign_Tool.py sign "dist/**/*.whl" --daemon --key keys/release_public.pem
+"""
+import base64
+import hmac
+import json
+import os
+import re
+import secrets
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+
+import ds_sign_core as core
+
+# Adresse du service : chemin d'un socket Unix, ou "hôte:port" pour TCP (Windows par défaut)
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".ds_sign_tool")
+DEFAULT_ADDRESS = os.path.join(STATE_DIR, "signing.sock") if hasattr(socket, "AF_UNIX") else "127.0.0.1:8765"
+DAEMON_ADDRESS = os.environ.get("DS_SIGN_DAEMON") or DEFAULT_ADDRESS
+# Jeton exigé en TCP ; s'il n'est pas fourni, le service en génère un dans TOKEN_FILE (lisible par l'utilisateur seul)
+DAEMON_TOKEN = os.environ.get("DS_SIGN_DAEMON_TOKEN")
+TOKEN_FILE = os.path.join(STATE_DIR, "daemon.token")
+# Nombre maximal d'empreintes par requête, et taille maximale d'une ligne de requête
+MAX_BATCH = 10000
+MAX_REQUEST_BYTES = MAX_BATCH * 80 + 4096
+# Empreintes envoyées par requête par le client
+CLIENT_BATCH = 1000
+
+_KEY_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def parse_address(address):
+    """Retourne (famille, adresse) : "hôte:port" désigne TCP, tout autre texte un socket Unix."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(f"Unix sockets are not available here; use host:port instead of {address}")
+    return socket.AF_UNIX, address
+
+
+class SigningService:
+    """Clés privées chargées une fois, indexées par empreinte ; la première est la clé par défaut."""
+
+    def __init__(self, key_paths, token=None):
+        if not core.HAS_CRYPTOGRAPHY:
+            raise Exception("The signing daemon requires the 'cryptography' package.")
+        self.keys = {}
+        for key_path in key_paths:
+            if os.path.isdir(key_path):
+                paths = sorted(core.get_keystore(key_path).key_ids()["private"].values())
+            else:
+                paths = [key_path]
+            for path in paths:
+                key = core.load_private_key(path)
+                self.keys.setdefault(core.key_fingerprint(key), (key, core.signature_algorithm(key)))
+        if not self.keys:
+            raise Exception("No private key to serve.")
+        self.default_key_id = next(iter(self.keys))
+        self.token = token
+
+    def handle(self, request):
+        if self.token is not None and not self._token_matches(request.get("token")):
+            return {"status": "error", "message": "Invalid token."}
+        op = request.get("op")
+        if op == "ping":
+            return {"status": "ok"}
+        if op == "keys":
+            return {"status": "ok", "key_ids": list(self.keys), "default": self.default_key_id}
+        if op == "sign":
+            return self._sign(request)
+        return {"status": "error", "message": f"Unknown operation: {op}"}
+
+    def _token_matches(self, token):
+        # Comparaison en temps constant sur les octets UTF-8 : compare_digest refuse les chaînes non ASCII
+        if not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def _sign(self, request):
+        key_id = request.get("key_id") or self.default_key_id
+        if not isinstance(key_id, str) or key_id not in self.keys:
+            return {"status": "error", "message": f"No key with ID {str(key_id)[:16]}"}
+        digests = request.get("digests")
+        if not isinstance(digests, list) or len(digests) > MAX_BATCH:
+            return {"status": "error", "message": f"'digests' must be a list of at most {MAX_BATCH} digests"}
+        try:
+            raw = [bytes.fromhex(digest) for digest in digests]
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "Digests must be hexadecimal strings."}
+        if any(len(digest) != 32 for digest in raw):
+            return {"status": "error", "message": "Digests must be 32-byte SHA-256 values."}
+        key, algorithm = self.keys[key_id]
+        signatures = [base64.b64encode(key.sign(digest, *algorithm)).decode("ascii") for digest in raw]
+        return {"status": "ok", "key_id": key_id, "signatures": signatures}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            if not line:
+                return
+            if not line.endswith(b"\n"):
+                self._respond({"status": "error", "message": "Request too large."})
+                return
+            try:
+                request = json.loads(line)
+                response = service.handle(request) if isinstance(request, dict) else None
+            except (TypeError, ValueError):
+                response = None
+            self._respond(response or {"status": "error", "message": "Malformed request."})
+
+    def _respond(self, response):
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def _private_directory(directory):
+    """Crée le dossier ; celui de l'outil est ramené à 0700, un autre ne doit pas être modifiable par autrui."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return  # Windows : pas de propriétaire ni de bits de mode POSIX
+    st = os.stat(directory)
+    if os.path.abspath(directory) == os.path.abspath(STATE_DIR):
+        # Les caches ont pu le créer avant le service avec les droits par défaut (0755)
+        if st.st_uid != os.getuid():
+            raise Exception(f"{directory} belongs to another user")
+        if stat.S_IMODE(st.st_mode) & 0o077:
+            os.chmod(directory, 0o700)
+    elif st.st_mode & 0o022 and not st.st_mode & stat.S_ISVTX:
+        # Un autre utilisateur pourrait y remplacer le socket ou le jeton
+        raise Exception(f"{directory} is writable by other users")
+
+
+def _prepare_unix_socket(path):
+    _private_directory(os.path.dirname(os.path.abspath(path)))
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise Exception(f"{path} exists and is not a socket")
+        # Un socket restant d'un service arrêté est supprimé ; un service actif n'est pas remplacé
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise Exception(f"A signing daemon is already listening on {path}")
+        finally:
+            probe.close()
+
+
+def _load_or_create_token(token_file):
+    if os.path.exists(token_file):
+        with open(token_file, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    _private_directory(os.path.dirname(os.path.abspath(token_file)))
+    token = secrets.token_hex(32)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def _bind_unix_server(path):
+    """Crée le serveur Unix sur `path`, avec un socket en 0600 dès qu'il est accessible.
+
+    Le socket est créé dans un dossier temporaire 0700 voisin, ramené à 0600, puis renommé à sa place :
+    personne d'autre ne peut s'y connecter entre bind() et chmod(), sans toucher à l'umask, commune à
+    tous les threads du processus.
+    """
+    staging = tempfile.mkdtemp(prefix=".ds", dir=os.path.dirname(os.path.abspath(path)))
+    staged_path = os.path.join(staging, "s")
+    try:
+        server = _ThreadingUnixServer(staged_path, _RequestHandler)
+        try:
+            os.chmod(staged_path, 0o600)
+            os.rename(staged_path, path)
+        except BaseException:
+            server.server_close()
+            raise
+        server.server_address = path
+        return server
+    finally:
+        if os.path.exists(staged_path):
+            os.unlink(staged_path)
+        os.rmdir(staging)
+
+
+def create_server(key_paths, address=None, token=None, token_file=None):
+    """Crée le serveur (sans le démarrer) ; `server.service` donne accès aux clés chargées."""
+    address = address or DAEMON_ADDRESS
+    family, target = parse_address(address)
+    if family == socket.AF_INET:
+        if target[0] not in ("127.0.0.1", "localhost"):
+            raise ValueError("The signing daemon only listens on the local host.")
+        token = token or DAEMON_TOKEN or _load_or_create_token(token_file or TOKEN_FILE)
+        service = SigningService(key_paths, token)
+        server = _ThreadingTCPServer(target, _RequestHandler)
+    else:
+        service = SigningService(key_paths, token or DAEMON_TOKEN)
+        _prepare_unix_socket(target)
+        # Seul l'utilisateur courant peut demander des signatures
+        server = _bind_unix_server(target)
+    server.service = service
+    server.address = address
+    return server
+
+
+# Sert jusqu'à l'annulation de `cancel` (ou Ctrl+C) ; `on_ready(serveur)` est appelé une fois à l'écoute
+def serve(key_paths, address=None, token=None, token_file=None, on_ready=None, cancel=None):
+    server = create_server(key_paths, address, token, token_file)
+    if cancel is not None:
+        # shutdown() attend la fin de serve_forever : il doit être appelé depuis un autre thread
+        cancel.add_callback(lambda: threading.Thread(target=server.shutdown, daemon=True).start())
+    try:
+        if on_ready:
+            on_ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if server.address_family == getattr(socket, "AF_UNIX", None) and os.path.exists(server.server_address):
+            os.unlink(server.server_address)
+
+
+class SigningClient:
+    """Client du service : une connexion persistante, requêtes par lots de CLIENT_BATCH empreintes."""
+
+    def __init__(self, address=None, token=None, timeout=None, token_file=None):
+        self.address = address or DAEMON_ADDRESS
+        self.family, self.target = parse_address(self.address)
+        self.token = token or DAEMON_TOKEN
+        if self.token is None and self.family == socket.AF_INET:
+            token_file = token_file or TOKEN_FILE
+            if os.path.exists(token_file):
+                with open(token_file, "r", encoding="utf-8") as f:
+                    self.token = f.read().strip()
+        self.timeout = timeout
+        self._socket = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = None
+
+    def _connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.target)
+        except OSError as e:
+            sock.close()
+            raise Exception(f"Cannot reach the signing daemon at {self.address}: {e}")
+        self._socket = sock
+        self._file = sock.makefile("rwb")
+
+    def call(self, request):
+        if self.token is not None:
+            request = dict(request, token=self.token)
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            self.close()
+            raise Exception("The signing daemon closed the connection.")
+        response = json.loads(line)
+        if response.get("status") != "ok":
+            raise Exception(f"Signing daemon error: {response.get('message')}")
+        return response
+
+    def ping(self):
+        self.call({"op": "ping"})
+        return True
+
+    def key_ids(self):
+        return self.call({"op": "keys"})["key_ids"]
+
+    def sign_digests(self, digests, key_id=None):
+        """Signe des empreintes SHA-256 (bytes ou hex) ; retourne (key_id, [signatures DER])."""
+        hex_digests = [digest.hex() if isinstance(digest, bytes) else digest for digest in digests]
+        signatures = []
+        for start in range(0, len(hex_digests), CLIENT_BATCH):
+            response = self.call({"op": "sign", "key_id": key_id,
+                                  "digests": hex_digests[start:start + CLIENT_BATCH]})
+            key_id = response["key_id"]
+            signatures.extend(base64.b64decode(signature) for signature in response["signatures"])
+        return key_id, signatures
+
+    def sign_files(self, file_paths, key_id=None, max_workers=None, cancel=None, errors=None):
+        """Hache les fichiers localement (en parallèle), fait signer les empreintes par lots et écrit
+        `<fichier>.signed` (et `.keyid` avec DS_SIGN_KEY_IDS=1) ; retourne la liste des fichiers de signature.
+
+        Sans `errors`, la première erreur est levée. Avec un dictionnaire `errors`, un fichier illisible
+        (ou un lot refusé par le service) y est noté (chemin -> exception) et les autres sont signés.
+        """
+        signed_files = []
+        with core.JobScheduler(max_workers) as scheduler:
+            batch = []
+            for file_path, digest in scheduler.map(lambda path: core.calculate_hash(path, cancel=cancel),
+                                                   file_paths):
+                if isinstance(digest, core.OperationCancelled):
+                    raise digest
+                if isinstance(digest, Exception):
+                    if errors is None:
+                        raise Exception(f"Error hashing {file_path}: {digest}")
+                    errors[file_path] = digest
+                    continue
+                batch.append((file_path, digest))
+                if len(batch) == CLIENT_BATCH:
+                    signed_files.extend(self._write_signatures(batch, key_id, errors))
+                    batch = []
+            signed_files.extend(self._write_signatures(batch, key_id, errors))
+        return signed_files
+
+    def _write_signatures(self, batch, key_id, errors=None):
+        if not batch:
+            return []
+        try:
+            key_id, signatures = self.sign_digests([digest for _, digest in batch], key_id)
+        except Exception as e:
+            if errors is None:
+                raise
+            errors.update((file_path, e) for file_path, _ in batch)
+            return []
+        signed_files = []
+        for (file_path, _), signature in zip(batch, signatures):
+            signed_file = file_path + ".signed"
+            with open(signed_file, "wb") as f:
+                f.write(signature)
+            core.write_key_id(signed_file, key_id)
+            core.write_digest_algorithm(signed_file, "sha256")  # Le service ne signe que des empreintes SHA-256
+            core.write_segments(signed_file)
+            signed_files.append(signed_file)
+        return signed_files
+
+
+def resolve_key_id(key):
+    """Identifiant de clé à demander au service : empreinte hexadécimale, ou clé PEM (publique ou privée)."""
+    if key is None or _KEY_ID_PATTERN.fullmatch(key):
+        return key
+    with open(key, "rb") as key_file:
+        private = b"PRIVATE KEY" in key_file.read()
+    return core.key_fingerprint(core.load_private_key(key) if private else core.load_public_key(key))
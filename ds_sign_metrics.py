@@ -0,0 +1,257 @@
+"""Instrumentation de DS-Sign-Tool : durées par phase, compteurs et histogrammes de latence.
+
+Les phases (parcours, hachage, processus OpenSSL, cryptographie, cache, écritures) et les opérations
+(signer un fichier, vérifier un répertoire...) sont mesurées dans un registre global, exportable en JSON
+ou au format texte de Prometheus (textfile collector de node_exporter).
+
+Désactivée par défaut : chaque point de mesure se réduit alors à un test de booléen. Activation par
+`DS_SIGN_METRICS=1`, par `metrics.enable()` ou par les options `--metrics` / `--prometheus` de la CLI.
+La durée d'une phase est cumulée sur tous les threads : elle peut dépasser la durée réelle de l'opération.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_ENABLED = os.environ.get("DS_SIGN_METRICS", "0") == "1"
+METRICS_PREFIX = "ds_sign"
+
+# Bornes supérieures des histogrammes (secondes), de la petite signature à la grosse arborescence
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+COUNTERS = {
+    "bytes_hashed": "Bytes read by the hasher.",
+    "files_hashed": "Files and streams hashed.",
+    "cache_hits": "Files whose digest was reused from the hash cache.",
+    "verify_cache_hits": "File verifications answered from the verification cache.",
+    "operations": "Operations finished, by operation and status.",
+    "failures": "Operations that failed or raised an error.",
+}
+HISTOGRAMS = {
+    "phase_seconds": "Time spent in each phase, summed over threads.",
+    "operation_seconds": "Latency of each operation.",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Dernière case : au-delà de la plus grande borne
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, data):
+        for index, count in enumerate(data["counts"]):
+            self.counts[index] += count
+        self.sum += data["sum"]
+        self.count += data["count"]
+
+    def to_dict(self):
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class _NullSpan:
+    """Mesure inactive : partagée par tous les appels quand l'instrumentation est désactivée."""
+
+    def fail(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, registry, histogram, label, value, cancelled):
+        self.registry = registry
+        self.histogram = histogram
+        self.labels = ((label, value),)
+        self.operation = value if histogram == "operation_seconds" else None
+        self.cancelled = cancelled
+        self.status = "ok"  # Une opération qui se termine par un résultat négatif passe à "failed"
+
+    def fail(self):
+        self.status = "failed"
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.status = "cancelled" if self.cancelled and issubclass(exc_type, self.cancelled) else "error"
+        self.registry.observe(self.histogram, elapsed, self.labels)
+        if self.operation is not None:
+            self.registry.add("operations", 1, operation=self.operation, status=self.status)
+            if self.status in ("failed", "error"):
+                self.registry.add("failures", 1, operation=self.operation)
+        return False
+
+
+class Metrics:
+    """Registre des compteurs et histogrammes ; sûr entre threads.
+
+    Les clés sont (nom, étiquettes triées) ; `drain()` et `merge()` permettent de rapatrier les mesures
+    faites dans les processus de travail de la CLI.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._counters = {}
+            self._histograms = {}
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, "phase_seconds", "phase", name, None)
+
+    def operation(self, name, cancelled=None):
+        """Mesure une opération ; une exception de type `cancelled` est comptée comme annulation."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, "operation_seconds", "operation", name, cancelled)
+
+    def add(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in sorted(self._counters.items())],
+                "histograms": [[name, dict(labels), histogram.to_dict()]
+                               for (name, labels), histogram in sorted(self._histograms.items())],
+            }
+
+    def drain(self):
+        """Retourne les mesures accumulées puis les remet à zéro (envoi vers le processus parent)."""
+        data = self.snapshot()
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+        return data
+
+    def merge(self, data):
+        with self._lock:
+            for name, labels, value in data["counters"]:
+                key = (name, tuple(sorted(labels.items())))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, histogram_data in data["histograms"]:
+                key = (name, tuple(sorted(labels.items())))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                histogram.merge(histogram_data)
+
+    def report(self):
+        """Rapport JSON : compteurs, histogrammes (bornes incluses) et débits depuis `reset()`."""
+        data = self.snapshot()
+        elapsed = time.time() - self.started
+        totals = {}
+        for name, _, value in data["counters"]:
+            totals[name] = totals.get(name, 0) + value
+        return {
+            "started": self.started,
+            "seconds": round(elapsed, 6),
+            "throughput": {
+                "bytes_per_second": round(totals.get("bytes_hashed", 0) / elapsed, 1) if elapsed > 0 else None,
+                "files_per_second": round(totals.get("files_hashed", 0) / elapsed, 2) if elapsed > 0 else None,
+            },
+            "buckets": list(LATENCY_BUCKETS),
+            **data,
+        }
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.report(), indent=2) + "\n")
+
+    def prometheus_text(self):
+        data = self.snapshot()
+        lines = []
+        counters = {}
+        for name, labels, value in data["counters"]:
+            counters.setdefault(name, []).append((labels, value))
+        for name in sorted(counters):
+            metric = f"{METRICS_PREFIX}_{name}_total"
+            lines += [f"# HELP {metric} {COUNTERS.get(name, name)}", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{_labels(labels)} {value}" for labels, value in counters[name]]
+        histograms = {}
+        for name, labels, histogram in data["histograms"]:
+            histograms.setdefault(name, []).append((labels, histogram))
+        for name in sorted(histograms):
+            metric = f"{METRICS_PREFIX}_{name}"
+            lines += [f"# HELP {metric} {HISTOGRAMS.get(name, name)}", f"# TYPE {metric} histogram"]
+            for labels, histogram in histograms[name]:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram["counts"]):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{metric}_count{_labels(labels)} {histogram['count']}")
+        lines += [f"# HELP {METRICS_PREFIX}_run_seconds Wall time covered by these metrics.",
+                  f"# TYPE {METRICS_PREFIX}_run_seconds gauge",
+                  f"{METRICS_PREFIX}_run_seconds {time.time() - self.started:.6f}",
+                  f"# HELP {METRICS_PREFIX}_last_run_timestamp_seconds When these metrics were written.",
+                  f"# TYPE {METRICS_PREFIX}_last_run_timestamp_seconds gauge",
+                  f"{METRICS_PREFIX}_last_run_timestamp_seconds {time.time():.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.prometheus_text())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _write_atomic(path, text):
+    # node_exporter peut lire le fichier à tout moment : il est remplacé d'un coup, jamais réécrit en place
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+metrics = Metrics(METRICS_ENABLED)
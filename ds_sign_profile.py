@@ -0,0 +1,214 @@
+"""Profilage de DS-Sign-Tool (`--profile`), pour obtenir un profil sur les données réelles d'un utilisateur.
+
+Une exécution est profilée par cProfile (thread appelant) et par un échantillonneur qui relève la pile de
+tous les threads à intervalle régulier (les threads de hachage parallèle comme le processus OpenSSL attendu).
+Trois fichiers sont écrits :
+
+    PROFIL          statistiques pstats (python -m pstats PROFIL, snakeviz...)
+    PROFIL.txt      résumé : fonctions les plus coûteuses de l'outil, puis de tout le programme
+    PROFIL.folded   piles échantillonnées au format « folded » (flamegraph.pl, speedscope)
+
+Les tâches exécutées dans les processus de travail de la CLI sont profilées une par une et leurs
+statistiques sont fusionnées dans le profil du processus parent.
+"""
+import cProfile
+import multiprocessing
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_INTERVAL = float(os.environ.get("DS_SIGN_PROFILE_INTERVAL", 0.005))
+PROFILE_TOP = int(os.environ.get("DS_SIGN_PROFILE_TOP", 25))
+# Positionné par la CLI pour que ses processus de travail profilent chaque tâche
+PROFILE_JOBS_ENV = "DS_SIGN_PROFILE_JOBS"
+
+_current = None  # Profiler actif de la CLI, qui reçoit les statistiques des processus de travail
+
+
+def _is_tool_file(filename):
+    name = os.path.basename(filename)
+    return name == "DS_Sign_Tool.py" or name.startswith("ds_sign_")
+
+
+def _describe(function):
+    filename, line, name = function
+    if filename == "~":
+        return name  # Fonction native, par exemple "<built-in method _hashlib.openssl_sha256>"
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class _StatsData:
+    """Adaptateur pour charger dans pstats des statistiques reçues d'un autre processus."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class SamplingProfiler:
+    """Relève la pile de chaque thread toutes les `interval` secondes (sys._current_frames)."""
+
+    def __init__(self, interval=None):
+        self.interval = interval or PROFILE_INTERVAL
+        self.stacks = Counter()  # pile (de la racine à la fonction en cours) -> nombre d'échantillons
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="ds-sign-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def hottest(self, limit):
+        """Retourne [(fonction, échantillons en tête de pile, échantillons où elle apparaît)]."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return [(function, count, total[function]) for function, count in own.most_common(limit)]
+
+    def folded(self):
+        for stack, count in sorted(self.stacks.items()):
+            yield ";".join(_describe(function) for function in stack) + f" {count}\n"
+
+
+class Profiler:
+    """cProfile du thread appelant et, avec `sampling`, échantillonnage de tous les threads."""
+
+    def __init__(self, sampling=True, interval=None):
+        self.profile = cProfile.Profile()
+        self.sampler = SamplingProfiler(interval) if sampling else None
+        self.deterministic = True
+        self.worker_stats = []
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.start()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Depuis Python 3.12, un seul cProfile peut être actif à la fois : l'échantillonnage reste
+            self.deterministic = False
+
+    def stop(self):
+        if self.deterministic:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.elapsed = time.perf_counter() - self._start
+
+    def add_stats(self, stats):
+        self.worker_stats.append(stats)
+
+    def stats(self):
+        if self.deterministic:
+            self.profile.create_stats()
+            combined = pstats.Stats(self.profile)
+        else:
+            combined = pstats.Stats()  # Sans argument : statistiques vides (pstats refuse un _StatsData vide)
+        for stats in self.worker_stats:
+            if stats:
+                combined.add(_StatsData(stats))
+        return combined
+
+    def summary(self, label, top=None):
+        top = top or PROFILE_TOP
+        lines = [f"DS-Sign-Tool profile: {label}",
+                 f"Wall time: {self.elapsed:.3f} s, {len(self.worker_stats)} worker job profile(s) merged", ""]
+        entries = self.stats().stats
+        if entries:
+            by_cumulative = sorted(entries.items(), key=lambda item: item[1][3], reverse=True)
+            by_own = sorted(entries.items(), key=lambda item: item[1][2], reverse=True)
+            for title, selection in (
+                    ("Hottest DS-Sign-Tool functions (cProfile, by cumulative time)",
+                     [item for item in by_cumulative if _is_tool_file(item[0][0])]),
+                    ("Hottest functions overall (cProfile, by own time)", by_own)):
+                lines += [title, f"{'own s':>10} {'cumul s':>10} {'calls':>10}  function"]
+                for function, (_, calls, own, cumulative, _) in selection[:top]:
+                    lines.append(f"{own:>10.3f} {cumulative:>10.3f} {calls:>10}  {_describe(function)}")
+                lines.append("")
+        else:
+            lines += ["cProfile unavailable (another profiler was active); see the sampled threads below.", ""]
+        if self.sampler is not None and self.sampler.samples:
+            lines += [f"Sampled threads ({self.sampler.samples} samples every {self.sampler.interval * 1000:g} ms, "
+                      "all threads; own = running, total = on the stack)",
+                      f"{'own %':>8} {'total %':>8}  function"]
+            samples = sum(self.sampler.stacks.values())
+            for function, own, total in self.sampler.hottest(top):
+                lines.append(f"{own * 100 / samples:>8.1f} {total * 100 / samples:>8.1f}  {_describe(function)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, label, top=None):
+        """Écrit le profil pstats, le résumé (.txt) et les piles échantillonnées (.folded) ; retourne les chemins."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.stats().dump_stats(path)
+        paths = [path, path + ".txt"]
+        with open(path + ".txt", "w", encoding="utf-8") as summary_file:
+            summary_file.write(self.summary(label, top))
+        if self.sampler is not None:
+            with open(path + ".folded", "w", encoding="utf-8") as folded_file:
+                folded_file.writelines(self.sampler.folded())
+            paths.append(path + ".folded")
+        return paths
+
+
+def start_profiler(sampling=True, interval=None):
+    """Démarre le profil de la CLI, qui recevra aussi les statistiques des processus de travail."""
+    global _current
+    os.environ[PROFILE_JOBS_ENV] = "1"
+    _current = Profiler(sampling, interval)
+    _current.start()
+    return _current
+
+
+def job_profile():
+    """Un cProfile pour une tâche exécutée dans un processus de travail de la CLI profilée, sinon None."""
+    if os.environ.get(PROFILE_JOBS_ENV) != "1" or multiprocessing.parent_process() is None:
+        return None
+    return cProfile.Profile()
+
+
+def job_stats(profile):
+    profile.create_stats()
+    return profile.stats
+
+
+def merge_job_stats(stats):
+    if _current is not None:
+        _current.add_stats(stats)
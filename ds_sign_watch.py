@@ -0,0 +1,369 @@
+"""Mode surveillance de DS-Sign-Tool : garde la signature d'un répertoire à jour au fil des modifications.
+
+Sous Linux, les changements sont suivis par inotify (aucun réveil tant que rien ne bouge) ; ailleurs,
+ou si inotify n'est pas disponible, le répertoire est comparé périodiquement aux métadonnées connues.
+Les événements sont regroupés (debounce) : à la fin de chaque fenêtre, seuls les fichiers touchés sont
+rehachés, puis le manifeste (ou la racine de Merkle) est réécrit et signé une seule fois.
+
+    python DS_Sign_Tool.py watch shared/ --key keys/release_private.pem --mode manifest
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import time
+
+import ds_sign_core as core
+
+# Délai sans nouvel événement avant de re-signer, et intervalle de comparaison du mode sans inotify (secondes)
+WATCH_DEBOUNCE = float(os.environ.get("DS_SIGN_WATCH_DEBOUNCE", 1.0))
+WATCH_POLL_INTERVAL = float(os.environ.get("DS_SIGN_WATCH_POLL", 2.0))
+# Sous des écritures continues, la signature est quand même renouvelée après DEBOUNCE * ce facteur
+WATCH_MAX_DELAY_FACTOR = 10
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_STRUCTURE_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+_CONTENT_EVENTS = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Accès minimal à inotify via ctypes (aucune dépendance) ; une surveillance par dossier."""
+
+    def __init__(self, mask):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.mask = mask
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        self.watches = {}  # descripteur de surveillance -> dossier relatif ("" pour la racine)
+
+    def add_watch(self, path, rel_dir):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # ENOSPC : limite fs.inotify.max_user_watches atteinte
+            raise OSError(error, f"inotify_add_watch failed: {os.strerror(error)}", path)
+        self.watches[wd] = rel_dir
+
+    def read_events(self):
+        """Événements disponibles sans bloquer : liste de (dossier relatif, masque, nom)."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            rel_dir = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            events.append((rel_dir, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _join(rel_dir, name):
+    return name if not rel_dir else f"{rel_dir}/{name}"
+
+
+class DirectoryWatcher:
+    """Garde la signature de `directory_path` à jour jusqu'à l'annulation de `cancel`.
+
+    En modes manifest et merkle, les empreintes sont tenues en mémoire avec les métadonnées de chaque
+    fichier : seuls les fichiers modifiés, créés ou supprimés pendant une fenêtre sont rehachés. En mode
+    tree, seule la structure compte et l'arborescence est régénérée quand elle change.
+    `on_signed(résultat)` est appelé après chaque signature (dictionnaire décrivant le passage).
+    """
+
+    def __init__(self, directory_path, private_key, mode=None, debounce=None, poll_interval=None,
+                 use_inotify=None, max_workers=None, on_signed=None, cancel=None, algorithm=None):
+        self.directory_path = os.path.abspath(directory_path)
+        self.private_key = private_key
+        self.mode = mode or core.DIRECTORY_MODE
+        if self.mode not in core.DIRECTORY_MODES:
+            raise ValueError(f"Unknown directory signing mode: {self.mode}")
+        self.algorithm = core.resolve_digest_algorithm(algorithm, private_key)
+        self.debounce = WATCH_DEBOUNCE if debounce is None else debounce
+        self.max_delay = self.debounce * WATCH_MAX_DELAY_FACTOR
+        self.poll_interval = poll_interval or WATCH_POLL_INTERVAL
+        self.use_inotify = sys.platform.startswith("linux") if use_inotify is None else use_inotify
+        self.max_workers = max_workers
+        self.on_signed = on_signed
+        self.cancel = cancel or core.CancellationToken()
+        self.entries = {}  # chemin relatif -> (signature stat, empreinte) ; empreinte None en mode tree
+        self._dirty_files = set()
+        self._dirty_dirs = set()
+        self._inotify = None
+
+    def stop(self):
+        self.cancel.cancel()
+
+    def run(self):
+        # La surveillance commence avant la première signature : rien n'est perdu entre les deux
+        self._start_inotify()
+        wake = None
+        if self._inotify is not None:
+            # Réveil du select quand l'arrêt est demandé depuis un autre thread
+            self._stop_read, self._stop_write = os.pipe()
+            wake = lambda: os.write(self._stop_write, b"x")
+            self.cancel.add_callback(wake)
+        try:
+            self._initial_sign()
+            while not self.cancel.cancelled:
+                self._collect_changes()
+                if self.cancel.cancelled:
+                    break
+                self._apply_changes()
+        finally:
+            if self._inotify is not None:
+                self.cancel.remove_callback(wake)
+                self._inotify.close()
+                os.close(self._stop_read)
+                os.close(self._stop_write)
+
+    # --- Détection des changements -------------------------------------------------------------
+
+    def _start_inotify(self):
+        if not self.use_inotify:
+            return
+        mask = _STRUCTURE_EVENTS | IN_DELETE_SELF | IN_MOVE_SELF
+        if self.mode != "tree":
+            mask |= _CONTENT_EVENTS
+        try:
+            self._inotify = Inotify(mask)
+            self._watch_tree("")
+        except OSError as e:
+            print(f"inotify unavailable ({e}), polling every {self.poll_interval}s", file=sys.stderr)
+            if self._inotify is not None:
+                self._inotify.close()
+            self._inotify = None
+
+    def _watch_tree(self, rel_dir):
+        top = os.path.join(self.directory_path, *rel_dir.split("/")) if rel_dir else self.directory_path
+        for root, dirs, _ in os.walk(top):
+            rel_root = os.path.relpath(root, self.directory_path).replace(os.sep, "/")
+            self._inotify.add_watch(root, "" if rel_root == "." else rel_root)
+
+    def _is_signature_file(self, rel_path):
+        return "/" not in rel_path and rel_path in core.SIGNATURE_FILES
+
+    def _read_inotify_events(self):
+        recorded = False
+        for rel_dir, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                self._dirty_dirs.add("")  # Des événements ont été perdus : tout recomparer
+                recorded = True
+                continue
+            if rel_dir is None or mask & IN_IGNORED:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if rel_dir == "":
+                    raise Exception(f"Watched directory removed: {self.directory_path}")
+                continue
+            rel_path = _join(rel_dir, name)
+            if self._is_signature_file(rel_path):
+                continue  # Nos propres écritures
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._watch_tree(rel_path)
+                    except OSError as e:
+                        # Dossier déjà supprimé : rien à surveiller ; sinon ses changements à venir ne seront pas vus
+                        if os.path.isdir(os.path.join(self.directory_path, *rel_path.split("/"))):
+                            print(f"Cannot watch {rel_path}: {e}", file=sys.stderr)
+                self._dirty_dirs.add(rel_path)
+            else:
+                self._dirty_files.add(rel_path)
+            if self.mode == "tree":
+                self._dirty_dirs.add("")
+            recorded = True
+        return recorded
+
+    def _snapshot(self):
+        """Métadonnées actuelles de tous les fichiers (et des dossiers en mode tree)."""
+        snapshot = {}
+        for root, dirs, names in os.walk(self.directory_path):
+            self.cancel.check()
+            rel_root = os.path.relpath(root, self.directory_path).replace(os.sep, "/")
+            rel_root = "" if rel_root == "." else rel_root
+            if self.mode == "tree":
+                snapshot.update((_join(rel_root, name) + "/", None) for name in dirs)
+            for name in names:
+                rel_path = _join(rel_root, name)
+                if self._is_signature_file(rel_path):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                snapshot[rel_path] = None if self.mode == "tree" else core.stat_key(st)
+        return snapshot
+
+    def _poll_changes(self):
+        snapshot = self._snapshot()
+        known = {rel_path: entry[0] for rel_path, entry in self.entries.items()}
+        if snapshot == known:
+            return False
+        self._dirty_files.update(rel_path for rel_path in snapshot.keys() | known.keys()
+                                 if snapshot.get(rel_path, False) != known.get(rel_path, False))
+        return True
+
+    def _wait(self, timeout):
+        """Attend des changements pendant au plus `timeout` secondes (None : indéfiniment)."""
+        if self._inotify is not None:
+            ready, _, _ = select.select([self._inotify.fd, self._stop_read], [], [], timeout)
+            return self._inotify.fd in ready and self._read_inotify_events()
+        return not self.cancel.wait(timeout) and self._poll_changes()
+
+    def _collect_changes(self):
+        """Retourne à la fin d'une fenêtre : `debounce` s sans nouvel événement (au plus `max_delay` s)."""
+        first = last = None
+        while not self.cancel.cancelled:
+            now = time.monotonic()
+            if first is None:
+                timeout = None if self._inotify is not None else self.poll_interval
+            else:
+                deadline = min(last + self.debounce, first + self.max_delay)
+                if now >= deadline:
+                    return
+                timeout = deadline - now
+                if self._inotify is None:
+                    timeout = min(timeout, self.poll_interval)
+            if self._wait(timeout):
+                last = time.monotonic()
+                first = first or last
+
+    # --- Signature ------------------------------------------------------------------------------
+
+    def _initial_sign(self):
+        start = time.perf_counter()
+        snapshot = self._snapshot()  # Relevé avant le hachage : un fichier modifié pendant sera revu
+        _, signature = core.sign_directory(self.directory_path, self.private_key, self.mode,
+                                           self.max_workers, cancel=self.cancel, algorithm=self.algorithm)
+        if self.mode == "tree":
+            self.entries = {rel_path: (None, None) for rel_path in snapshot}
+        else:
+            listing = core.MANIFEST_FILE if self.mode == "manifest" else core.MERKLE_FILE
+            digests = core.read_manifest(os.path.join(self.directory_path, listing))
+            self.entries = {rel_path: (snapshot.get(rel_path), digest) for rel_path, digest in digests.items()}
+        self._report(signature, len(self.entries), 0, start)
+
+    def _expand_dirty_dirs(self):
+        for rel_dir in self._dirty_dirs:
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            top = os.path.join(self.directory_path, *rel_dir.split("/")) if rel_dir else self.directory_path
+            if os.path.isdir(top):
+                excluded = core.SIGNATURE_FILES if not rel_dir else ()
+                self._dirty_files.update(prefix + rel_path
+                                         for rel_path in core.list_directory_files(top, excluded, self.cancel))
+            # Les entrées connues sous ce dossier sont revues : celles qui ont disparu seront retirées
+            self._dirty_files.update(rel_path for rel_path in self.entries if rel_path.startswith(prefix))
+        self._dirty_dirs.clear()
+
+    def _apply_changes(self):
+        start = time.perf_counter()
+        if self.mode == "tree":
+            self._dirty_files.clear()
+            self._dirty_dirs.clear()
+            snapshot = self._snapshot()
+            if snapshot.keys() == self.entries.keys():
+                return
+            _, signature = core.sign_directory(self.directory_path, self.private_key, "tree", cancel=self.cancel,
+                                               algorithm=self.algorithm)
+            changed = len(snapshot.keys() ^ self.entries.keys())
+            self.entries = {rel_path: (None, None) for rel_path in snapshot}
+            self._report(signature, changed, 0, start)
+            return
+
+        self._expand_dirty_dirs()
+        dirty, self._dirty_files = self._dirty_files, set()
+        to_hash, removed = [], 0
+        for rel_path in sorted(dirty):
+            try:
+                st = os.stat(os.path.join(self.directory_path, *rel_path.split("/")))
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
+                removed += self.entries.pop(rel_path, None) is not None
+            elif self.entries.get(rel_path, (None,))[0] != core.stat_key(st):
+                # La signature stat est relevée avant le hachage : une écriture pendant sera revue
+                to_hash.append((rel_path, core.stat_key(st)))
+        changed = 0
+        if to_hash:
+            keys = dict(to_hash)
+            digests = self._hash_files([rel_path for rel_path, _ in to_hash])
+            for rel_path, digest in digests.items():
+                if self.entries.get(rel_path, (None, None))[1] != digest:
+                    changed += 1
+                self.entries[rel_path] = (keys[rel_path], digest)
+        if not changed and not removed:
+            return
+        digests = {rel_path: digest for rel_path, (_, digest) in self.entries.items()}
+        _, signature = core.sign_directory_digests(self.directory_path, digests, self.private_key, self.mode,
+                                                   self.cancel, self.algorithm)
+        self._report(signature, changed, removed, start)
+
+    def _hash_files(self, rel_paths):
+        """Empreintes des fichiers encore lisibles ; un fichier disparu entre-temps sera revu à son événement."""
+        def hash_one(rel_path):
+            return core.calculate_hash(os.path.join(self.directory_path, *rel_path.split("/")), cancel=self.cancel,
+                                       algorithm=self.algorithm)
+
+        digests = {}
+        with core.JobScheduler(self.max_workers) as scheduler:
+            for rel_path, digest in scheduler.map(hash_one, rel_paths):
+                if isinstance(digest, core.OperationCancelled):
+                    raise digest
+                if isinstance(digest, OSError):
+                    self.entries.pop(rel_path, None)
+                    continue
+                if isinstance(digest, Exception):
+                    raise digest
+                digests[rel_path] = digest
+        return digests
+
+    def _report(self, signature, changed, removed, start):
+        if self.on_signed:
+            self.on_signed({
+                "directory": self.directory_path,
+                "mode": self.mode,
+                "files": len(self.entries),
+                "changed": changed,
+                "removed": removed,
+                "signature": signature,
+                "seconds": round(time.perf_counter() - start, 6),
+                "watcher": "inotify" if self._inotify is not None else "poll",
+            })
+
+
+# Surveille un répertoire jusqu'à l'annulation de `cancel` (ou Ctrl+C dans le thread principal)
+def watch_directory(directory_path, private_key, mode=None, debounce=None, poll_interval=None, use_inotify=None,
+                    max_workers=None, on_signed=None, cancel=None, algorithm=None):
+    DirectoryWatcher(directory_path, private_key, mode, debounce, poll_interval, use_inotify, max_workers,
+                     on_signed, cancel, algorithm).run()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Les caches et l'exécutable OpenSSL sont lus à l'import de ds_sign_core : ils sont fixés avant, pour que
+# les tests ne touchent jamais aux caches de l'utilisateur (~/.ds_sign_tool)
+_STATE_DIR = tempfile.mkdtemp(prefix="ds_sign_tests_")
+os.environ["DS_SIGN_CACHE"] = os.path.join(_STATE_DIR, "hash_cache.sqlite3")
+os.environ["DS_SIGN_VERIFY_CACHE"] = os.path.join(_STATE_DIR, "verify_cache.sqlite3")
+if not os.environ.get("DS_SIGN_OPENSSL") and shutil.which("openssl"):
+    os.environ["DS_SIGN_OPENSSL"] = shutil.which("openssl")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ds_sign_core as core  # noqa: E402
+
+HAS_OPENSSL = os.path.isfile(core.OPENSSL_PATH)
+
+requires_native = pytest.mark.skipif(not core.HAS_CRYPTOGRAPHY, reason="the 'cryptography' package is not installed")
+requires_openssl = pytest.mark.skipif(not HAS_OPENSSL, reason=f"OpenSSL not found at {core.OPENSSL_PATH}")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_STATE_DIR, ignore_errors=True)
+
+
+def write_files(root, files):
+    """Crée {chemin relatif avec "/": contenu (bytes)} sous `root` ; un chemin finissant par "/" est un dossier vide."""
+    for rel_path, content in files.items():
+        path = os.path.join(root, *rel_path.rstrip("/").split("/"))
+        if rel_path.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+@pytest.fixture(scope="session")
+def ec_keys(tmp_path_factory):
+    key_dir = tmp_path_factory.mktemp("keys")
+    return core.generate_key_pair("test", str(key_dir))
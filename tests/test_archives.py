@@ -0,0 +1,96 @@
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import ds_sign_core as core
+
+MEMBERS = {f"pkg/mod_{index}.py": b"module %d\n" % index for index in range(6)}
+MEMBERS["data/blob.bin"] = os.urandom(200_000)
+FORMATS = ["zip", "tar", "tar.gz", "tar.bz2", "tar.xz"]
+
+
+def _build(path, members, links=None):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("pkg/", b"")
+            for name, content in members.items():
+                archive.writestr(name, content)
+        return path
+    compression = path.rsplit(".", 1)[-1]
+    with tarfile.open(path, "w:" + ("" if compression == "tar" else compression)) as archive:
+        directory = tarfile.TarInfo("pkg")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+        for name, target in (links or {}).items():
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            archive.addfile(info)
+    return path
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_member_digests_without_extraction(tmp_path, extension):
+    archive_path = _build(str(tmp_path / f"release.{extension}"), MEMBERS)
+    progress = []
+    digests = dict(core.iter_archive_digests(archive_path, progress=lambda done, total: progress.append((done, total))))
+    assert digests == {name: hashlib.sha256(content).hexdigest() for name, content in MEMBERS.items()}
+    assert progress[-1] == (os.path.getsize(archive_path),) * 2
+    assert os.listdir(tmp_path) == [os.path.basename(archive_path)]
+
+
+@pytest.mark.parametrize("extension", FORMATS)
+def test_sign_and_verify_archive(tmp_path, ec_keys, extension):
+    archive_path = _build(str(tmp_path / f"release.{extension}"), MEMBERS)
+    manifest_path, signed_file = core.sign_archive(archive_path, ec_keys[0])
+    assert manifest_path == archive_path + core.ARCHIVE_MANIFEST_SUFFIX
+    assert core.verify_archive(archive_path, ec_keys[1])[0]
+
+    changed = dict(MEMBERS, **{"pkg/mod_2.py": b"tampered\n", "pkg/extra.py": b"extra\n"})
+    del changed["pkg/mod_4.py"]
+    os.remove(archive_path)
+    _build(archive_path, changed)
+    valid, message = core.verify_archive(archive_path, ec_keys[1])
+    assert not valid
+    assert "Modified: pkg/mod_2.py" in message and "Missing: pkg/mod_4.py" in message
+    assert "Added: pkg/extra.py" in message
+    valid, message = core.verify_archive(archive_path, ec_keys[1], fail_fast=True)
+    assert not valid and "stopped at the first difference" in message
+
+
+def test_symlink_target_is_signed(tmp_path, ec_keys):
+    archive_path = _build(str(tmp_path / "links.tar"), MEMBERS, links={"current": "pkg/mod_1.py"})
+    core.sign_archive(archive_path, ec_keys[0])
+    assert core.verify_archive(archive_path, ec_keys[1])[0]
+    os.remove(archive_path)
+    _build(archive_path, MEMBERS, links={"current": "pkg/mod_2.py"})
+    valid, message = core.verify_archive(archive_path, ec_keys[1])
+    assert not valid and "Modified: current" in message
+
+
+def test_duplicate_members_are_rejected(tmp_path, ec_keys):
+    archive_path = str(tmp_path / "duplicate.tar")
+    with tarfile.open(archive_path, "w") as archive:
+        for content in (b"first\n", b"second\n"):
+            info = tarfile.TarInfo("same.txt")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    with pytest.raises(Exception, match="Duplicate archive member"):
+        core.sign_archive(archive_path, ec_keys[0])
+
+
+def test_unsupported_archive(tmp_path, ec_keys):
+    path = str(tmp_path / "notes.txt")
+    with open(path, "wb") as f:
+        f.write(b"not an archive\n" * 100)
+    with pytest.raises(Exception, match="Unsupported archive format"):
+        core.sign_archive(path, ec_keys[0])
+    assert core.verify_archive(path, ec_keys[1]) == (False, "Missing archive manifest signature.")
@@ -0,0 +1,146 @@
+import os
+import shutil
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+# Limite minuscule : chaque listing déborde sur disque en de nombreux runs, fusionnés sur plusieurs passes
+MEMORY_LIMIT = 256
+
+LISTINGS = {
+    "manifest": (core.MANIFEST_FILE,),
+    "tree": (core.DIR_FILE, core.TREE_INDEX_FILE, core.HASH_FILE),
+}
+
+
+def _files():
+    files = {f"dir{index % 7}/sub{index % 3}/file_{index:04d}.txt": b"%d\n" % index for index in range(300)}
+    files.update({
+        "top.txt": b"top\n",
+        "line\nbreak.txt": b"newline in the name\n",
+        "back\\slash.txt": b"backslash in the name\n",
+        "dir1/\\leading": b"leading backslash\n",
+        "é/ü.txt": "unicode".encode("utf-8"),
+        "empty/": b"",
+    })
+    return files
+
+
+@pytest.fixture
+def tree(tmp_path):
+    directory = str(tmp_path / "tree")
+    write_files(directory, _files())
+    return directory
+
+
+def _sign(tree, private_key, mode, memory_limit):
+    for name in os.listdir(tree):
+        if name in core.SIGNATURE_FILES:
+            os.remove(os.path.join(tree, name))
+    core.sign_directory(tree, private_key, mode=mode, paranoid=True, memory_limit=memory_limit)
+    listings = {}
+    for name in LISTINGS[mode]:
+        with open(os.path.join(tree, name), "rb") as f:
+            listings[name] = f.read()
+    return listings
+
+
+@pytest.mark.parametrize("mode", ["manifest", "tree"])
+def test_bounded_listings_match_in_memory(tree, ec_keys, mode):
+    private_key, _ = ec_keys
+    assert _sign(tree, private_key, mode, MEMORY_LIMIT) == _sign(tree, private_key, mode, 0)
+
+
+def test_sorted_runs_spill_and_escape(tmp_path):
+    records = [(f"name_{index:03d}" + ("\n" if index % 5 == 0 else "") + ("\\" if index % 7 == 0 else ""), str(index))
+               for index in range(200)]
+    with core.SortedRuns(MEMORY_LIMIT, sort_dir=str(tmp_path)) as runs:
+        for rel_path, value in reversed(records):
+            runs.add(rel_path, value)
+        assert runs.runs_written > 1
+        assert list(runs) == sorted(records)
+
+
+def _change_tree(tree):
+    with open(os.path.join(tree, "dir2", "sub2", "file_0002.txt"), "ab") as f:
+        f.write(b"modified")
+    with open(os.path.join(tree, "line\nbreak.txt"), "ab") as f:
+        f.write(b"modified")
+    os.remove(os.path.join(tree, "dir0", "sub0", "file_0000.txt"))
+    os.remove(os.path.join(tree, "back\\slash.txt"))
+    write_files(tree, {"added.txt": b"added\n", "dir3/new\nfile": b"added\n"})
+    shutil.rmtree(os.path.join(tree, "empty"))
+
+
+def _verify(tree, public_key, memory_limit, fail_fast=False):
+    differences = {}
+    valid, message = core.verify_directory(tree, public_key, paranoid=True, fail_fast=fail_fast,
+                                           differences=differences, memory_limit=memory_limit)
+    return valid, {key: sorted(value) for key, value in differences.items() if key != "truncated"}
+
+
+@pytest.mark.parametrize("mode", ["manifest", "tree"])
+@pytest.mark.parametrize("signing_limit", [0, MEMORY_LIMIT])
+def test_bounded_verification_matches_in_memory(tree, ec_keys, mode, signing_limit):
+    private_key, public_key = ec_keys
+    core.sign_directory(tree, private_key, mode=mode, paranoid=True, memory_limit=signing_limit)
+    assert _verify(tree, public_key, 0) == _verify(tree, public_key, MEMORY_LIMIT) == (True, {})
+
+    _change_tree(tree)
+    in_memory = _verify(tree, public_key, 0)
+    bounded = _verify(tree, public_key, MEMORY_LIMIT)
+    assert not in_memory[0]
+    assert bounded == in_memory
+    assert "added.txt" in bounded[1]["added"]
+    assert "back\\slash.txt" in bounded[1]["missing"]
+    if mode == "manifest":
+        assert bounded[1]["modified"] == ["dir2/sub2/file_0002.txt", "line\nbreak.txt"]
+
+
+@pytest.mark.parametrize("mode", ["manifest", "tree"])
+def test_bounded_fail_fast(tree, ec_keys, mode):
+    private_key, public_key = ec_keys
+    core.sign_directory(tree, private_key, mode=mode, paranoid=True)
+    _change_tree(tree)
+    assert not _verify(tree, public_key, MEMORY_LIMIT, fail_fast=True)[0]
+    assert not _verify(tree, public_key, 0, fail_fast=True)[0]
+
+
+def _cached_paths(directory):
+    with core.HashCache() as cache:
+        return set(cache.load_directory(directory))
+
+
+@pytest.mark.parametrize("memory_limit", [0, MEMORY_LIMIT])
+def test_hash_cache_evicts_removed_files(tree, ec_keys, monkeypatch, memory_limit):
+    private_key, public_key = ec_keys
+    # Les fichiers tout juste écrits ne sont pas mis en cache (fenêtre d'horodatage) : elle est désactivée ici
+    monkeypatch.setattr(core.HashCache, "RACY_WINDOW_NS", -1)
+    core.sign_directory(tree, private_key, mode="manifest", memory_limit=memory_limit)
+    removed = os.path.join(tree, "dir0", "sub0", "file_0000.txt")
+    assert removed in _cached_paths(tree)
+
+    os.remove(removed)
+    os.rename(os.path.join(tree, "top.txt"), os.path.join(tree, "renamed.txt"))
+    core.sign_directory(tree, private_key, mode="manifest", memory_limit=memory_limit)
+    cached = _cached_paths(tree)
+    assert removed not in cached and os.path.join(tree, "top.txt") not in cached
+    assert os.path.join(tree, "renamed.txt") in cached
+    assert all(os.path.exists(path) for path in cached)
+
+
+def test_hash_cache_prune_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "CACHE_BATCH_SIZE", 7)
+    kept = str(tmp_path / "kept")
+    write_files(kept, {f"k{index}": b"" for index in range(10)})
+    with core.HashCache(str(tmp_path / "cache.sqlite3")) as cache:
+        rows = [(os.path.join(kept, f"k{index}"), (0, 0, 0, index), "00") for index in range(10)]
+        rows += [(str(tmp_path / "gone" / f"g{index}"), (0, 0, 0, index), "00") for index in range(25)]
+        rows += [(str(tmp_path / "other" / f"o{index}"), (0, 0, 0, index), "00") for index in range(5)]
+        cache.store(rows)
+        assert cache.prune(str(tmp_path / "gone")) == 25
+        assert len(cache.load_directory(str(tmp_path))) == 15
+        assert cache.prune() == 5
+        assert set(cache.load_directory(str(tmp_path))) == {path for path, _, _ in rows[:10]}
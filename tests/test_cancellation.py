@@ -0,0 +1,105 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+
+def test_child_token_follows_its_parent():
+    parent = core.CancellationToken()
+    child = core.CancellationToken(parent=parent)
+    calls = []
+    child.add_callback(lambda: calls.append("child"))
+    child.cancel()
+    assert child.cancelled and not parent.cancelled  # Un enfant s'annule seul
+    child.cancel()
+    assert calls == ["child"]
+
+    other = core.CancellationToken(parent=parent)
+    parent.cancel()
+    assert other.cancelled
+    with pytest.raises(core.OperationCancelled):
+        other.check()
+    late = []
+    other.add_callback(lambda: late.append(True))
+    assert late == [True]  # Jeton déjà annulé : rappel immédiat
+
+
+def test_released_token_is_detached():
+    parent = core.CancellationToken()
+    child = core.CancellationToken(parent=parent)
+    child.release()
+    parent.cancel()
+    assert not child.cancelled
+
+
+def test_hashing_stops_between_blocks(tmp_path):
+    path = str(tmp_path / "big.bin")
+    with open(path, "wb") as f:
+        f.write(b"\x00" * (64 * 4096))
+    for strategy in ("read", "readinto", "mmap"):
+        token = core.CancellationToken()
+        seen = []
+
+        def progress(done, total):
+            seen.append(done)
+            if done >= 8 * 4096:
+                token.cancel()
+
+        with pytest.raises(core.OperationCancelled):
+            core.calculate_hash(path, progress=progress, strategy=strategy, buffer_size=4096, cancel=token)
+        assert max(seen) < 64 * 4096
+
+
+@pytest.mark.parametrize("mode", core.DIRECTORY_MODES)
+def test_cancelled_directory_operation_is_not_wrapped(tmp_path, ec_keys, mode):
+    directory = str(tmp_path / "tree")
+    write_files(directory, {f"f{index}.txt": b"x" for index in range(5)})
+    token = core.CancellationToken()
+    token.cancel()
+    with pytest.raises(core.OperationCancelled):
+        core.sign_directory(directory, ec_keys[0], mode=mode, cancel=token)
+    core.sign_directory(directory, ec_keys[0], mode=mode)
+    with pytest.raises(core.OperationCancelled):
+        core.verify_directory(directory, ec_keys[1], paranoid=True, cancel=token)
+
+
+@pytest.mark.parametrize("mode", ["manifest", "merkle"])
+def test_fail_fast_stops_hashing(tmp_path, ec_keys, monkeypatch, mode):
+    directory = str(tmp_path / "tree")
+    write_files(directory, {f"f{index:03d}.txt": b"%d\n" % index for index in range(200)})
+    core.sign_directory(directory, ec_keys[0], mode=mode, memory_limit=0)
+    with open(os.path.join(directory, "f000.txt"), "ab") as f:
+        f.write(b"tampered")
+
+    hashed = []
+    calculate_hash = core.calculate_hash
+
+    def counting(file_path, *args, **kwargs):
+        hashed.append(file_path)
+        return calculate_hash(file_path, *args, **kwargs)
+    monkeypatch.setattr(core, "calculate_hash", counting)
+
+    differences = {}
+    valid, message = core.verify_directory(directory, ec_keys[1], max_workers=1, paranoid=True, fail_fast=True,
+                                           differences=differences, memory_limit=0)
+    assert not valid and "stopped at the first difference" in message
+    assert differences["modified"] == ["f000.txt"]
+    assert len(hashed) < 50
+
+
+@pytest.mark.skipif(not shutil.which("sleep"), reason="sleep not available")
+def test_cancel_kills_the_openssl_process(monkeypatch):
+    # N'importe quel exécutable fait l'affaire : `sleep 30` tient lieu de processus OpenSSL bloqué
+    monkeypatch.setattr(core, "OPENSSL_PATH", shutil.which("sleep"))
+    token = core.CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    start = time.perf_counter()
+    with pytest.raises(core.OperationCancelled):
+        core._run_openssl(["30"], cancel=token)
+    assert time.perf_counter() - start < 10
+    assert not core.active_processes
@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+import ds_sign_core as core
+from conftest import requires_native, write_files
+
+pytestmark = requires_native
+
+FILES = {f"pkg/mod_{index:03d}.py": b"module %d\n" % index for index in range(40)}
+FILES.update({"README.md": b"readme\n", "data/blob.bin": os.urandom(100 * 1024)})
+
+
+@pytest.fixture
+def release(tmp_path, ec_keys):
+    root = str(tmp_path / "release")
+    write_files(root, FILES)
+    catalog_path = os.path.join(root, "signatures.catalog")
+    paths = [os.path.join(root, *rel_path.split("/")) for rel_path in FILES]
+    core.sign_to_catalog(paths, ec_keys[0], catalog_path)
+    return root, catalog_path
+
+
+def _statuses(results):
+    return {rel_path: status for rel_path, status, _ in results}
+
+
+def test_catalog_replaces_sidecars(release, ec_keys):
+    root, catalog_path = release
+    with core.SignatureCatalog(catalog_path) as catalog:
+        assert len(catalog) == len(FILES)
+        digest, signature, key_id = catalog.get("data/blob.bin")
+    assert digest == core.calculate_hash(os.path.join(root, "data", "blob.bin"))
+    assert key_id == core.key_fingerprint(core.load_public_key(ec_keys[1]))
+    assert not any(name.endswith(".signed") for _, _, names in os.walk(root) for name in names)
+
+    results = core.verify_from_catalog(catalog_path, ec_keys[1])
+    assert _statuses(results) == dict.fromkeys(sorted(FILES), "ok")
+
+
+def test_catalog_signature_matches_sidecar_format(release, ec_keys, tmp_path):
+    # La signature du catalogue est la même DER qu'un fichier .signed : elle se vérifie comme telle
+    root, catalog_path = release
+    with core.SignatureCatalog(catalog_path) as catalog:
+        digest, signature, _ = catalog.get("README.md")
+    signed_file = str(tmp_path / "README.md.signed")
+    with open(signed_file, "wb") as f:
+        f.write(signature)
+    assert core.verify_digest_standalone(bytes.fromhex(digest), ec_keys[1], signed_file)
+
+
+def test_catalog_reports_every_problem(release, ec_keys, tmp_path):
+    root, catalog_path = release
+    with open(os.path.join(root, "pkg", "mod_003.py"), "ab") as f:
+        f.write(b"tampered")
+    os.remove(os.path.join(root, "pkg", "mod_007.py"))
+    write_files(root, {"new.txt": b"new\n"})
+    results = core.verify_from_catalog(catalog_path, ec_keys[1],
+                                       file_paths=[os.path.join(root, *p.split("/")) for p in FILES] +
+                                       [os.path.join(root, "new.txt")])
+    statuses = _statuses(results)
+    assert statuses.pop("pkg/mod_003.py") == "failed"
+    assert statuses.pop("pkg/mod_007.py") == "error"
+    assert statuses.pop("new.txt") == "error"
+    assert set(statuses.values()) == {"ok"}
+
+    other_private, other_public = core.generate_key_pair("other", str(tmp_path / "keys"))
+    assert set(_statuses(core.verify_from_catalog(catalog_path, other_public)).values()) != {"ok"}
+
+
+def test_catalog_key_directory_lookup(release, ec_keys, tmp_path):
+    root, catalog_path = release
+    key_dir = str(tmp_path / "keys")
+    core.generate_key_pair("decoy", key_dir)
+    os.link(ec_keys[1], os.path.join(key_dir, "signer_public.pem"))
+    assert set(_statuses(core.verify_from_catalog(catalog_path, key_dir)).values()) == {"ok"}
+
+
+def test_catalog_fail_fast_stops_at_first_missing_entry(tmp_path, ec_keys):
+    root = str(tmp_path / "wide")
+    files = {f"f{index:05d}": b"" for index in range(20000)}
+    write_files(root, files)
+    catalog_path = str(tmp_path / "wide.catalog")
+    with core.SignatureCatalog(catalog_path) as catalog:
+        empty = core.calculate_hash(os.path.join(root, "f00000"))
+        catalog.add_many((rel_path, empty, b"", None) for rel_path in files)
+    os.remove(os.path.join(root, "f19999"))
+    start = time.perf_counter()
+    results = core.verify_from_catalog(catalog_path, ec_keys[1], root=root, fail_fast=True)
+    assert results == [("f19999", "error", "Missing file.")]
+    # Quadratique auparavant (plusieurs secondes pour 20 000 entrées)
+    assert time.perf_counter() - start < 2
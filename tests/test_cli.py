@@ -0,0 +1,71 @@
+import io
+import json
+import os
+
+import pytest
+
+import ds_sign_cli as cli
+import ds_sign_core as core
+from conftest import requires_native, requires_openssl, write_files
+
+
+def _run(capsys, *argv):
+    status = cli.main(["--format", "json", *argv])
+    return status, json.loads(capsys.readouterr().out)
+
+
+@pytest.fixture
+def files(tmp_path):
+    root = str(tmp_path / "files")
+    write_files(root, {f"file_{index}.txt": b"%d\n" % index for index in range(6)})
+    return sorted(os.path.join(root, name) for name in os.listdir(root))
+
+
+def test_sign_and_verify_batch(capsys, files, ec_keys):
+    status, summary = _run(capsys, "sign", *files, "--key", ec_keys[0], "--jobs", "2")
+    assert status == 0 and summary["ok"] == summary["total"] == len(files)
+    with open(files[2], "ab") as f:
+        f.write(b"tampered")
+    os.remove(files[4] + ".signed")
+    status, summary = _run(capsys, "verify", *files, "--key", ec_keys[1], "--jobs", "2", "--paranoid")
+    statuses = {os.path.basename(result["path"]): result["status"] for result in summary["results"]}
+    assert status == 1
+    assert statuses.pop("file_2.txt") == "failed"
+    assert statuses.pop("file_4.txt") == "error"
+    assert set(statuses.values()) == {"ok"}
+
+
+def test_glob_and_stdin_paths(capsys, monkeypatch, files, ec_keys):
+    pattern = os.path.join(os.path.dirname(files[0]), "**", "*.txt")
+    assert _run(capsys, "sign", pattern, "--key", ec_keys[0])[1]["total"] == len(files)
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(files[:3]) + "\n"))
+    assert _run(capsys, "verify", "-", "--key", ec_keys[1])[1]["total"] == 3
+
+
+@requires_native
+@requires_openssl
+@pytest.mark.parametrize("mode", core.DIRECTORY_MODES)
+def test_directory_backend_is_per_command(capsys, monkeypatch, tmp_path, ec_keys, mode):
+    directory = str(tmp_path / "tree")
+    write_files(directory, {"a.txt": b"a\n", "sub/b.txt": b"b\n"})
+    openssl_calls = []
+
+    def spy(name):
+        original = getattr(core, name)
+
+        def wrapper(*args, **kwargs):
+            openssl_calls.append(name)
+            return original(*args, **kwargs)
+        monkeypatch.setattr(core, name, wrapper)
+
+    for name in ("_sign_file_openssl", "_sign_digest_openssl", "_verify_file_openssl"):
+        spy(name)
+    backend = core.SIGN_BACKEND
+    for command, key in (("sign-dir", ec_keys[0]), ("verify-dir", ec_keys[1])):
+        extra = ["--mode", mode] if command == "sign-dir" else []
+        status, summary = _run(capsys, command, directory, "--key", key, "--backend", "openssl", *extra)
+        assert status == 0, summary
+    assert openssl_calls and openssl_calls[-1] == "_verify_file_openssl"
+    # Le choix d'une commande ne change pas le moteur du reste du processus
+    assert core.SIGN_BACKEND == backend
+    assert core.verify_directory(directory, ec_keys[1], paranoid=True, backend="native")[0]
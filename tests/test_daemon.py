@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+
+import pytest
+
+import ds_sign_cli as cli
+import ds_sign_core as core
+import ds_sign_daemon as daemon
+from conftest import requires_native
+
+pytestmark = requires_native
+
+unix_only = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not available")
+
+
+@pytest.fixture
+def short_dir():
+    # Les chemins de socket Unix sont limités à ~100 octets : les dossiers de pytest sont trop longs
+    path = tempfile.mkdtemp(prefix="dsd", dir="/tmp" if os.path.isdir("/tmp") else None)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def running(ec_keys):
+    servers = []
+
+    def start(address, **kwargs):
+        server = daemon.create_server([ec_keys[0]], address, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return server
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _raw_call(address, *lines):
+    family, target = daemon.parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(target)
+        stream = sock.makefile("rwb")
+        responses = []
+        for line in lines:
+            stream.write(line if isinstance(line, bytes) else json.dumps(line).encode("utf-8") + b"\n")
+            stream.flush()
+            responses.append(json.loads(stream.readline()))
+        return responses
+
+
+@unix_only
+def test_unix_socket_is_private_and_umask_untouched(running, short_dir, monkeypatch):
+    state_dir = os.path.join(short_dir, "state")
+    os.makedirs(state_dir)
+    os.chmod(state_dir, 0o755)
+    monkeypatch.setattr(daemon, "STATE_DIR", state_dir)
+    umask = os.umask(0o022)
+    try:
+        server = running(os.path.join(state_dir, "s.sock"))
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(server.server_address).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(state_dir).st_mode) == 0o700
+    assert os.listdir(state_dir) == ["s.sock"]  # Le dossier temporaire du bind() est retiré
+
+
+@unix_only
+def test_unix_socket_directory_checks(running, short_dir, ec_keys):
+    shared = os.path.join(short_dir, "shared")
+    os.makedirs(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(Exception, match="writable by other users"):
+        daemon.create_server([ec_keys[0]], os.path.join(shared, "s.sock"))
+
+    address = os.path.join(short_dir, "s.sock")
+    running(address)
+    with pytest.raises(Exception, match="already listening"):
+        daemon.create_server([ec_keys[0]], address)
+
+
+@unix_only
+def test_stale_socket_is_replaced(running, short_dir):
+    address = os.path.join(short_dir, "s.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(address)
+    stale.close()
+    running(address)
+    assert daemon.SigningClient(address).ping()
+
+
+@unix_only
+def test_protocol(running, short_dir, ec_keys):
+    address = os.path.join(short_dir, "s.sock")
+    running(address)
+    key_id = core.key_fingerprint(core.load_public_key(ec_keys[1]))
+    digest = hashlib.sha256(b"payload").hexdigest()
+    keys, signed, unknown, bad_hex, short, too_many, no_key, bad_key = _raw_call(
+        address,
+        {"op": "keys"},
+        {"op": "sign", "digests": [digest]},
+        {"op": "explode"},
+        {"op": "sign", "digests": ["zz"]},
+        {"op": "sign", "digests": ["00" * 16]},
+        {"op": "sign", "digests": [digest] * (daemon.MAX_BATCH + 1)},
+        {"op": "sign", "key_id": "0" * 64, "digests": [digest]},
+        {"op": "sign", "key_id": ["not", "hashable"], "digests": [digest]},
+    )
+    assert keys == {"status": "ok", "key_ids": [key_id], "default": key_id}
+    assert signed["status"] == "ok" and signed["key_id"] == key_id
+    for response in (unknown, bad_hex, short, too_many, no_key, bad_key):
+        assert response["status"] == "error"
+
+    malformed, not_object, ping = _raw_call(address, b"{not json\n", b"[1, 2]\n", {"op": "ping"})
+    assert malformed == not_object == {"status": "error", "message": "Malformed request."}
+    assert ping == {"status": "ok"}
+
+    assert _raw_call(address, b"x" * (daemon.MAX_REQUEST_BYTES + 10) + b"\n")[0]["message"] == "Request too large."
+
+
+@unix_only
+def test_signatures_match_sidecar_format(running, short_dir, ec_keys, tmp_path):
+    address = os.path.join(short_dir, "s.sock")
+    running(address)
+    digest = hashlib.sha256(b"payload").digest()
+    with daemon.SigningClient(address) as client:
+        key_id, signatures = client.sign_digests([digest] * 3)
+    signed_file = str(tmp_path / "payload.signed")
+    with open(signed_file, "wb") as f:
+        f.write(signatures[0])
+    assert core.verify_digest_standalone(digest, ec_keys[1], signed_file)
+
+
+def test_tcp_token(running, tmp_path):
+    server = running("127.0.0.1:0", token_file=str(tmp_path / "daemon.token"))
+    address = "127.0.0.1:%d" % server.server_address[1]
+    with open(tmp_path / "daemon.token", encoding="utf-8") as f:
+        token = f.read().strip()
+    assert stat.S_IMODE(os.stat(tmp_path / "daemon.token").st_mode) == 0o600
+
+    missing, wrong, non_ascii, not_string, good = _raw_call(
+        address,
+        {"op": "ping"},
+        {"op": "ping", "token": "0" * 64},
+        {"op": "ping", "token": "jeton-é"},
+        {"op": "ping", "token": {"nested": True}},
+        {"op": "ping", "token": token},
+    )
+    for response in (missing, wrong, non_ascii, not_string):
+        assert response == {"status": "error", "message": "Invalid token."}
+    # La connexion a survécu aux jetons invalides
+    assert good == {"status": "ok"}
+    assert daemon.SigningClient(address, token_file=str(tmp_path / "daemon.token")).ping()
+
+    with pytest.raises(ValueError):
+        daemon.create_server([], "10.0.0.1:8765")
+
+
+@unix_only
+def test_sign_files_reports_errors_per_file(running, short_dir, ec_keys, tmp_path, monkeypatch, capsys):
+    address = os.path.join(short_dir, "s.sock")
+    running(address)
+    files = []
+    for index in range(5):
+        path = str(tmp_path / f"file_{index}.txt")
+        with open(path, "wb") as f:
+            f.write(b"%d\n" % index)
+        files.append(path)
+
+    calculate_hash = core.calculate_hash
+
+    def failing_hash(path, *args, **kwargs):
+        if path == files[2]:
+            raise OSError("unreadable")
+        return calculate_hash(path, *args, **kwargs)
+    monkeypatch.setattr(core, "calculate_hash", failing_hash)
+
+    status = cli.main(["--format", "json", "sign", *files, "--key", ec_keys[1], "--daemon", address])
+    results = {os.path.basename(r["path"]): r for r in json.loads(capsys.readouterr().out)["results"]}
+    assert status == 1
+    assert results.pop("file_2.txt")["status"] == "error"
+    assert {r["status"] for r in results.values()} == {"ok"}
+    monkeypatch.setattr(core, "calculate_hash", calculate_hash)
+    for path in files[:2] + files[3:]:
+        assert core.verify_file_standalone(path, ec_keys[1], path + ".signed", paranoid=True)
+
+    with daemon.SigningClient(address) as client, pytest.raises(Exception, match="Error hashing"):
+        client.sign_files([files[0], str(tmp_path)])
@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+import ds_sign_cli as cli
+import ds_sign_core as core
+from conftest import write_files
+
+FILES = {
+    "a.txt": b"a\n",
+    "docs/guide.md": b"guide\n",
+    "docs/old/notes.txt": b"notes\n",
+    "src/main.py": b"main\n",
+    "src/util.py": b"util\n",
+    "empty/": b"",
+}
+
+
+def diff(stored, live, stop_at_first=False):
+    return core.diff_tree_entries(stored, live, stop_at_first)
+
+
+def test_diff_tree_entries():
+    stored = [("a", "f"), ("b", "d"), ("b/c", "f"), ("d", "f")]
+    live = [("a", "f"), ("b", "f"), ("c", "f")]
+    assert diff(stored, live) == (["b"], ["b/c", "d"], ["c"])
+    assert diff(stored, live, stop_at_first=True) == (["b"], [], [])
+    assert diff(stored, stored) == ([], [], [])
+
+
+def test_diff_is_linear():
+    stored = [(f"f{index:07d}", "f") for index in range(300_000)]
+    live = stored[1:] + [("g", "f")]
+    start = time.perf_counter()
+    assert diff(stored, live) == ([], ["f0000000"], ["g"])
+    assert time.perf_counter() - start < 2
+
+
+def _change_structure(directory):
+    os.remove(os.path.join(directory, "a.txt"))
+    shutil.rmtree(os.path.join(directory, "docs", "old"))
+    os.remove(os.path.join(directory, "src", "util.py"))
+    os.makedirs(os.path.join(directory, "src", "util.py"))  # Fichier devenu dossier
+    write_files(directory, {"new.txt": b"new\n"})
+
+
+@pytest.mark.parametrize("memory_limit", [0, 256])
+def test_tree_mode_reports_structured_differences(tmp_path, ec_keys, memory_limit):
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, ec_keys[0], mode="tree", memory_limit=memory_limit)
+    _change_structure(directory)
+    differences = {}
+    valid, message = core.verify_directory(directory, ec_keys[1], differences=differences,
+                                           memory_limit=memory_limit)
+    assert not valid and message.startswith("Directory structure mismatch.")
+    assert differences == {"modified": ["src/util.py"], "missing": ["a.txt", "docs/old", "docs/old/notes.txt"],
+                           "added": ["new.txt"]}
+    assert core.differences_report(differences).splitlines() == [
+        "Modified: src/util.py", "Missing: a.txt", "Missing: docs/old", "Missing: docs/old/notes.txt",
+        "Added: new.txt"]
+
+
+def test_bounded_differences_are_truncated(tmp_path, ec_keys, monkeypatch):
+    monkeypatch.setattr(core, "DIFFERENCES_LIMIT", 2)
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, ec_keys[0], mode="tree", memory_limit=256)
+    write_files(directory, {f"added_{index}.txt": b"" for index in range(5)})
+    differences = {}
+    assert not core.verify_directory(directory, ec_keys[1], differences=differences, memory_limit=256)[0]
+    assert differences["added"] == ["added_0.txt", "added_1.txt"] and differences["truncated"]
+    assert core.differences_report(differences).endswith("(at most 2 entries of each kind are listed)")
+
+
+def test_cli_reports_differences(tmp_path, ec_keys, capsys):
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, ec_keys[0], mode="merkle", paranoid=True)
+    with open(os.path.join(directory, "src", "main.py"), "ab") as f:
+        f.write(b"tampered")
+    os.remove(os.path.join(directory, "a.txt"))
+    status = cli.main(["--format", "json", "verify-dir", directory, "--key", ec_keys[1]])
+    result = json.loads(capsys.readouterr().out)["results"][0]
+    assert status == 1 and result["status"] == "failed"
+    assert result["differences"] == {"modified": ["src/main.py"], "missing": ["a.txt"], "added": []}
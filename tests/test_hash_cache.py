@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+FILES = {f"src/file_{index}.txt": b"content %d\n" % index for index in range(8)}
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "HASH_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    # Les fichiers tout juste écrits ne sont pas mis en cache (fenêtre d'horodatage) : elle est désactivée ici
+    monkeypatch.setattr(core.HashCache, "RACY_WINDOW_NS", -1)
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    return directory
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Chemins réellement hachés (hors cache)."""
+    paths = []
+    calculate_hash = core.calculate_hash
+
+    def counting(file_path, *args, **kwargs):
+        paths.append(file_path)
+        return calculate_hash(file_path, *args, **kwargs)
+    monkeypatch.setattr(core, "calculate_hash", counting)
+    return paths
+
+
+def _hash(directory, **kwargs):
+    return core.hash_directory_files(directory, core.list_directory_files(directory), max_workers=2, **kwargs)
+
+
+def test_unchanged_files_come_from_the_cache(tree, hashed):
+    first = _hash(tree)
+    assert len(hashed) == len(FILES)
+    hashed.clear()
+    assert _hash(tree) == first
+    assert hashed == []
+
+
+def test_changed_file_is_hashed_again(tree, hashed):
+    first = _hash(tree)
+    path = os.path.join(tree, "src", "file_3.txt")
+    st = os.stat(path)
+    with open(path, "wb") as f:
+        f.write(b"content X\n")  # Même taille
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))  # Même mtime : le ctime et le contenu changent
+    hashed.clear()
+    second = _hash(tree)
+    assert [os.path.basename(path) for path in hashed] == ["file_3.txt"]
+    assert second["src/file_3.txt"] != first["src/file_3.txt"]
+    assert {k: v for k, v in second.items() if k != "src/file_3.txt"} == \
+        {k: v for k, v in first.items() if k != "src/file_3.txt"}
+
+
+def test_paranoid_ignores_the_cache(tree, hashed):
+    _hash(tree)
+    hashed.clear()
+    _hash(tree, paranoid=True)
+    assert len(hashed) == len(FILES)
+
+
+def test_recent_files_are_not_cached(tree, hashed, monkeypatch):
+    monkeypatch.setattr(core.HashCache, "RACY_WINDOW_NS", 3600 * 10 ** 9)
+    _hash(tree)
+    with core.HashCache() as cache:
+        assert cache.load_directory(tree) == {}
+
+
+def test_removed_files_are_evicted(tree):
+    _hash(tree)
+    removed = os.path.join(os.path.abspath(tree), "src", "file_0.txt")
+    os.remove(removed)
+    _hash(tree)
+    with core.HashCache() as cache:
+        cached = cache.load_directory(tree)
+    assert removed not in cached and len(cached) == len(FILES) - 1
+
+
+def test_each_algorithm_has_its_own_entries(tree, hashed):
+    sha256 = _hash(tree)
+    hashed.clear()
+    blake2b = _hash(tree, algorithm="blake2b")
+    assert len(hashed) == len(FILES)
+    assert all(len(digest) == 128 for digest in blake2b.values())
+    hashed.clear()
+    assert _hash(tree) == sha256 and _hash(tree, algorithm="blake2b") == blake2b
+    assert hashed == []
+
+
+def test_incremental_sign_directory(tree, hashed, ec_keys):
+    core.sign_directory(tree, ec_keys[0], mode="manifest")
+    with open(os.path.join(tree, "src", "file_5.txt"), "ab") as f:
+        f.write(b"more\n")
+    hashed.clear()
+    core.sign_directory(tree, ec_keys[0], mode="manifest")
+    assert [os.path.basename(path) for path in hashed if not path.endswith(core.MANIFEST_FILE)] == ["file_5.txt"]
+    assert core.verify_directory(tree, ec_keys[1], paranoid=True)[0]
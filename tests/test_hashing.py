@@ -0,0 +1,69 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import ds_sign_core as core
+
+BUFFER = 4096
+MMAP_THRESHOLD = 4 * BUFFER
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(core, "HASH_MMAP_THRESHOLD", MMAP_THRESHOLD)
+
+
+@pytest.mark.parametrize("size", [0, 1, BUFFER - 1, BUFFER, BUFFER + 1, 3 * BUFFER + 7, MMAP_THRESHOLD + 1])
+@pytest.mark.parametrize("strategy", core.HASH_STRATEGIES)
+def test_every_strategy_matches_hashlib(tmp_path, small_limits, size, strategy):
+    data = os.urandom(size)
+    path = str(tmp_path / "sample.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+    for algorithm in core.DIGEST_ALGORITHMS:
+        expected = core.new_hasher(algorithm)
+        expected.update(data)
+        progress = []
+        digest = core.calculate_hash(path, progress=lambda done, total: progress.append((done, total)),
+                                     strategy=strategy, buffer_size=BUFFER, algorithm=algorithm)
+        assert digest == expected.hexdigest()
+        assert not size or progress[-1] == (size, size)
+    assert core.calculate_hash(path, strategy=strategy, buffer_size=BUFFER) == hashlib.sha256(data).hexdigest()
+
+
+def test_auto_strategy_by_size(small_limits):
+    assert core.select_hash_strategy(0, "auto", BUFFER) == "read"
+    assert core.select_hash_strategy(BUFFER, "auto", BUFFER) == "read"
+    assert core.select_hash_strategy(BUFFER + 1, "auto", BUFFER) == "readinto"
+    assert core.select_hash_strategy(MMAP_THRESHOLD, "auto", BUFFER) == "mmap"
+    assert core.select_hash_strategy(1, "mmap", BUFFER) == "mmap"
+    with pytest.raises(ValueError):
+        core.select_hash_strategy(1, "aio", BUFFER)
+
+
+class _RecordingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.requests = []
+
+    def read(self, size=-1):
+        self.requests.append(size)
+        return super().read(size)
+
+
+def test_one_block_file_is_read_once():
+    buffer_size = 1024 * 1024
+    file = _RecordingFile(b"x" * 5000)
+    core._hash_read(file, hashlib.sha256(), 5000, buffer_size, None, None)
+    # Une lecture de la taille du fichier, puis un contrôle de fin de fichier sans tampon de 1 Mo
+    assert file.requests == [5000, 1]
+
+
+def test_file_that_grows_is_read_to_the_end():
+    data = b"y" * 300_000
+    file = _RecordingFile(data)
+    hasher = hashlib.sha256()
+    core._hash_read(file, hasher, 5000, 1024 * 1024, None, None)
+    assert hasher.hexdigest() == hashlib.sha256(data).hexdigest()
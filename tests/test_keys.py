@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import ds_sign_core as core
+from conftest import HAS_OPENSSL, requires_native
+
+pytestmark = requires_native
+
+
+@pytest.fixture(scope="module")
+def signers(tmp_path_factory):
+    key_dir = str(tmp_path_factory.mktemp("signers"))
+    return key_dir, [core.generate_key_pair(f"signer{index}", key_dir) for index in range(4)]
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = str(tmp_path / "artifact.bin")
+    with open(path, "wb") as f:
+        f.write(b"artifact\n" * 1000)
+    return path
+
+
+def test_no_key_id_sidecar_by_default(data_file, signers):
+    _, pairs = signers
+    signed_file = core.sign_file_standalone(data_file, pairs[0][0])
+    assert not os.path.exists(signed_file + core.KEY_ID_SUFFIX)
+    assert core.verify_file_standalone(data_file, pairs[0][1], signed_file, paranoid=True)
+
+
+def test_key_directory_needs_a_recorded_key_id(data_file, signers):
+    key_dir, pairs = signers
+    signed_file = core.sign_file_standalone(data_file, pairs[0][0])
+    with pytest.raises(Exception, match="DS_SIGN_KEY_IDS=1"):
+        core.verify_file_standalone(data_file, key_dir, signed_file, paranoid=True)
+
+
+@pytest.mark.parametrize("backend", ["native", "openssl"])
+def test_key_directory_picks_the_signer(data_file, signers, monkeypatch, backend):
+    if backend == "openssl" and not HAS_OPENSSL:
+        pytest.skip("OpenSSL not available")
+    key_dir, pairs = signers
+    monkeypatch.setattr(core, "WRITE_KEY_IDS", True)
+    for private_key, public_key in pairs:
+        signed_file = core.sign_file_standalone(data_file, private_key, backend=backend)
+        key_id = core.read_key_id(signed_file)
+        assert key_id == core.key_fingerprint(core.load_public_key(public_key))
+        assert core.resolve_public_key(key_dir, signed_file) == os.path.join(key_dir, os.path.basename(public_key))
+        assert core.verify_file_standalone(data_file, key_dir, signed_file, paranoid=True)
+
+
+def test_stale_key_id_is_removed(data_file, signers, monkeypatch):
+    _, pairs = signers
+    monkeypatch.setattr(core, "WRITE_KEY_IDS", True)
+    signed_file = core.sign_file_standalone(data_file, pairs[0][0])
+    monkeypatch.setattr(core, "WRITE_KEY_IDS", False)
+    core.sign_file_standalone(data_file, pairs[1][0])
+    assert not os.path.exists(signed_file + core.KEY_ID_SUFFIX)
+
+
+def test_keystore_indexes_by_fingerprint(tmp_path, signers):
+    key_dir = str(tmp_path / "store")
+    os.makedirs(key_dir)
+    store = core.KeyStore(key_dir)
+    assert store.key_ids() == {"public": {}, "private": {}}
+    private_key, public_key = core.generate_key_pair("late", key_dir)
+    with open(os.path.join(key_dir, "notes.pem"), "w") as f:
+        f.write("not a key\n")
+    fingerprint = core.key_fingerprint(core.load_public_key(public_key))
+    # Une clé ajoutée après le premier parcours est trouvée par un nouveau parcours
+    assert store.public_key_path(fingerprint) == public_key
+    assert store.private_key_path(fingerprint) == private_key
+    with pytest.raises(Exception, match="No key with ID"):
+        store.public_key_path("0" * 64)
+
+
+def test_key_cache_is_bounded_and_reparses_changed_keys(tmp_path, signers):
+    _, pairs = signers
+    cache = core.KeyCache(max_size=2)
+    first = cache.load(pairs[0][1], False)
+    assert cache.load(pairs[0][1], False) is first
+    cache.load(pairs[1][1], False)
+    cache.load(pairs[2][1], False)
+    assert len(cache._entries) == 2
+    assert cache.load(pairs[0][1], False) is not first  # Évincée (LRU), donc analysée à nouveau
+
+    copy = str(tmp_path / "copy.pem")
+    with open(pairs[3][1], "rb") as source, open(copy, "wb") as target:
+        target.write(source.read())
+    before = cache.load(copy, False)
+    with open(pairs[2][1], "rb") as source, open(copy, "wb") as target:
+        target.write(source.read())
+    os.utime(copy, ns=(0, os.stat(copy).st_mtime_ns + 1_000_000))
+    assert cache.load(copy, False)[1] != before[1]
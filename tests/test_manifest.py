@@ -0,0 +1,66 @@
+import hashlib
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+FILES = {f"pkg/mod_{index:02d}.py": b"module %d\n" % index for index in range(30)}
+FILES.update({"README.md": b"readme\n", "data/big.bin": b"\x00" * (3 * 1024 * 1024), "empty.txt": b""})
+
+
+@pytest.fixture
+def signed(tmp_path, ec_keys):
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, ec_keys[0], mode="manifest", paranoid=True)
+    return directory
+
+
+def test_manifest_lists_every_file_digest(signed):
+    manifest_path = os.path.join(signed, core.MANIFEST_FILE)
+    with open(manifest_path, encoding="utf-8") as f:
+        assert f.readline() == core.MANIFEST_HEADER + "\n"
+    expected = {rel_path: hashlib.sha256(content).hexdigest() for rel_path, content in FILES.items()}
+    assert core.read_manifest(manifest_path) == expected
+    assert list(core.read_manifest(manifest_path)) == sorted(expected)
+
+
+@pytest.mark.skipif(not shutil.which("sha256sum"), reason="sha256sum not available")
+def test_manifest_is_readable_by_sha256sum(signed):
+    result = subprocess.run(["sha256sum", "--check", "--quiet", core.MANIFEST_FILE], cwd=signed,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_manifest_does_not_depend_on_worker_count(signed, ec_keys):
+    manifest_path = os.path.join(signed, core.MANIFEST_FILE)
+    with open(manifest_path, "rb") as f:
+        parallel = f.read()
+    core.sign_directory(signed, ec_keys[0], mode="manifest", max_workers=1, paranoid=True)
+    with open(manifest_path, "rb") as f:
+        assert f.read() == parallel
+
+
+def test_verify_reports_every_difference(signed, ec_keys):
+    assert core.verify_directory(signed, ec_keys[1], paranoid=True)[0]
+    with open(os.path.join(signed, "pkg", "mod_04.py"), "ab") as f:
+        f.write(b"tampered")
+    os.remove(os.path.join(signed, "README.md"))
+    write_files(signed, {"pkg/new.py": b"new\n"})
+    differences = {}
+    valid, message = core.verify_directory(signed, ec_keys[1], paranoid=True, differences=differences)
+    assert not valid and "mismatch" in message
+    assert differences == {"modified": ["pkg/mod_04.py"], "missing": ["README.md"], "added": ["pkg/new.py"]}
+
+
+def test_edited_manifest_breaks_the_signature(signed, ec_keys):
+    manifest_path = os.path.join(signed, core.MANIFEST_FILE)
+    with open(manifest_path, encoding="utf-8") as f:
+        content = f.read()
+    with open(manifest_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(content.replace(hashlib.sha256(b"readme\n").hexdigest(), "0" * 64))
+    assert core.verify_directory(signed, ec_keys[1], paranoid=True) == (False, "Signature invalid.")
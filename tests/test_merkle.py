@@ -0,0 +1,133 @@
+import hashlib
+import os
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+FILES = {
+    "a.txt": b"alpha\n",
+    "b.txt": b"bravo\n",
+    "docs/readme.md": b"# readme\n",
+    "docs/guide/intro.txt": b"intro\n",
+    "docs/guide/usage.txt": b"usage\n",
+    "src/main.py": b"print('main')\n",
+    "src/util.py": b"pass\n",
+    "src/lib/one.py": b"1\n",
+    "src/lib/two.py": b"2\n",
+    "src/lib/three.py": b"3\n",
+}
+
+
+@pytest.fixture
+def signed_tree(tmp_path, ec_keys):
+    private_key, public_key = ec_keys
+    write_files(str(tmp_path), FILES)
+    core.sign_directory(str(tmp_path), private_key, mode="merkle", paranoid=True)
+    return str(tmp_path), public_key
+
+
+def _digests(count, depth=1):
+    digests = {}
+    for index in range(count):
+        rel_path = "/".join(f"d{level}" for level in range(depth - 1)) + ("/" if depth > 1 else "") + f"f{index}"
+        digests[rel_path] = hashlib.sha256(rel_path.encode()).hexdigest()
+    return digests
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 33])
+@pytest.mark.parametrize("depth", [1, 3])
+def test_every_proof_rebuilds_the_root(count, depth):
+    digests = _digests(count, depth)
+    root = core.merkle_root_from_digests(digests)
+    for rel_path, digest in digests.items():
+        proof = core.build_merkle_proof(digests, rel_path)
+        assert proof["type"] == "file"
+        assert core.merkle_root_from_proof(proof, bytes.fromhex(digest)) == root
+        # Une autre empreinte pour la même feuille ne doit jamais retomber sur la racine
+        assert core.merkle_root_from_proof(proof, hashlib.sha256(b"other").digest()) != root
+
+
+def test_directory_proof_uses_the_subtree_root():
+    digests = {"x/a": "00" * 32, "x/b": "11" * 32, "y": "22" * 32}
+    proof = core.build_merkle_proof(digests, "x")
+    assert proof["type"] == "dir"
+    subtree_root = core.merkle_root_from_digests({"a": "00" * 32, "b": "11" * 32})
+    assert core.merkle_root_from_proof(proof, subtree_root) == core.merkle_root_from_digests(digests)
+
+
+def test_unknown_path_has_no_proof():
+    with pytest.raises(ValueError):
+        core.build_merkle_proof(_digests(4), "missing")
+
+
+def test_malformed_proof_is_rejected():
+    digests = _digests(5)
+    proof = core.build_merkle_proof(digests, "f0")
+    proof["steps"][0]["siblings"].append("00" * 32)
+    with pytest.raises(ValueError):
+        core.merkle_root_from_proof(proof, bytes.fromhex(digests["f0"]))
+
+
+@pytest.mark.parametrize("rel_path", sorted(FILES) + ["docs", "docs/guide", "src/lib"])
+def test_verify_member(signed_tree, rel_path):
+    directory, public_key = signed_tree
+    valid, message = core.verify_merkle_member(directory, rel_path, public_key)
+    assert valid, message
+
+
+def test_verify_member_with_written_proof(signed_tree, tmp_path_factory):
+    directory, public_key = signed_tree
+    proof_path = str(tmp_path_factory.mktemp("proofs") / "proof.json")
+    core.write_merkle_proof(directory, "src/lib/two.py", proof_path)
+    # La preuve suffit : le manifeste de l'arbre n'est plus nécessaire
+    os.remove(os.path.join(directory, core.MERKLE_FILE))
+    valid, message = core.verify_merkle_member(directory, "src/lib/two.py", public_key, proof=proof_path)
+    assert valid, message
+    valid, message = core.verify_merkle_member(directory, "src/lib/one.py", public_key, proof=proof_path)
+    assert not valid
+
+
+def test_verify_member_detects_changes(signed_tree):
+    directory, public_key = signed_tree
+    with open(os.path.join(directory, "src", "lib", "one.py"), "ab") as f:
+        f.write(b"tampered")
+    valid, message = core.verify_merkle_member(directory, "src/lib/one.py", public_key)
+    assert not valid and "mismatch" in message
+    assert not core.verify_merkle_member(directory, "src/lib", public_key)[0]
+    assert core.verify_merkle_member(directory, "src/lib/two.py", public_key)[0]
+    assert not core.verify_directory(directory, public_key, paranoid=True)[0]
+
+
+@pytest.mark.parametrize("algorithm", ["sha512", "blake2b"])
+def test_proof_only_verification_with_other_digest(tmp_path, ec_keys, algorithm):
+    private_key, public_key = ec_keys
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, private_key, mode="merkle", paranoid=True, algorithm=algorithm)
+    assert core.read_merkle_root(os.path.join(directory, core.MERKLE_ROOT_FILE))[0] == algorithm
+    proof_path = str(tmp_path / "proof.json")
+    core.write_merkle_proof(directory, "src/lib/one.py", proof_path)
+    os.remove(os.path.join(directory, core.MERKLE_FILE))
+    valid, message = core.verify_merkle_member(directory, "src/lib/one.py", public_key, proof=proof_path)
+    assert valid, message
+
+
+def test_leaf_algorithm_is_bound_to_the_signed_root(tmp_path, ec_keys):
+    private_key, public_key = ec_keys
+    directory = str(tmp_path / "tree")
+    write_files(directory, FILES)
+    core.sign_directory(directory, private_key, mode="merkle", paranoid=True, algorithm="blake2b")
+    # L'en-tête de merkle_file n'est pas signé : le modifier ne change pas l'algorithme utilisé
+    merkle_path = os.path.join(directory, core.MERKLE_FILE)
+    with open(merkle_path, encoding="utf-8") as f:
+        content = f.read()
+    with open(merkle_path, "w", encoding="utf-8") as f:
+        f.write(content.replace(" blake2b\n", " sha256\n", 1))
+    assert core.verify_merkle_member(directory, "a.txt", public_key)[0] is False
+    assert core.verify_directory(directory, public_key, paranoid=True)[0]
+
+    proof = core.build_merkle_proof({"a.txt": "00" * 64}, "a.txt", "sha256")
+    valid, message = core.verify_merkle_member(directory, "a.txt", public_key, proof=proof)
+    assert not valid and "algorithm" in message
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+
+import pytest
+
+import ds_sign_cli as cli
+import ds_sign_core as core
+from ds_sign_metrics import LATENCY_BUCKETS, Histogram, Metrics, metrics
+from conftest import write_files
+
+
+@pytest.fixture
+def global_metrics():
+    enabled = metrics.enabled
+    metrics.enable()
+    metrics.reset()
+    yield metrics
+    metrics.enabled = enabled
+    metrics.reset()
+
+
+def _counter(report, name, **labels):
+    return sum(value for counter, counter_labels, value in report["counters"]
+               if counter == name and all(counter_labels.get(k) == v for k, v in labels.items()))
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics()
+    with registry.phase("hash"), registry.operation("sign_file"):
+        registry.add("bytes_hashed", 10)
+    assert registry.snapshot() == {"counters": [], "histograms": []}
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for value in (0.00005, LATENCY_BUCKETS[0], 0.002, 1000.0):
+        histogram.observe(value)
+    assert histogram.counts[0] == 2  # Bornes supérieures incluses, comme "le" dans Prometheus
+    assert histogram.counts[LATENCY_BUCKETS.index(0.005)] == 1
+    assert histogram.counts[-1] == 1
+    assert histogram.count == 4 and histogram.sum == pytest.approx(1000.00215)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def test_operation_statuses():
+    registry = Metrics(enabled=True)
+    with registry.operation("verify_file"):
+        pass
+    with registry.operation("verify_file") as span:
+        span.fail()
+    for exception in (ValueError, _Cancelled):
+        with pytest.raises(exception), registry.operation("verify_file", cancelled=_Cancelled):
+            raise exception()
+    report = registry.report()
+    for status in ("ok", "failed", "error", "cancelled"):
+        assert _counter(report, "operations", operation="verify_file", status=status) == 1
+    assert _counter(report, "failures", operation="verify_file") == 2
+    histogram = report["histograms"][0]
+    assert histogram[:2] == ["operation_seconds", {"operation": "verify_file"}] and histogram[2]["count"] == 4
+
+
+def test_drain_and_merge():
+    worker, parent = Metrics(enabled=True), Metrics(enabled=True)
+    for _ in range(2):
+        worker.add("bytes_hashed", 100)
+        with worker.phase("hash"):
+            pass
+        parent.merge(worker.drain())
+    assert worker.snapshot() == {"counters": [], "histograms": []}
+    report = parent.report()
+    assert _counter(report, "bytes_hashed") == 200
+    assert report["histograms"][0][2]["count"] == 2
+
+
+def test_prometheus_text():
+    registry = Metrics(enabled=True)
+    registry.add("operations", 3, operation='sign "x"\\', status="ok")
+    for seconds in (0.0002, 0.02, 2.0):
+        registry.observe("phase_seconds", seconds, (("phase", "hash"),))
+    text = registry.prometheus_text()
+    assert "# TYPE ds_sign_operations_total counter" in text
+    assert 'ds_sign_operations_total{operation="sign \\"x\\"\\\\",status="ok"} 3' in text
+    buckets = [int(value) for value in re.findall(r'ds_sign_phase_seconds_bucket\{phase="hash",le="[^"]+"\} (\d+)', text)]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 3  # Cumulatifs ; "+Inf" vaut le nombre d'observations
+    assert 'le="+Inf"' in text and 'ds_sign_phase_seconds_count{phase="hash"} 3' in text
+    for line in text.splitlines():
+        assert line.startswith("#") or re.fullmatch(r'[a-z_]+(\{.*\})? [0-9.e+-]+', line), line
+
+
+def test_engine_is_instrumented(global_metrics, tmp_path, ec_keys):
+    directory = str(tmp_path / "tree")
+    write_files(directory, {f"f{index}.txt": b"x" * 1000 for index in range(5)})
+    core.sign_directory(directory, ec_keys[0], mode="manifest", paranoid=True)
+    core.verify_directory(directory, ec_keys[1], paranoid=True)
+    report = global_metrics.report()
+    assert _counter(report, "operations", operation="sign_directory", status="ok") == 1
+    assert _counter(report, "operations", operation="verify_directory", status="ok") == 1
+    assert _counter(report, "bytes_hashed") >= 2 * 5000
+    phases = {labels["phase"] for name, labels, _ in report["histograms"] if name == "phase_seconds"}
+    assert {"walk", "hash", "write"} <= phases
+
+
+def test_cli_exports_metrics_from_worker_processes(global_metrics, tmp_path, ec_keys, capsys):
+    root = str(tmp_path / "files")
+    write_files(root, {f"file_{index}.txt": b"y" * 2048 for index in range(8)})
+    files = [os.path.join(root, name) for name in sorted(os.listdir(root))]
+    json_path, prometheus_path = str(tmp_path / "metrics.json"), str(tmp_path / "metrics.prom")
+    status = cli.main(["--format", "json", "--metrics", json_path, "--prometheus", prometheus_path,
+                       "sign", *files, "--key", ec_keys[0], "--jobs", "2"])
+    capsys.readouterr()
+    assert status == 0
+    with open(json_path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert _counter(report, "files_hashed") == len(files)
+    assert _counter(report, "bytes_hashed") == len(files) * 2048
+    assert _counter(report, "operations", operation="sign_file", status="ok") == len(files)
+    with open(prometheus_path, encoding="utf-8") as f:
+        assert f'ds_sign_files_hashed_total {len(files)}' in f.read()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,100 @@
+import marshal
+import os
+import pstats
+import re
+import threading
+
+import pytest
+
+import ds_sign_cli as cli
+import ds_sign_core as core
+import ds_sign_profile
+from conftest import write_files
+
+
+@pytest.fixture
+def isolated_profile(monkeypatch):
+    # start_profiler() marque l'environnement pour les processus de travail : remis en état après le test
+    monkeypatch.delenv(ds_sign_profile.PROFILE_JOBS_ENV, raising=False)
+    monkeypatch.setattr(ds_sign_profile, "_current", None)
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_writes_three_reports(tmp_path):
+    data_file = str(tmp_path / "data.bin")
+    with open(data_file, "wb") as f:
+        f.write(os.urandom(4 * 1024 * 1024))
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy")
+    with ds_sign_profile.Profiler(interval=0.001) as profiler:
+        worker.start()
+        for _ in range(5):
+            core.calculate_hash(data_file, strategy="read", buffer_size=64 * 1024)
+        stop.wait(0.1)
+        stop.set()
+        worker.join()
+
+    path = str(tmp_path / "out" / "run.prof")
+    assert profiler.write(path, "unit test") == [path, path + ".txt", path + ".folded"]
+    with open(path + ".txt", encoding="utf-8") as f:
+        summary = f.read()
+    assert summary.startswith("DS-Sign-Tool profile: unit test\n")
+    if profiler.deterministic:
+        assert "calculate_hash" in summary
+        assert any(function[2] == "calculate_hash" for function in pstats.Stats(path).stats)
+    # L'échantillonneur voit aussi les autres threads
+    assert profiler.sampler.samples > 0 and "_busy" in summary
+    with open(path + ".folded", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(re.fullmatch(r"\S.* \d+", line) for line in lines)
+    assert any("test_profile.py" in line and "_busy" in line for line in lines)
+
+
+class _RefusedProfile:
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_reports_without_cprofile(tmp_path):
+    # Python 3.12+ : cProfile est refusé si un autre profileur est actif ; l'échantillonnage suffit alors
+    profiler = ds_sign_profile.Profiler(interval=0.001)
+    profiler.profile = _RefusedProfile()
+    profiler.start()
+    assert not profiler.deterministic
+    threading.Event().wait(0.05)
+    profiler.stop()
+    path = str(tmp_path / "sampled.prof")
+    profiler.write(path, "sampled")
+    with open(path + ".txt", encoding="utf-8") as f:
+        summary = f.read()
+    assert "cProfile unavailable" in summary and "Sampled threads" in summary
+    with open(path, "rb") as f:
+        assert marshal.load(f) == {}
+
+    profiler.add_stats({})  # Tâche sans statistiques
+    profiler.add_stats({("x.py", 1, "f"): (1, 1, 0.5, 0.5, {})})
+    assert profiler.stats().stats == {("x.py", 1, "f"): (1, 1, 0.5, 0.5, {})}
+
+
+def test_job_profile_only_in_profiled_workers(isolated_profile):
+    assert ds_sign_profile.job_profile() is None
+    os.environ[ds_sign_profile.PROFILE_JOBS_ENV] = "1"
+    assert ds_sign_profile.job_profile() is None  # Processus principal : le profil de la CLI suffit
+
+
+def test_cli_merges_worker_job_profiles(isolated_profile, tmp_path, ec_keys, capsys):
+    root = str(tmp_path / "files")
+    write_files(root, {f"file_{index}.txt": b"z" * 4096 for index in range(6)})
+    files = [os.path.join(root, name) for name in sorted(os.listdir(root))]
+    path = str(tmp_path / "cli.prof")
+    status = cli.main(["--format", "json", "--profile", path, "sign", *files, "--key", ec_keys[0], "--jobs", "2"])
+    assert status == 0
+    assert "Profile written to" in capsys.readouterr().err
+    with open(path + ".txt", encoding="utf-8") as f:
+        summary = f.read()
+    assert f"{len(files)} worker job profile(s) merged" in summary
+    assert any(function[2] == "sign_file_standalone" for function in pstats.Stats(path).stats)
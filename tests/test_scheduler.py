@@ -0,0 +1,90 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+import ds_sign_core as core
+
+
+def _square(value):
+    if value == 3:
+        raise ValueError("three")
+    return value * value
+
+
+def test_map_keeps_input_order_and_returns_exceptions():
+    with core.JobScheduler(max_workers=4) as scheduler:
+        results = list(scheduler.map(_square, range(10)))
+    assert [item for item, _ in results] == list(range(10))
+    assert isinstance(results[3][1], ValueError)
+    assert [value for item, value in results if item != 3] == [item * item for item in range(10) if item != 3]
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_chunked_map(use_processes):
+    with core.JobScheduler(max_workers=2, use_processes=use_processes) as scheduler:
+        results = list(scheduler.map(abs, [-item for item in range(25)], chunksize=4))
+    assert results == [(-item, item) for item in range(25)]
+
+
+def test_submit_blocks_at_max_pending():
+    release = threading.Event()
+    scheduler = core.JobScheduler(max_workers=1, max_pending=2)
+    try:
+        scheduler.submit(release.wait)
+        scheduler.submit(release.wait)
+        third = threading.Thread(target=scheduler.submit, args=(release.wait,))
+        third.start()
+        third.join(0.2)
+        assert third.is_alive() and scheduler.pending == 2  # Contre-pression : la troisième tâche attend
+        release.set()
+        third.join(5)
+        assert not third.is_alive()
+    finally:
+        release.set()
+        scheduler.shutdown()
+    assert scheduler.pending == 0
+
+
+def test_map_reads_its_input_lazily():
+    consumed = itertools.count()
+
+    def items():
+        for item in range(10_000):
+            next(consumed)
+            yield item
+
+    with core.JobScheduler(max_workers=2, max_pending=4) as scheduler:
+        results = scheduler.map(_square, items())
+        next(results)
+        # Seule la fenêtre de `max_pending` tâches est lue d'avance, pas tout le générateur
+        assert next(consumed) <= 6
+        results.close()
+
+
+def test_timeout_is_reported_per_item():
+    release = threading.Event()
+    with core.JobScheduler(max_workers=1) as scheduler:
+        results = list(scheduler.map(lambda item: release.wait(5) and item, [1, 2], timeout=0.1))
+        release.set()
+    for _, value in results:
+        assert isinstance(value, TimeoutError)
+
+
+def test_shutdown_with_cancel_skips_jobs_not_started():
+    started = []
+    release = threading.Event()
+
+    def job(item):
+        started.append(item)
+        release.wait(5)
+
+    scheduler = core.JobScheduler(max_workers=1, max_pending=10)
+    futures = [scheduler.submit(job, item) for item in range(5)]
+    while not started:
+        time.sleep(0.01)
+    threading.Timer(0.2, release.set).start()
+    scheduler.shutdown(cancel=True)
+    assert started == [0]
+    assert all(future.cancelled() for future in futures[1:])
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+import pytest
+
+import ds_sign_core as core
+from conftest import HAS_OPENSSL
+
+SEGMENT = 64 * 1024
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(core, "SEGMENT_SIZE", SEGMENT)
+
+
+def _write(path, size):
+    data = os.urandom(size)
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
+
+
+@pytest.mark.parametrize("size", [1, SEGMENT - 1, SEGMENT, 5 * SEGMENT, 5 * SEGMENT + 123])
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b"])
+def test_segment_digests_match_hashlib(tmp_path, size, algorithm):
+    path = str(tmp_path / "big.bin")
+    data = _write(path, size)
+    expected = []
+    for offset in range(0, size, SEGMENT):
+        hasher = core.new_hasher(algorithm)
+        hasher.update(data[offset:offset + SEGMENT])
+        expected.append(hasher.digest())
+    progress = []
+    for workers in (1, 4):
+        assert core.segment_digests(path, SEGMENT, workers, progress=lambda done, total: progress.append((done, total)),
+                                    algorithm=algorithm) == expected
+        assert progress[-1] == (size, size)
+
+
+@pytest.mark.parametrize("backend", ["native", "openssl"])
+def test_segmented_signature_round_trip(tmp_path, ec_keys, small_segments, backend):
+    if backend == "native" and not core.HAS_CRYPTOGRAPHY or backend == "openssl" and not HAS_OPENSSL:
+        pytest.skip(f"{backend} backend not available")
+    path = str(tmp_path / "image.iso")
+    _write(path, 10 * SEGMENT + 17)
+    signed_file = core.sign_file_standalone(path, ec_keys[0], backend=backend, segmented=True, max_workers=4)
+    algorithm, segment_size, size, digests = core.read_segments(signed_file)
+    assert (algorithm, segment_size, size, len(digests)) == ("sha256", SEGMENT, 10 * SEGMENT + 17, 11)
+    assert core.verify_file_standalone(path, ec_keys[1], signed_file, backend=backend, paranoid=True)
+
+    with open(path, "r+b") as f:
+        f.seek(7 * SEGMENT + 5)
+        f.write(b"\xff" if f.read(1) != b"\xff" else b"\x00")
+    assert not core.verify_file_standalone(path, ec_keys[1], signed_file, backend=backend, paranoid=True)
+
+
+def test_segment_list_is_authenticated(tmp_path, ec_keys, small_segments):
+    path = str(tmp_path / "image.iso")
+    data = _write(path, 4 * SEGMENT)
+    signed_file = core.sign_file_standalone(path, ec_keys[0], segmented=True)
+    segments_path = signed_file + core.SEGMENTS_SUFFIX
+    with open(segments_path, encoding="utf-8") as f:
+        lines = f.readlines()
+
+    # Fichier et liste modifiés ensemble : la racine signée ne correspond plus
+    tampered = bytearray(data)
+    tampered[0] ^= 1
+    with open(path, "wb") as f:
+        f.write(tampered)
+    lines[1] = hashlib.sha256(tampered[:SEGMENT]).hexdigest() + "\n"
+    with open(segments_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    assert not core.verify_file_standalone(path, ec_keys[1], signed_file, paranoid=True)
+
+    with open(path, "wb") as f:
+        f.write(data[:-1])
+    assert not core.verify_file_standalone(path, ec_keys[1], signed_file, paranoid=True)
+
+
+def test_threshold_and_stale_segment_list(tmp_path, ec_keys, small_segments, monkeypatch):
+    path = str(tmp_path / "data.bin")
+    _write(path, 3 * SEGMENT)
+    monkeypatch.setattr(core, "SEGMENT_THRESHOLD", 2 * SEGMENT)
+    signed_file = core.sign_file_standalone(path, ec_keys[0])
+    assert core.read_segments(signed_file) is not None
+
+    # Une signature d'un seul tenant retire la liste laissée par la précédente
+    signed_file = core.sign_file_standalone(path, ec_keys[0], segmented=False)
+    assert core.read_segments(signed_file) is None
+    assert core.verify_file_standalone(path, ec_keys[1], signed_file, paranoid=True)
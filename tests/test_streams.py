@@ -0,0 +1,74 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ds_sign_core as core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.urandom(300_000)
+
+
+class _ReadOnly:
+    """Flux sans readinto (comme certains objets fichier de sockets ou de décompresseurs)."""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(min(size, 7_000))  # Lectures courtes, comme un tube
+
+
+@pytest.mark.parametrize("stream_class", [io.BytesIO, _ReadOnly])
+@pytest.mark.parametrize("algorithm", core.DIGEST_ALGORITHMS)
+def test_hash_stream_copies_and_hashes(stream_class, algorithm):
+    output = io.BytesIO()
+    progress = []
+    digest, size = core.hash_stream(stream_class(DATA), output, buffer_size=4096,
+                                    progress=lambda done, total: progress.append((done, total)),
+                                    algorithm=algorithm)
+    expected = core.new_hasher(algorithm)
+    expected.update(DATA)
+    assert (digest, size) == (expected.hexdigest(), len(DATA))
+    assert output.getvalue() == DATA
+    assert progress[-1] == (len(DATA), None)
+
+
+def test_stream_signature_is_a_file_signature(tmp_path, ec_keys):
+    signed_file = str(tmp_path / "data.signed")
+    assert core.sign_stream(io.BytesIO(DATA), ec_keys[0], signed_file) == (signed_file, len(DATA))
+    data_file = str(tmp_path / "data.bin")
+    with open(data_file, "wb") as f:
+        f.write(DATA)
+    assert core.verify_file_standalone(data_file, ec_keys[1], signed_file, paranoid=True)
+    assert core.verify_stream(io.BytesIO(DATA), ec_keys[1], signed_file) == (True, len(DATA))
+    assert core.verify_stream(io.BytesIO(DATA + b"!"), ec_keys[1], signed_file) == (False, len(DATA) + 1)
+
+
+def test_missing_signature_fails_before_reading(tmp_path, ec_keys):
+    stream = io.BytesIO(DATA)
+    with pytest.raises(Exception, match="Missing signature file"):
+        core.verify_stream(stream, ec_keys[1], str(tmp_path / "missing.signed"))
+    assert stream.tell() == 0
+
+
+def _cli(*argv, data):
+    return subprocess.run([sys.executable, "-c", "import sys, ds_sign_cli; sys.exit(ds_sign_cli.main(sys.argv[1:]))",
+                           "--format", "json", *argv], input=data, capture_output=True, cwd=ROOT, timeout=120)
+
+
+def test_cli_streams_through_a_pipe(tmp_path, ec_keys):
+    signature = str(tmp_path / "stream.signed")
+    signed = _cli("sign-stream", "--key", ec_keys[0], "--signature", signature, "--output", "-", data=DATA)
+    assert signed.returncode == 0, signed.stderr
+    assert signed.stdout == DATA  # Données recopiées sur la sortie standard, résumé sur la sortie d'erreur
+    assert json.loads(signed.stderr)["ok"] == 1
+
+    verified = _cli("verify-stream", "--key", ec_keys[1], "--signature", signature, data=DATA)
+    assert verified.returncode == 0 and json.loads(verified.stdout)["ok"] == 1
+    tampered = _cli("verify-stream", "--key", ec_keys[1], "--signature", signature, data=DATA[:-1])
+    assert tampered.returncode == 1
+    assert json.loads(tampered.stdout)["results"][0]["status"] == "failed"
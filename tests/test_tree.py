@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import ds_sign_core as core
+from conftest import write_files
+
+FILES = {
+    "README.md": b"readme\n",
+    "b.txt": b"b\n",
+    "empty/": b"",
+    "src/main.py": b"main\n",
+    "src/pkg/__init__.py": b"",
+    "src/pkg/mod.py": b"mod\n",
+    "src/pkg/sub/deep.txt": b"deep\n",
+    "src/z_last/": b"",
+    "données/été.txt": "é".encode("utf-8"),
+    "Z/a": b"a\n",
+    "z/a": b"a\n",
+}
+
+
+def generate_tree_reference(directory, output_file, prefix=""):
+    """Version récursive d'origine de generate_tree, gardée comme référence du format de dir_file."""
+    entries = sorted(os.listdir(directory))
+    entries_count = len(entries)
+
+    for index, entry in enumerate(entries):
+        full_path = os.path.join(directory, entry)
+        is_last = index == entries_count - 1
+
+        if os.path.isdir(full_path):
+            with open(output_file, "a", encoding="utf-8") as f:
+                f.write(f"{prefix}├───📁 {entry}\n")
+            new_prefix = f"{prefix}│   " if not is_last else f"{prefix}    "
+            generate_tree_reference(full_path, output_file, new_prefix)
+        else:
+            with open(output_file, "a", encoding="utf-8") as f:
+                f.write(f"{prefix}└───📄 {entry}\n")
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    directory = tmp_path / "tree"
+    write_files(str(directory), FILES)
+    return str(directory)
+
+
+@pytest.mark.parametrize("prefix", ["", "    "])
+def test_generate_tree_matches_recursive_version(tree, tmp_path, prefix):
+    expected, actual = str(tmp_path / "expected"), str(tmp_path / "actual")
+    generate_tree_reference(tree, expected, prefix)
+    core.generate_tree(tree, actual, prefix)
+    assert _read_bytes(actual) == _read_bytes(expected)
+
+
+def test_generate_tree_deep_nesting(tmp_path):
+    directory = tmp_path / "deep"
+    write_files(str(directory), {"/".join(["d"] * 60) + "/leaf": b"leaf\n", "d/side": b"side\n"})
+    expected, actual = str(tmp_path / "expected"), str(tmp_path / "actual")
+    generate_tree_reference(str(directory), expected)
+    core.generate_tree(str(directory), actual)
+    assert _read_bytes(actual) == _read_bytes(expected)
+
+
+@pytest.mark.parametrize("memory_limit", [0, 64])
+def test_signed_dir_file_matches_recursive_version(tree, tmp_path, ec_keys, memory_limit):
+    private_key, public_key = ec_keys
+    # dir_file est créé avant le parcours : il apparaît dans sa propre arborescence, comme à l'origine
+    expected = str(tmp_path / "expected")
+    with open(expected, "w", encoding="utf-8") as f:
+        f.write(f"{tree}:\n")
+    open(os.path.join(tree, core.DIR_FILE), "w").close()
+    generate_tree_reference(tree, expected)
+    os.remove(os.path.join(tree, core.DIR_FILE))
+
+    dir_file_path, _ = core.sign_directory(tree, private_key, mode="tree", memory_limit=memory_limit)
+    assert _read_bytes(dir_file_path) == _read_bytes(expected)
+    valid, message = core.verify_directory(tree, public_key, memory_limit=memory_limit)
+    assert valid, message
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import ds_sign_core as core
+
+SIZE = 256 * 1024
+
+
+@pytest.fixture
+def cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "VERIFY_CACHE_PATH", str(tmp_path / "verify_cache.sqlite3"))
+    monkeypatch.setattr(core, "VERIFY_CACHE_MIN_SIZE", 64 * 1024)
+    # Les fichiers tout juste écrits ne sont pas mémorisés (fenêtre d'horodatage) : elle est désactivée ici
+    monkeypatch.setattr(core.VerifyCache, "RACY_WINDOW_NS", -1)
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    """Nombre de vérifications réellement effectuées (hors cache)."""
+    calls = []
+    verify_file = core._verify_file
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return verify_file(*args, **kwargs)
+    monkeypatch.setattr(core, "_verify_file", counting)
+    return calls
+
+
+@pytest.fixture
+def signed(tmp_path, ec_keys):
+    path = str(tmp_path / "data.bin")
+    with open(path, "wb") as f:
+        f.write(os.urandom(SIZE))
+    return path, core.sign_file_standalone(path, ec_keys[0])
+
+
+def _verify(signed, public_key, **kwargs):
+    return core.verify_file_standalone(signed[0], public_key, signed[1], **kwargs)
+
+
+def test_second_verification_is_a_hit(cached, verifications, signed, ec_keys):
+    assert _verify(signed, ec_keys[1]) and _verify(signed, ec_keys[1])
+    assert len(verifications) == 1
+    assert _verify(signed, ec_keys[1], paranoid=True)
+    assert len(verifications) == 2
+
+
+def test_changes_invalidate_the_entry(cached, verifications, signed, ec_keys, tmp_path):
+    path, signed_file = signed
+    assert _verify(signed, ec_keys[1])
+    with open(path, "r+b") as f:
+        f.write(b"\x00\x01")
+    assert not _verify(signed, ec_keys[1])
+    assert len(verifications) == 2
+
+    core.sign_file_standalone(path, ec_keys[0])  # Nouvelle signature : autre empreinte de signature
+    assert _verify(signed, ec_keys[1]) and len(verifications) == 3
+    with open(signed_file + core.DIGEST_SUFFIX, "w") as f:
+        f.write("sha512\n")  # Les métadonnées de la signature en changent le sens
+    assert not _verify(signed, ec_keys[1]) and len(verifications) == 4
+
+    os.remove(signed_file + core.DIGEST_SUFFIX)
+    other_private, other_public = core.generate_key_pair("other", str(tmp_path / "keys"))
+    assert not _verify(signed, other_public)  # Entrée par clé publique
+    assert len(verifications) == 5
+
+
+def test_failures_and_recent_files_are_not_stored(cached, verifications, signed, ec_keys, tmp_path, monkeypatch):
+    other_private, other_public = core.generate_key_pair("other", str(tmp_path / "keys"))
+    assert not _verify(signed, other_public) and not _verify(signed, other_public)
+    assert len(verifications) == 2
+
+    monkeypatch.setattr(core.VerifyCache, "RACY_WINDOW_NS", 3600 * 10 ** 9)
+    assert _verify(signed, ec_keys[1]) and _verify(signed, ec_keys[1])
+    assert len(verifications) == 4
+
+
+def test_small_files_skip_the_cache(cached, verifications, tmp_path, ec_keys):
+    path = str(tmp_path / "small.txt")
+    with open(path, "wb") as f:
+        f.write(b"small\n")
+    signed_file = core.sign_file_standalone(path, ec_keys[0])
+    for _ in range(2):
+        assert core.verify_file_standalone(path, ec_keys[1], signed_file)
+    assert len(verifications) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    with core.VerifyCache(str(tmp_path / "lru.sqlite3"), max_size=3) as cache:
+        cache.LAST_USED_REFRESH_NS = -1  # Chaque consultation réussie rafraîchit last_used
+        entries = [(f"/data/{index}", "key", (1, 0, 0, index), "sig") for index in range(5)]
+        for entry in entries[:3]:
+            assert cache.store(*entry)
+        assert cache.lookup(*entries[0])  # La plus ancienne redevient la plus récente
+        for entry in entries[3:]:
+            cache.store(*entry)
+        present = [entry[0] for entry in entries if cache.lookup(*entry)]
+        assert present == ["/data/0", "/data/3", "/data/4"]
+        assert cache.connection.execute("SELECT COUNT(*) FROM verified").fetchone()[0] == 3
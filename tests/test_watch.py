@@ -0,0 +1,118 @@
+import os
+import queue
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import ds_sign_core as core
+import ds_sign_watch as watch
+from conftest import write_files
+
+
+class _Clock:
+    """Horloge simulée : `_wait` avance jusqu'au prochain événement prévu ou jusqu'à la fin du délai."""
+
+    def __init__(self, events):
+        self.now = 0.0
+        self.events = list(events)
+        self.waits = 0
+
+    def monotonic(self):
+        return self.now
+
+    def wait(self, timeout):
+        self.waits += 1
+        if self.events and (timeout is None or self.events[0] <= self.now + timeout):
+            self.now = self.events.pop(0)
+            return True
+        self.now += timeout
+        return False
+
+
+@pytest.fixture
+def simulated(monkeypatch, tmp_path, ec_keys):
+    def make(events, debounce=1.0, poll_interval=0.5, inotify=False):
+        clock = _Clock(events)
+        monkeypatch.setattr(watch, "time", types.SimpleNamespace(monotonic=clock.monotonic,
+                                                                 perf_counter=time.perf_counter))
+        watcher = watch.DirectoryWatcher(str(tmp_path), ec_keys[0], "manifest", debounce=debounce,
+                                         poll_interval=poll_interval, use_inotify=False)
+        if inotify:
+            watcher._inotify = object()  # Seul `_wait` s'en sert : sans délai tant que rien n'arrive
+        watcher._wait = clock.wait
+        return watcher, clock
+    return make
+
+
+@pytest.mark.parametrize("inotify", [False, True])
+def test_window_closes_after_debounce_without_events(simulated, inotify):
+    watcher, clock = simulated([3.0, 3.2, 3.9], inotify=inotify)
+    watcher._collect_changes()
+    assert clock.now == pytest.approx(4.9)  # Dernier événement + debounce
+    assert not clock.events
+
+
+def test_continuous_events_are_flushed_after_max_delay(simulated):
+    events = [0.1 * index for index in range(1, 500)]
+    watcher, clock = simulated(events, debounce=0.5)
+    watcher._collect_changes()
+    assert clock.now == pytest.approx(0.1 + 0.5 * watch.WATCH_MAX_DELAY_FACTOR)
+    assert clock.events  # Les événements suivants iront dans la fenêtre d'après
+
+
+def test_stop_ends_the_wait(simulated):
+    watcher, clock = simulated([1.0])
+    watcher.stop()
+    watcher._collect_changes()
+    assert clock.waits == 0
+
+
+def _watchers():
+    yield "poll"
+    if sys.platform.startswith("linux"):
+        yield "inotify"
+
+
+@pytest.fixture(params=list(_watchers()))
+def running(request, tmp_path, ec_keys):
+    directory = str(tmp_path / "watched")
+    write_files(directory, {f"src/file_{index}.txt": b"%d\n" % index for index in range(10)})
+    reports = queue.Queue()
+    token = core.CancellationToken()
+    errors = []
+
+    def target():
+        try:
+            watch.watch_directory(directory, ec_keys[0], "manifest", debounce=0.3, poll_interval=0.05,
+                                  use_inotify=request.param == "inotify", max_workers=2, on_signed=reports.put,
+                                  cancel=token)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    assert reports.get(timeout=30)["watcher"] == request.param  # Signature initiale
+    yield directory, reports
+    token.cancel()
+    thread.join(30)
+    assert not thread.is_alive() and not errors
+
+
+def test_burst_of_changes_is_signed_once(running, ec_keys):
+    directory, reports = running
+    for index in range(5):
+        with open(os.path.join(directory, "src", f"file_{index}.txt"), "ab") as f:
+            f.write(b"changed\n")
+        time.sleep(0.02)
+    os.remove(os.path.join(directory, "src", "file_9.txt"))
+    write_files(directory, {"src/new/added.txt": b"added\n"})
+
+    report = reports.get(timeout=30)
+    assert (report["changed"], report["removed"], report["files"]) == (6, 1, 10)
+    assert reports.empty()
+    time.sleep(0.5)
+    assert reports.empty()  # Rien n'a changé depuis : pas de nouvelle signature
+    assert core.verify_directory(directory, ec_keys[1], paranoid=True)[0]